@@ -6,6 +6,14 @@ import os
 import sys
 import re
 import io
+import contextlib
+import traceback
+
+# Permite importar los paquetes del proyecto (similarities, normalization...) al
+# ejecutar la interfaz como script: python interface/gui_main.py
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
 
 class NoOpSpinner:
     def start(self, *_, **__): 
@@ -79,6 +87,16 @@ def run_command(command):
         return f"Error executing command:\n{e}"
 
 
+def run_in_process(func, *args, **kwargs):
+    buffer = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(buffer), contextlib.redirect_stderr(buffer):
+            func(*args, **kwargs)
+    except Exception:
+        buffer.write(traceback.format_exc())
+    return buffer.getvalue()
+
+
 def parse_similarities_text(text):
     try:
         df_try = pd.read_csv(io.StringIO(text), sep="\t", header=None)
@@ -256,6 +274,7 @@ class MainApp(tk.Tk):
         notebook = ttk.Notebook(self)
         notebook.grid(row=0, column=0, sticky="nsew", padx=20, pady=20)
         self.spinner = NoOpSpinner()
+        self.engine = None
 
         self.tabs = {}
         for name in ["Recoleccion", "Normalizacion", "Vectorizacion", "Recuperacion"]:
@@ -277,7 +296,7 @@ class MainApp(tk.Tk):
     def run_with_spinner(self, command, console, on_finish=None):
         self.spinner.start(10)
         self.update()
-        output = run_command(command)
+        output = command() if callable(command) else run_command(command)
         self.spinner.stop()
         console.delete("1.0", tk.END)
         console.insert(tk.END, output)
@@ -463,7 +482,7 @@ class MainApp(tk.Tk):
         self.vec_field.grid(row=2, column=1, padx=6, pady=6, sticky="w")
 
         ttk.Label(controls, text="Representacion:").grid(row=3, column=0, padx=6, pady=6, sticky="e")
-        self.vec_rep = ttk.Combobox(controls, values=["tfidf", "frequency", "binary", "all"], state="readonly")
+        self.vec_rep = ttk.Combobox(controls, values=["tfidf", "frequency", "binary", "all", "hashing"], state="readonly")
         self.vec_rep.set("all")
         self.vec_rep.grid(row=3, column=1, padx=6, pady=6, sticky="w")
 
@@ -519,7 +538,9 @@ class MainApp(tk.Tk):
         self.sim_field.grid(row=1, column=1, padx=6, pady=6, sticky="w")
 
         ttk.Label(controls, text="Vector:").grid(row=2, column=0, padx=6, pady=6, sticky="e")
-        self.sim_vector = ttk.Combobox(controls, values=["tfidf", "frequency", "binary"], state="readonly")
+        self.sim_vector = ttk.Combobox(controls, values=["tfidf", "frequency", "binary",
+                                                         "hashed-tfidf", "hashed-frequency", "hashed-binary"],
+                                       state="readonly")
         self.sim_vector.set("tfidf")
         self.sim_vector.grid(row=2, column=1, padx=6, pady=6, sticky="w")
 
@@ -557,17 +578,31 @@ class MainApp(tk.Tk):
         self.console_sim = tk.Text(console_wrap, height=8, wrap="word", bg="#2D2D2D", fg="white")
         self.console_sim.grid(row=0, column=0, sticky="nsew")
 
+    def get_engine(self, base_path):
+        # El motor se reutiliza entre consultas mientras no cambie la ruta base,
+        # así los modelos y metadatos solo se cargan una vez y repetir una
+        # consulta (aunque se alterne vectorización o n-gramas) sale de la caché.
+        from similarities.engine import SimilarityEngine
+        from similarities.result_cache import ResultCache
+        if self.engine is None or self.engine.base_path != base_path:
+            self.engine = SimilarityEngine(base_path, cache=ResultCache())
+        return self.engine
+
     def run_retrieval(self):
         ensure_parent_dir(self.sim_out.get())
-        cmd = [
-            "-m", "similarities.retrieve_similar_articles",
-            "--file", self.sim_file.get(),
-            "--field", self.sim_field.get(),
-            "--vector", self.sim_vector.get(),
-            "--ngrams", self.sim_ngrams.get(),
-            "--basepath", self.sim_base.get(),
-            "--output", self.sim_out.get()
-        ]
+        from similarities.retrieve_similar_articles import retrieve_similar_articles
+
+        def command():
+            return run_in_process(
+                retrieve_similar_articles,
+                query_file=self.sim_file.get(),
+                field=self.sim_field.get(),
+                vector_type=self.sim_vector.get(),
+                ngram_type=self.sim_ngrams.get(),
+                base_path=self.sim_base.get(),
+                output_prefix=self.sim_out.get(),
+                engine=self.get_engine(self.sim_base.get()),
+            )
 
         def on_finish():
             out_txt = self.sim_out.get().strip()
@@ -1,32 +1,180 @@
 import argparse
-import pandas as pd
-import nltk
-from nltk.tokenize import word_tokenize
-from nltk import pos_tag
-from nltk.stem import WordNetLemmatizer
-from nltk.corpus import wordnet as wn
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+# Etiquetas POS de WordNet (wn.ADJ, wn.VERB, wn.ADV, wn.NOUN), sin importar NLTK.
+WN_ADJ, WN_VERB, WN_ADV, WN_NOUN = "a", "v", "r", "n"
+
 
 # ----------------------------- #
-# Descargas necesarias
+# Recursos NLTK (carga perezosa)
 # ----------------------------- #
-nltk.download('punkt', quiet=True)
-nltk.download('averaged_perceptron_tagger', quiet=True)
-nltk.download('wordnet', quiet=True)
+def nltk_resources():
+    """(paquete, ruta en nltk.data) que necesita la versión instalada de NLTK."""
+    import nltk
+    if hasattr(nltk.tokenize, "PunktTokenizer"):
+        # NLTK >= 3.9 usa los formatos sin pickle.
+        return [("punkt_tab", "tokenizers/punkt_tab/english/"),
+                ("averaged_perceptron_tagger_eng", "taggers/averaged_perceptron_tagger_eng/"),
+                ("wordnet", "corpora/wordnet")]
+    return [("punkt", "tokenizers/punkt"),
+            ("averaged_perceptron_tagger", "taggers/averaged_perceptron_tagger"),
+            ("wordnet", "corpora/wordnet")]
+
+
+def missing_nltk_resources():
+    """Paquetes que faltan. Solo revisa nltk.data.path en disco: nunca usa la red."""
+    import nltk
+    missing = []
+    for package, path in nltk_resources():
+        try:
+            nltk.data.find(path)
+        except LookupError:
+            missing.append(package)
+    return missing
+
+
+def download_nltk_resources(packages=None):
+    """Descarga explícita (con red) de los paquetes indicados o de todos los necesarios."""
+    import nltk
+    packages = [p for p, _ in nltk_resources()] if packages is None else packages
+    return {package: bool(nltk.download(package, quiet=True)) for package in packages}
+
+
+_nltk_tools = None
+
+
+def nltk_tools():
+    """
+    (word_tokenize, pos_tag, lematizador), importados la primera vez que se
+    normaliza un texto. Si falta algún recurso se indica cómo descargarlo en
+    lugar de intentar la descarga.
+    """
+    global _nltk_tools
+    if _nltk_tools is None:
+        missing = missing_nltk_resources()
+        if missing:
+            raise LookupError(f"Faltan recursos de NLTK: {', '.join(missing)}. "
+                              "Descárguelos con: python -m normalization.normalization --download-nltk")
+        from nltk import pos_tag
+        from nltk.stem import WordNetLemmatizer
+        from nltk.tokenize import word_tokenize
+        _nltk_tools = (word_tokenize, pos_tag, WordNetLemmatizer())
+    return _nltk_tools
 
-lemmatizer = WordNetLemmatizer()
+
+# ----------------------------- #
+# Caché de lemas
+# ----------------------------- #
+class LemmaCache:
+    """
+    Caché LRU acotada de lemas indexada por (token, POS de WordNet).
+    Puede guardarse en disco (JSON) y cargarse en la siguiente ejecución.
+
+    Con `track_new` (solo en los procesos del pool) se anotan además los lemas
+    calculados, para devolverlos al proceso principal con `drain_new`; en el
+    resto de usos (motor, servicio, interfaz) no se anotan y la memoria queda
+    acotada por `maxsize`.
+    """
+
+    def __init__(self, maxsize: int = 200_000, track_new: bool = False):
+        self.maxsize = maxsize
+        self.track_new = track_new
+        self._data = OrderedDict()
+        self._new = []
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def lemmatize(self, token: str, pos: str) -> str:
+        key = (token, pos)
+        lemma = self._data.get(key)
+        if lemma is not None:
+            self._data.move_to_end(key)
+            self.hits += 1
+            return lemma
+        self.misses += 1
+        lemma = nltk_tools()[2].lemmatize(token, pos)
+        self._put(key, lemma)
+        if self.track_new:
+            self._new.append((token, pos, lemma))
+        return lemma
+
+    def _put(self, key, lemma):
+        self._data[key] = lemma
+        self._data.move_to_end(key)
+        if len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def update(self, entries):
+        """Agrega entradas [(token, pos, lema), ...] (p. ej. las calculadas por otro proceso)."""
+        for token, pos, lemma in entries:
+            self._put((token, pos), lemma)
+
+    def drain_new(self):
+        """Devuelve y olvida las entradas calculadas desde la última llamada."""
+        new, self._new = self._new, []
+        return new
+
+    def entries(self):
+        """Entradas [(token, pos, lema), ...] de la menos a la más usada recientemente."""
+        return [[t, p, l] for (t, p), l in self._data.items()]
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+    def save(self, path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.entries(), f, ensure_ascii=False)
+
+    def load(self, path: str):
+        with open(path, encoding="utf-8") as f:
+            self.update(json.load(f))
+        self._new = []
+
+
+lemma_cache = LemmaCache()
+
+
+def configure_lemma_cache(path: str = None, maxsize: int = None):
+    """Ajusta el tamaño de la caché compartida y la precarga desde `path` si existe."""
+    if maxsize:
+        lemma_cache.maxsize = maxsize
+    if path and os.path.exists(path):
+        lemma_cache.load(path)
+    return lemma_cache
+
+
+def print_lemma_cache_stats():
+    st = lemma_cache.stats()
+    print(f"   Caché de lemas: {100 * st['hit_rate']:.1f}% aciertos "
+          f"({st['hits']} aciertos / {st['misses']} fallos, {st['size']} entradas)")
 
 # ----------------------------- #
 # Funciones de utilidad
 # ----------------------------- #
 def get_wordnet_pos(tag):
     if tag.startswith('J'):
-        return wn.ADJ
+        return WN_ADJ
     elif tag.startswith('V'):
-        return wn.VERB
+        return WN_VERB
     elif tag.startswith('R'):
-        return wn.ADV
+        return WN_ADV
     else:
-        return wn.NOUN
+        return WN_NOUN
 
 
 def normalize_text_nltk(text: str) -> str:
@@ -37,10 +185,11 @@ def normalize_text_nltk(text: str) -> str:
     - Etiqueta POS y lematiza.
     - Devuelve texto con tokens separados por espacios.
     """
+    word_tokenize, pos_tag, _ = nltk_tools()
     text = str(text).lower()
     tokens = word_tokenize(text)
     tagged = pos_tag(tokens)
-    lemmatized = [lemmatizer.lemmatize(tok, get_wordnet_pos(tag)) for tok, tag in tagged]
+    lemmatized = [lemma_cache.lemmatize(tok, get_wordnet_pos(tag)) for tok, tag in tagged]
     return " ".join(lemmatized)
 
 
@@ -51,7 +200,109 @@ def normalize_single_text(text: str) -> str:
     return normalize_text_nltk(text)
 
 
-def normalize_corpus(input_file: str, output_file: str):
+# ----------------------------- #
+# Normalización en paralelo
+# ----------------------------- #
+def _init_worker(cache_entries=None, cache_maxsize=None):
+    """Inicializa una vez por proceso el lematizador, el etiquetador, WordNet y la caché de lemas."""
+    nltk_tools()
+    lemma_cache.track_new = True
+    if cache_maxsize:
+        lemma_cache.maxsize = cache_maxsize
+    if cache_entries:
+        lemma_cache.update(cache_entries)
+    normalize_text_nltk("warm up")
+    lemma_cache.drain_new()
+    lemma_cache.hits = lemma_cache.misses = 0
+
+
+def _normalize_chunk(texts):
+    hits, misses = lemma_cache.hits, lemma_cache.misses
+    out = [normalize_text_nltk(t) for t in texts]
+    # Se devuelven también los lemas nuevos para que el proceso principal los incorpore a su caché.
+    return out, lemma_cache.hits - hits, lemma_cache.misses - misses, lemma_cache.drain_new()
+
+
+def resolve_workers(workers: int) -> int:
+    """0 o negativo = todos los núcleos disponibles."""
+    return workers if workers and workers > 0 else (os.cpu_count() or 1)
+
+
+def normalize_texts(texts, workers: int = 1, chunksize: int = 256):
+    """
+    Normaliza una secuencia de textos. Con `workers` > 1 reparte bloques de
+    `chunksize` filas en un pool de procesos y recoge los resultados en orden.
+    Informa al final la velocidad en documentos por segundo.
+    """
+    texts = [str(t) for t in texts]
+    workers = resolve_workers(workers)
+    nltk_tools()  # si faltan recursos, falla aquí y no dentro de cada proceso
+    t0 = time.perf_counter()
+
+    if workers == 1 or len(texts) <= chunksize:
+        out = [normalize_text_nltk(t) for t in texts]
+    else:
+        chunks = [texts[i:i + chunksize] for i in range(0, len(texts), chunksize)]
+        seed = lemma_cache.entries()
+        out = []
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(seed, lemma_cache.maxsize)) as pool:
+            for done, (result, hits, misses, new) in enumerate(pool.map(_normalize_chunk, chunks), start=1):
+                out.extend(result)
+                lemma_cache.hits += hits
+                lemma_cache.misses += misses
+                lemma_cache.update(new)
+                print(f"   {len(out)}/{len(texts)} documentos ({done}/{len(chunks)} bloques)", end="\r")
+        print()
+
+    elapsed = time.perf_counter() - t0
+    rate = len(texts) / elapsed if elapsed > 0 else float("inf")
+    print(f"   {len(texts)} documentos en {elapsed:.1f}s ({rate:.1f} docs/s, {workers} proceso(s))")
+    print_lemma_cache_stats()
+    return out
+
+
+# ----------------------------- #
+# Corpus normalizado en caché
+# ----------------------------- #
+def file_sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def normalized_manifest_path(output_file: str) -> str:
+    return os.path.splitext(output_file)[0] + ".json"
+
+
+def write_normalized_manifest(output_file: str, input_file: str, columns, raw_sha256: str = None):
+    """
+    Guarda junto al corpus normalizado el hash del archivo crudo del que salió
+    y las columnas normalizadas, para poder reutilizarlo mientras no cambie.
+    """
+    manifest = {
+        "raw_file": os.path.basename(input_file),
+        "raw_sha256": raw_sha256 or file_sha256(input_file),
+        "columns": list(columns),
+    }
+    with open(normalized_manifest_path(output_file), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    return manifest
+
+
+def read_normalized_manifest(output_file: str):
+    path = normalized_manifest_path(output_file)
+    if not (os.path.exists(path) and os.path.exists(output_file)):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def normalize_corpus(input_file: str, output_file: str, workers: int = 1, lemma_cache_path: str = None):
+    import pandas as pd
+    configure_lemma_cache(lemma_cache_path)
     df = pd.read_csv(input_file, sep="\t")
 
     cols_to_normalize = [col for col in ["Title", "Abstract"] if col in df.columns]
@@ -60,11 +311,16 @@ def normalize_corpus(input_file: str, output_file: str):
 
     for col in cols_to_normalize:
         print(f"🔄 Normalizando columna: {col} ...")
-        df[col] = df[col].astype(str).apply(normalize_text_nltk)
+        df[col] = normalize_texts(df[col].astype(str), workers)
 
     df.to_csv(output_file, sep="\t", index=False)
+    write_normalized_manifest(output_file, input_file, cols_to_normalize)
     print(f"✅ Archivo normalizado guardado en: {output_file}")
 
+    if lemma_cache_path:
+        lemma_cache.save(lemma_cache_path)
+        print(f"   Caché de lemas guardada en: {lemma_cache_path}")
+
 
 # ----------------------------- #
 # Argparse principal
@@ -73,11 +329,28 @@ def main():
     parser = argparse.ArgumentParser(
         description="Normalización de texto (NLTK) para columnas 'Title' y 'Abstract', manteniendo puntuación."
     )
-    parser.add_argument("--input", required=True, help="Ruta del archivo de entrada (.csv o .tsv).")
-    parser.add_argument("--output", required=True, help="Ruta del archivo de salida (.csv o .tsv).")
+    parser.add_argument("--input", help="Ruta del archivo de entrada (.csv o .tsv).")
+    parser.add_argument("--output", help="Ruta del archivo de salida (.csv o .tsv).")
+    parser.add_argument("--workers", type=int, default=1, help="Procesos para normalizar en paralelo (0 = todos los núcleos).")
+    parser.add_argument("--lemma-cache", default=None, help="Archivo JSON donde se carga/guarda la caché de lemas entre ejecuciones.")
+    parser.add_argument("--lemma-cache-size", type=int, default=None, help="Máximo de entradas en la caché de lemas.")
+    parser.add_argument("--download-nltk", action="store_true",
+                        help="Descarga los recursos de NLTK que falten (la normalización nunca descarga por su cuenta).")
     args = parser.parse_args()
 
-    normalize_corpus(args.input, args.output)
+    if args.download_nltk:
+        missing = missing_nltk_resources()
+        for package, ok in download_nltk_resources(missing).items():
+            print(f"{'✅' if ok else '❌'} {package}")
+        if not missing:
+            print("✅ Recursos de NLTK completos")
+        if not args.input:
+            return
+    if not (args.input and args.output):
+        parser.error("se requieren --input y --output")
+
+    configure_lemma_cache(maxsize=args.lemma_cache_size)
+    normalize_corpus(args.input, args.output, args.workers, args.lemma_cache)
 
 
 if __name__ == "__main__":
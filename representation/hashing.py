@@ -0,0 +1,184 @@
+import zlib
+import numpy as np
+import scipy.sparse as sp
+from representation.store import smooth_idf, word_analyzer
+
+BASE_REPS = ["tfidf", "frequency", "binary"]
+HASHED_REPS = [f"hashed-{rep}" for rep in BASE_REPS]
+TOKEN_PATTERN = r"(?u)\w+|\?|\.|,|\¿|\!"
+DEFAULT_BITS = 18
+
+
+def base_rep(rep: str) -> str:
+    """'hashed-tfidf' → 'tfidf'."""
+    if rep not in HASHED_REPS:
+        raise ValueError(f"Tipo de vectorización con hashing no reconocido: {rep}")
+    return rep[len("hashed-"):]
+
+
+# ----------------------------- #
+# Vectorizador sin vocabulario
+# ----------------------------- #
+class HashedVectorizer:
+    """
+    Vectorizador con "hashing trick": cada n-grama va a la columna
+    crc32(término) mod 2^bits, así que no hay vocabulario que ajustar,
+    guardar ni cargar, y el número de columnas no crece con el corpus
+    (términos distintos pueden compartir columna).
+
+    `rep` es "tfidf", "frequency" o "binary", con la misma salida que los
+    vectorizadores de sklearn salvo por las colisiones. Para tfidf solo se
+    necesitan las frecuencias de documento por columna (2^bits enteros):
+    `partial_fit` las acumula bloque a bloque, de modo que el corpus puede
+    procesarse en streaming o ampliarse después sin volver a tokenizarlo.
+    """
+
+    def __init__(self, rep="tfidf", ngram_range=(1, 1), bits=DEFAULT_BITS, token_pattern=TOKEN_PATTERN,
+                 lowercase=True):
+        if rep not in BASE_REPS:
+            raise ValueError(f"Tipo de vectorización no reconocido: {rep}")
+        if not 1 <= bits <= 30:
+            raise ValueError("bits debe estar entre 1 y 30.")
+        self.rep = rep
+        self.ngram_range = tuple(ngram_range)
+        self.bits = bits
+        self.token_pattern = token_pattern
+        self.lowercase = lowercase
+        self.binary = rep == "binary"
+        self.norm = "l2" if rep == "tfidf" else None
+        self.n_docs = 0
+        self.doc_freq = np.zeros(self.n_features, dtype=np.int64) if rep == "tfidf" else None
+        self.idf_ = None
+        self._analyzer = None
+
+    @property
+    def n_features(self):
+        return 1 << self.bits
+
+    @property
+    def idf(self):
+        return self.idf_
+
+    def __getstate__(self):
+        # El analizador es una clausura (no se puede serializar); se reconstruye al usarse.
+        state = dict(self.__dict__)
+        state["_analyzer"] = None
+        return state
+
+    def build_analyzer(self):
+        if self._analyzer is None:
+            self._analyzer = word_analyzer(self.token_pattern, self.ngram_range, self.lowercase)
+        return self._analyzer
+
+    # ---- conteo ----
+    def counts(self, texts):
+        """Matriz CSR de conteos (documentos x 2^bits)."""
+        analyzer = self.build_analyzer()
+        mask = self.n_features - 1
+        indptr, cols = [0], []
+        for text in texts:
+            cols.extend(zlib.crc32(term.encode("utf-8")) & mask for term in analyzer(text))
+            indptr.append(len(cols))
+        X = sp.csr_matrix((np.ones(len(cols), dtype=np.int64), np.asarray(cols, dtype=np.int64),
+                           np.asarray(indptr, dtype=np.int64)), shape=(len(indptr) - 1, self.n_features))
+        X.sum_duplicates()
+        return X
+
+    # ---- ajuste ----
+    def partial_fit(self, texts=None, counts=None):
+        """Acumula documentos (y, en tfidf, frecuencias de documento) de un bloque: `texts` o sus `counts`."""
+        counts = self.counts(texts) if counts is None else sp.csr_matrix(counts)
+        self.n_docs += counts.shape[0]
+        if self.doc_freq is not None:
+            self.doc_freq += np.bincount(counts.indices[counts.data != 0], minlength=self.n_features)
+            self.idf_ = smooth_idf(self.n_docs, self.doc_freq)
+        return self
+
+    def fit(self, texts):
+        self.n_docs = 0
+        if self.doc_freq is not None:
+            self.doc_freq[:] = 0
+        return self.partial_fit(texts)
+
+    def with_rep(self, rep):
+        """Mismo espacio de columnas y documentos vistos, con otra representación (comparte el conteo)."""
+        other = HashedVectorizer(rep, self.ngram_range, self.bits, self.token_pattern, self.lowercase)
+        other.n_docs = self.n_docs
+        if other.doc_freq is not None:
+            if self.doc_freq is None:
+                raise ValueError("Las frecuencias de documento solo se acumulan en tfidf.")
+            other.doc_freq = self.doc_freq.copy()
+            other.idf_ = smooth_idf(other.n_docs, other.doc_freq)
+        return other
+
+    # ---- transformación ----
+    def weigh(self, counts):
+        """Pasa de conteos a la representación `rep` (binaria, frecuencia o tfidf con norma L2)."""
+        X = sp.csr_matrix(counts, dtype=np.float64)
+        if self.binary:
+            X.data[:] = 1.0
+        elif self.rep == "tfidf":
+            if self.idf_ is None:
+                raise ValueError("El vectorizador tfidf necesita partial_fit antes de transformar.")
+            X = X.multiply(self.idf_).tocsr()
+            norms = np.sqrt(np.asarray(X.multiply(X).sum(axis=1)).ravel())
+            norms[norms == 0] = 1.0
+            X = sp.diags(1.0 / norms) @ X
+        return X.tocsr()
+
+    def transform(self, texts):
+        return self.weigh(self.counts(texts))
+
+    def fit_transform(self, texts):
+        counts = self.counts(texts)
+        self.fit([])
+        self.partial_fit(counts=counts)
+        return self.weigh(counts)
+
+    # ---- persistencia ----
+    def params(self):
+        """Parámetros que se guardan en el manifiesto del store (no hay vocabulario)."""
+        return {
+            "token_pattern": self.token_pattern,
+            "ngram_range": list(self.ngram_range),
+            "lowercase": bool(self.lowercase),
+            "binary": self.binary,
+            "norm": self.norm,
+            "hashing": {"hash": "crc32", "bits": self.bits, "rep": self.rep},
+        }
+
+    @classmethod
+    def from_params(cls, params, doc_freq=None, n_docs=0):
+        """Vectorizador de un artefacto guardado: parámetros del manifiesto, frecuencias de documento y filas."""
+        hashing = params["hashing"]
+        vec = cls(hashing["rep"], tuple(params["ngram_range"]), hashing["bits"], params["token_pattern"],
+                  params.get("lowercase", True))
+        vec.n_docs = n_docs
+        if vec.doc_freq is not None and doc_freq is not None:
+            vec.doc_freq = np.array(doc_freq, dtype=np.int64)
+            vec.idf_ = smooth_idf(vec.n_docs, vec.doc_freq)
+        return vec
+
+
+def hash_corpus(texts, ngram_range, bits=DEFAULT_BITS, chunksize=10_000, progress=None):
+    """
+    Conteos del corpus por bloques: tokeniza y cuenta `chunksize` textos a la
+    vez, acumulando las frecuencias de documento. Devuelve (conteos, vectorizador
+    tfidf ajustado); `with_rep` da los de frecuencia y binario.
+
+    Solo la tokenización es por bloques: los conteos de todos los bloques se
+    apilan en memoria (una matriz dispersa del tamaño del corpus), porque el
+    peso tfidf de cada fila depende del idf final. Lo que no crece con el
+    corpus es el vectorizador (2^bits frecuencias de documento, sin vocabulario).
+    """
+    hasher = HashedVectorizer("tfidf", ngram_range, bits)
+    texts = list(texts)
+    parts = []
+    for start in range(0, len(texts), chunksize):
+        counts = hasher.counts(texts[start:start + chunksize])
+        hasher.partial_fit(counts=counts)
+        parts.append(counts)
+        if progress:
+            progress(min(start + chunksize, len(texts)), len(texts))
+    counts = sp.vstack(parts, format="csr") if parts else sp.csr_matrix((0, hasher.n_features), dtype=np.int64)
+    return counts, hasher
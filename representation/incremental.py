@@ -0,0 +1,235 @@
+import argparse
+import glob
+import os
+import numpy as np
+import scipy.sparse as sp
+from normalization.normalization import (
+    normalize_texts, configure_lemma_cache, lemma_cache,
+    file_sha256, read_normalized_manifest, write_normalized_manifest,
+)
+from representation.store import VocabTable, is_store, open_store, save_store, smooth_idf
+from representation.vectorize import load_normalized_corpus
+
+
+# ----------------------------- #
+# Filas nuevas (deduplicadas por DOI)
+# ----------------------------- #
+def _doi_key(doi):
+    return str(doi).strip().lower()
+
+
+def new_rows(existing: "pd.DataFrame", incoming: "pd.DataFrame") -> "pd.DataFrame":
+    """Filas de `incoming` cuyo DOI no está en `existing` ni repetido dentro de `incoming`."""
+    import pandas as pd
+    seen = {_doi_key(d) for d in existing.get("DOI", pd.Series(dtype=str)) if _doi_key(d)}
+    keep = []
+    for doi in incoming.get("DOI", pd.Series([""] * len(incoming))):
+        key = _doi_key(doi)
+        if key and key in seen:
+            keep.append(False)
+            continue
+        if key:
+            seen.add(key)
+        keep.append(True)
+    return incoming[keep].reindex(columns=existing.columns).fillna("")
+
+# ----------------------------- #
+# Actualización de un artefacto
+# ----------------------------- #
+def _l2_normalize_rows(X):
+    norms = np.sqrt(np.asarray(X.multiply(X).sum(axis=1)).ravel())
+    norms[norms == 0] = 1.0
+    return (sp.diags(1.0 / norms) @ X).tocsr()
+
+
+def stage_append(path: str, texts):
+    """
+    Calcula en memoria (sin escribir nada) el artefacto `path` con las filas
+    de `texts` agregadas:
+      - los n-gramas nuevos se añaden al final del vocabulario (con hashing
+        no hay vocabulario: cada n-grama cae en su columna fija);
+      - las filas nuevas se apilan debajo de la matriz existente;
+      - en tfidf, el idf se recalcula con las frecuencias de documento
+        guardadas y las filas antiguas solo se reescalan por idf_nuevo/idf_viejo
+        y se vuelven a normalizar (sin volver a tokenizar el corpus).
+    """
+    store = open_store(path, mmap=False)
+    params = store.manifest["vectorizer"]
+    n_old, v_old = store.X.shape
+    new_terms = {}
+
+    if params.get("hashing"):
+        vocab = None
+        counts = store.vectorizer.counts(texts)
+    else:
+        vocab = store.vectorizer.vocab
+        analyzer = store.vectorizer.build_analyzer()
+        # Conteos de las filas nuevas, ampliando el vocabulario con los términos desconocidos.
+        rows, cols, vals = [], [], []
+        for r, text in enumerate(texts):
+            counts = {}
+            for term in analyzer(text):
+                j = vocab.lookup(term)
+                if j < 0:
+                    j = new_terms.setdefault(term, v_old + len(new_terms))
+                counts[j] = counts.get(j, 0) + 1
+            for j, c in counts.items():
+                rows.append(r)
+                cols.append(j)
+                vals.append(c)
+        counts = sp.csr_matrix((np.asarray(vals, dtype=np.int64), (np.asarray(rows, dtype=np.int64),
+                                                                    np.asarray(cols, dtype=np.int64))),
+                               shape=(len(texts), v_old + len(new_terms)))
+        counts.sort_indices()
+
+    v_new = v_old + len(new_terms)
+
+    doc_freq = np.concatenate([store.doc_freq(), np.zeros(len(new_terms), dtype=np.int64)])
+    doc_freq += np.bincount(counts.indices, minlength=v_new)
+
+    X_old = sp.csr_matrix((store.X.data, store.X.indices, store.X.indptr), shape=(n_old, v_new))
+    idf = None
+    if store.manifest.get("has_idf"):
+        idf_old = np.asarray(store.vectorizer.idf)
+        idf = smooth_idf(n_old + len(texts), doc_freq)
+        # tfidf_fila = tf * idf / ||tf * idf||: reescalar por idf_nuevo / idf_viejo y renormalizar
+        # da el mismo resultado que recalcular desde tf, que no se guarda.
+        X_old = X_old.astype(np.float64)
+        X_old.data *= (idf[:v_old] / idf_old)[X_old.indices]
+        X_new = counts.astype(np.float64).multiply(idf).tocsr()
+        if params.get("norm") == "l2":
+            X_old = _l2_normalize_rows(X_old)
+            X_new = _l2_normalize_rows(X_new)
+    elif params.get("binary"):
+        X_new = counts.copy()
+        X_new.data[:] = 1
+    else:
+        X_new = counts
+
+    X = sp.vstack([X_old, X_new.astype(X_old.dtype)], format="csr")
+    new_vocab = None
+    if vocab is not None:
+        new_vocab = VocabTable.from_terms(list(vocab.terms_by_column()) + sorted(new_terms, key=new_terms.get))
+    return {"path": path, "X": X, "vocab": new_vocab, "params": params, "meta": store.meta, "idf": idf,
+            "doc_freq": doc_freq, "n_terms": len(new_terms)}
+
+
+def commit_append(staged):
+    """Escribe en disco un artefacto preparado con `stage_append`."""
+    save_store(staged["path"], staged["X"], staged["vocab"], staged["params"], staged["meta"],
+               idf=staged["idf"], doc_freq=staged["doc_freq"])
+    return staged["X"].shape, staged["n_terms"]
+
+
+def append_to_store(path: str, texts):
+    """
+    Agrega al artefacto `path` las filas de `texts` (ya normalizados) sin
+    reajustar el vectorizador (ver `stage_append`). Devuelve (forma de X, términos nuevos).
+    """
+    staged = stage_append(path, texts)
+    return commit_append(staged)
+
+
+def corpus_stores(vectors_dir: str, corpus_name: str):
+    paths = sorted(glob.glob(os.path.join(vectors_dir, f"{corpus_name}_*")))
+    return [p for p in paths if is_store(p) and open_store(p).meta.get("corpus") == corpus_name]
+
+
+def stale_pkls(vectors_dir: str, corpus_name: str):
+    """Artefactos .pkl del corpus sin versión store: la actualización incremental no los modifica."""
+    paths = sorted(glob.glob(os.path.join(vectors_dir, f"{corpus_name}_*.pkl")))
+    return [p for p in paths if not is_store(p[:-len(".pkl")])]
+
+# ----------------------------- #
+# Actualización de un corpus
+# ----------------------------- #
+def update_corpus(basepath: str, corpus_name: str, new_file: str, workers: int = 1, lemma_cache_path: str = None):
+    """
+    Incorpora `new_file` (TSV con el mismo formato que el corpus crudo) al
+    corpus `corpus_name`: descarta DOIs ya presentes, normaliza solo las filas
+    nuevas, las agrega a los CSV crudo y normalizado, y actualiza cada
+    artefacto en formato store del corpus. El costo es proporcional a las
+    filas nuevas (más la reescritura de los arreglos).
+
+    Primero se preparan en memoria todos los artefactos, luego se escriben y
+    los CSV se extienden al final: si algo falla antes, los CSV no quedan
+    por delante de las matrices. Un artefacto que ya tiene las filas nuevas
+    (escrito por una ejecución interrumpida antes de los CSV) no se vuelve a
+    extender. Los .pkl sin versión store no se actualizan (se avisa).
+    """
+    import pandas as pd
+    configure_lemma_cache(lemma_cache_path)
+    corpus_dir = os.path.join(basepath, "corpus")
+    vectors_dir = os.path.join(basepath, "vectors")
+    raw_path = os.path.join(corpus_dir, f"{corpus_name}_raw_corpus.csv")
+    norm_path = os.path.join(corpus_dir, f"{corpus_name}_normalized_corpus.csv")
+    if not os.path.exists(raw_path):
+        raise FileNotFoundError(f"No se encontró el archivo: {raw_path}")
+
+    stores = corpus_stores(vectors_dir, corpus_name)
+    fields = sorted({open_store(p).meta["column"] for p in stores}) or ["Title", "Abstract"]
+    for path in stale_pkls(vectors_dir, corpus_name):
+        print(f"⚠️  {os.path.basename(path)} no se actualiza (formato pkl): conviértalo con "
+              f"`python -m representation.store --convert` o vuelva a vectorizar el corpus.")
+
+    raw_df = pd.read_csv(raw_path, sep="\t").fillna("")
+    # Asegura que la caché normalizada corresponde al crudo actual antes de extenderla.
+    norm_df = load_normalized_corpus(corpus_dir, corpus_name, fields, workers)
+    incoming = pd.read_csv(new_file, sep="\t").fillna("")
+    added = new_rows(raw_df, incoming)
+
+    print(f"\n🔹 {corpus_name}: {len(incoming)} filas recibidas, {len(added)} nuevas (DOI no visto).")
+    if added.empty:
+        return 0
+
+    normalized = added.copy()
+    for col in fields:
+        if col in normalized.columns:
+            print(f"🔄 Normalizando filas nuevas [{col}]...")
+            normalized[col] = normalize_texts(normalized[col].fillna("").astype(str), workers)
+
+    staged = []
+    for path in stores:
+        n_rows = open_store(path).X.shape[0]
+        if n_rows == len(raw_df) + len(added):
+            print(f"♻️  {os.path.basename(path)} ya contiene las filas nuevas.")
+            continue
+        if n_rows != len(raw_df):
+            raise ValueError(f"{os.path.basename(path)} tiene {n_rows} filas y {raw_path} {len(raw_df)}; "
+                             f"vuelva a vectorizar el corpus.")
+        staged.append(stage_append(path, list(normalized[open_store(path).meta["column"]])))
+
+    for item in staged:
+        shape, n_terms = commit_append(item)
+        print(f"✅ {os.path.basename(item['path'])} → {shape[0]} documentos | {shape[1]} características (+{n_terms} nuevas)")
+
+    added.to_csv(raw_path, sep="\t", index=False, header=False, mode="a")
+    # Solo se extiende la caché normalizada si es nuestra (tiene manifiesto; ver load_normalized_corpus).
+    if read_normalized_manifest(norm_path) is not None:
+        normalized.reindex(columns=norm_df.columns).fillna("").to_csv(norm_path, sep="\t", index=False, header=False,
+                                                                      mode="a")
+        write_normalized_manifest(norm_path, raw_path, fields, raw_sha256=file_sha256(raw_path))
+
+    if lemma_cache_path:
+        lemma_cache.save(lemma_cache_path)
+    return len(added)
+
+# ----------------------------- #
+# Argparse principal
+# ----------------------------- #
+def main():
+    parser = argparse.ArgumentParser(
+        description="Agrega artículos nuevos a un corpus y a sus artefactos (formato store) sin reajustar los vectorizadores."
+    )
+    parser.add_argument("--basepath", default=".", help="Ruta base donde están corpus/ y vectors/.")
+    parser.add_argument("--corpus", choices=["arxiv", "pubmed"], required=True, help="Corpus a actualizar.")
+    parser.add_argument("--new", required=True, help="TSV con los artículos recién recolectados.")
+    parser.add_argument("--workers", type=int, default=1, help="Procesos para normalizar en paralelo (0 = todos los núcleos).")
+    parser.add_argument("--lemma-cache", default=None, help="Archivo JSON donde se carga/guarda la caché de lemas entre ejecuciones.")
+    args = parser.parse_args()
+
+    update_corpus(args.basepath, args.corpus, args.new, args.workers, args.lemma_cache)
+
+
+if __name__ == "__main__":
+    main()
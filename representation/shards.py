@@ -0,0 +1,188 @@
+import argparse
+import glob
+import json
+import os
+import pickle
+import shutil
+import time
+import uuid
+import zlib
+import numpy as np
+import scipy.sparse as sp
+from representation.store import MANIFEST, artifact_signature, is_store, open_store, row_norms
+
+SHARDS_FORMAT = "simdoc-shards"
+SHARDS_VERSION = 1
+SCHEMES = ["range", "doi"]
+
+
+# ----------------------------- #
+# Partición de filas
+# ----------------------------- #
+def shard_rows(n_docs, n_shards, scheme="range", dois=None):
+    """
+    Filas (ids globales, ordenados) de cada fragmento.
+        range   bloques contiguos de tamaño similar
+        doi     crc32(DOI) mod n_shards: un artículo cae siempre en el mismo
+                fragmento aunque el corpus cambie de orden o crezca
+    """
+    n_shards = max(1, min(n_shards, n_docs)) if n_docs else 1
+    if scheme == "range":
+        return np.array_split(np.arange(n_docs, dtype=np.int64), n_shards)
+    if scheme == "doi":
+        if dois is None or len(dois) != n_docs:
+            raise ValueError("La partición por DOI necesita un DOI por fila.")
+        keys = np.fromiter((zlib.crc32(str(d).strip().lower().encode("utf-8")) for d in dois),
+                           dtype=np.int64, count=n_docs)
+        owner = keys % n_shards
+        return [np.flatnonzero(owner == s) for s in range(n_shards)]
+    raise ValueError(f"Esquema de fragmentación no reconocido: {scheme}")
+
+
+class Shard:
+    """Fragmento de un artefacto: filas `rows` de X, con sus normas de fila."""
+
+    def __init__(self, X, rows, norms):
+        self.X = X
+        self.rows = rows
+        self.norms = norms
+
+    @classmethod
+    def from_rows(cls, X, rows):
+        part = sp.csr_matrix(X)[rows]
+        return cls(part, rows, row_norms(part))
+
+
+# ----------------------------- #
+# Escritura y lectura
+# ----------------------------- #
+def shards_path(vectors_dir, name):
+    """Los fragmentos de un artefacto se guardan en vectors/shards/<artefacto>/."""
+    return os.path.join(vectors_dir, "shards", name)
+
+
+def save_shards(path, X, parts, scheme, source=None):
+    """
+    Escribe cada fragmento en shard-NNN/ (data / indices / indptr / rows /
+    row_norms .npy) y un manifest.json común. El vectorizador no se copia: es
+    el del artefacto de origen, igual para todos los fragmentos.
+    """
+    X = sp.csr_matrix(X)
+    tmp = f"{path}.tmp-{uuid.uuid4().hex[:8]}"
+    os.makedirs(tmp)
+    sizes = []
+    for i, rows in enumerate(parts):
+        shard = Shard.from_rows(X, rows)
+        shard.X.sort_indices()
+        sub = os.path.join(tmp, f"shard-{i:03d}")
+        os.makedirs(sub)
+        for name, arr in (("data", shard.X.data), ("indices", shard.X.indices), ("indptr", shard.X.indptr),
+                          ("rows", shard.rows), ("row_norms", shard.norms)):
+            np.save(os.path.join(sub, f"{name}.npy"), np.ascontiguousarray(arr))
+        sizes.append(int(len(rows)))
+
+    manifest = {
+        "format": SHARDS_FORMAT,
+        "version": SHARDS_VERSION,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "shape": list(X.shape),
+        "n_shards": len(parts),
+        "scheme": scheme,
+        "sizes": sizes,
+        "source": source or {},
+        "shards_id": uuid.uuid4().hex,
+    }
+    with open(os.path.join(tmp, MANIFEST), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+    old = None
+    if os.path.exists(path):
+        old = f"{path}.old-{uuid.uuid4().hex[:8]}"
+        os.replace(path, old)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    os.replace(tmp, path)
+    if old:
+        shutil.rmtree(old, ignore_errors=True)
+    return manifest
+
+
+def read_shards_manifest(path):
+    manifest_path = os.path.join(path, MANIFEST)
+    if not os.path.isfile(manifest_path):
+        return None
+    with open(manifest_path, encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("format") != SHARDS_FORMAT or manifest.get("version", 0) > SHARDS_VERSION:
+        return None
+    return manifest
+
+
+def shards_signature(path):
+    """Versión de los fragmentos guardados en `path` (cambia cada vez que se reescriben); None si no hay."""
+    manifest = read_shards_manifest(path)
+    return manifest_signature(manifest) if manifest is not None else None
+
+
+def manifest_signature(manifest):
+    # Los manifiestos anteriores a shards_id se distinguen por fecha y tamaños.
+    return manifest.get("shards_id") or f"{manifest.get('created')}:{manifest.get('sizes')}"
+
+
+def open_shards(path, mmap=True):
+    """Lista de Shard de un artefacto fragmentado; con `mmap=True` los arreglos se mapean sin copiarlos a RAM."""
+    manifest = read_shards_manifest(path)
+    if manifest is None:
+        raise FileNotFoundError(f"No se encontró un artefacto fragmentado en {path}")
+    mode = "r" if mmap else None
+    n_cols = manifest["shape"][1]
+    shards = []
+    for i, size in enumerate(manifest["sizes"]):
+        sub = os.path.join(path, f"shard-{i:03d}")
+
+        def load(name):
+            return np.load(os.path.join(sub, f"{name}.npy"), mmap_mode=mode)
+
+        X = sp.csr_matrix((load("data"), load("indices"), load("indptr")), shape=(size, n_cols), copy=False)
+        shards.append(Shard(X, load("rows"), load("row_norms")))
+    return shards, manifest
+
+
+# ----------------------------- #
+# Argparse principal
+# ----------------------------- #
+def main():
+    parser = argparse.ArgumentParser(description="Divide los artefactos de data/vectors en N fragmentos (por rango de filas o por DOI).")
+    parser.add_argument("--basepath", default=".", help="Ruta base con data/corpus/ y data/vectors/.")
+    parser.add_argument("--shards", type=int, required=True, help="Número de fragmentos por artefacto.")
+    parser.add_argument("--by", choices=SCHEMES, default="range", help="range: bloques contiguos | doi: hash del DOI.")
+    parser.add_argument("--pattern", default="*", help="Filtro (glob) de artefactos en data/vectors/.")
+    args = parser.parse_args()
+
+    import pandas as pd
+    vectors_dir = os.path.join(args.basepath, "data", "vectors")
+    metadata = {}
+    for path in sorted(glob.glob(os.path.join(vectors_dir, args.pattern))):
+        if is_store(path):
+            X, name = open_store(path).X, os.path.basename(path)
+        elif path.endswith(".pkl") and not is_store(path[:-4]):
+            with open(path, "rb") as f:
+                X = pickle.load(f)["X"]
+            name = os.path.basename(path)[:-4]
+        else:
+            continue
+        dois = None
+        if args.by == "doi":
+            corpus_name = name.split("_", 1)[0]
+            if corpus_name not in metadata:
+                csv_path = os.path.join(args.basepath, "data", "corpus", f"{corpus_name}_raw_corpus.csv")
+                metadata[corpus_name] = pd.read_csv(csv_path, sep="\t")["DOI"].to_numpy()
+            dois = metadata[corpus_name]
+        parts = shard_rows(X.shape[0], args.shards, args.by, dois)
+        out = shards_path(vectors_dir, name)
+        manifest = save_shards(out, X, parts, args.by,
+                               {"artifact": os.path.basename(path), "signature": artifact_signature(path)})
+        print(f"✅ {name} → {out}  ({manifest['n_shards']} fragmentos: {manifest['sizes']})")
+
+
+if __name__ == "__main__":
+    main()
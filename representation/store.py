@@ -0,0 +1,414 @@
+import argparse
+import glob
+import json
+import os
+import pickle
+import shutil
+import re
+import time
+import uuid
+from bisect import bisect_left
+import numpy as np
+import scipy.sparse as sp
+
+STORE_FORMAT = "simdoc-vectors"
+STORE_VERSION = 2
+MANIFEST = "manifest.json"
+ARRAYS_PREFIX = "v-"
+
+
+# ----------------------------- #
+# Vocabulario ordenado
+# ----------------------------- #
+class VocabTable:
+    """
+    Vocabulario compacto: todos los términos concatenados en un blob UTF-8
+    ordenado, más un arreglo de offsets y otro con la columna de cada término.
+    Se busca por bisección sobre los offsets, sin construir un dict en memoria,
+    así que funciona directamente sobre arreglos mapeados con np.memmap.
+    """
+
+    def __init__(self, blob, offsets, ids):
+        self.blob = blob
+        self.offsets = offsets
+        self.ids = ids
+
+    def __len__(self):
+        return self.offsets.shape[0] - 1
+
+    def __getitem__(self, i):
+        return bytes(self.blob[self.offsets[i]:self.offsets[i + 1]]).decode("utf-8")
+
+    def lookup(self, term):
+        """Columna de `term` o -1 si no está en el vocabulario."""
+        key = term.encode("utf-8")
+        i = bisect_left(_BlobView(self), key)
+        if i < len(self) and bytes(self.blob[self.offsets[i]:self.offsets[i + 1]]) == key:
+            return int(self.ids[i])
+        return -1
+
+    def terms_by_column(self):
+        """Términos ordenados por índice de columna (como get_feature_names_out)."""
+        out = np.empty(len(self), dtype=object)
+        for i in range(len(self)):
+            out[self.ids[i]] = self[i]
+        return out
+
+    @classmethod
+    def from_terms(cls, terms, ids=None):
+        """`terms[i]` es el término de la columna `ids[i]` (por defecto, la columna i)."""
+        ids = np.arange(len(terms), dtype=np.int64) if ids is None else np.asarray(ids, dtype=np.int64)
+        encoded = [str(t).encode("utf-8") for t in terms]
+        order = sorted(range(len(encoded)), key=encoded.__getitem__)
+        lengths = np.fromiter((len(encoded[i]) for i in order), dtype=np.int64, count=len(order))
+        offsets = np.zeros(len(order) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        blob = np.frombuffer(b"".join(encoded[i] for i in order), dtype=np.uint8)
+        return cls(blob, offsets, ids[np.asarray(order, dtype=np.int64)])
+
+
+class _BlobView:
+    """Secuencia de términos (bytes) del blob, para usar con bisect."""
+
+    def __init__(self, table):
+        self.table = table
+
+    def __len__(self):
+        return len(self.table)
+
+    def __getitem__(self, i):
+        return bytes(self.table.blob[self.table.offsets[i]:self.table.offsets[i + 1]])
+
+
+# ----------------------------- #
+# Vectorizador reconstruido
+# ----------------------------- #
+def word_analyzer(token_pattern, ngram_range=(1, 1), lowercase=True):
+    """
+    Mismo analizador de palabras que CountVectorizer(...).build_analyzer()
+    (sin acentos ni stop words, como en vectorize.py), sin importar sklearn.
+    """
+    pattern = re.compile(token_pattern)
+    if pattern.groups > 1:
+        raise ValueError("token_pattern debe tener como máximo un grupo de captura.")
+    min_n, max_n = ngram_range
+
+    def analyze(doc):
+        tokens = pattern.findall(doc.lower() if lowercase else doc)
+        if max_n == 1:
+            return tokens
+        grams = list(tokens) if min_n == 1 else []
+        for n in range(max(min_n, 2), min(max_n, len(tokens)) + 1):
+            grams.extend(" ".join(tokens[i:i + n]) for i in range(len(tokens) - n + 1))
+        return grams
+
+    return analyze
+
+
+class StoredVectorizer:
+    """
+    Sustituto de CountVectorizer/TfidfVectorizer para transformar consultas a
+    partir de lo guardado en el store (parámetros, vocabulario e idf), sin
+    necesidad de deserializar el objeto de sklearn.
+    """
+
+    def __init__(self, params, vocab, idf=None):
+        self.params = params
+        self.vocab = vocab
+        self.idf = idf
+        self._analyzer = word_analyzer(params["token_pattern"], tuple(params["ngram_range"]),
+                                       params.get("lowercase", True))
+
+    def transform(self, texts):
+        rows, cols, vals = [], [], []
+        for r, text in enumerate(texts):
+            counts = {}
+            for term in self._analyzer(text):
+                j = self.vocab.lookup(term)
+                if j >= 0:
+                    counts[j] = counts.get(j, 0) + 1
+            for j, c in counts.items():
+                rows.append(r)
+                cols.append(j)
+                vals.append(c)
+
+        X = sp.csr_matrix(
+            (np.asarray(vals, dtype=np.float64), (np.asarray(rows, dtype=np.int64), np.asarray(cols, dtype=np.int64))),
+            shape=(len(texts), len(self.vocab)),
+        )
+        X.sort_indices()
+        if self.params.get("binary"):
+            X.data[:] = 1.0
+        if self.idf is not None:
+            X = X.multiply(np.asarray(self.idf)).tocsr()
+        if self.params.get("norm") == "l2":
+            norms = np.sqrt(np.asarray(X.multiply(X).sum(axis=1)).ravel())
+            norms[norms == 0] = 1.0
+            X = sp.diags(1.0 / norms) @ X
+        return X.tocsr()
+
+    def build_analyzer(self):
+        return self._analyzer
+
+    def get_feature_names_out(self):
+        return self.vocab.terms_by_column()
+
+
+def vectorizer_params(vec):
+    """Parámetros de un vectorizador de sklearn necesarios para reproducir su transform."""
+    is_tfidf = hasattr(vec, "idf_")
+    return {
+        "token_pattern": vec.token_pattern,
+        "ngram_range": list(vec.ngram_range),
+        "lowercase": bool(vec.lowercase),
+        "binary": bool(vec.binary),
+        "norm": vec.norm if is_tfidf else None,
+    }
+
+
+# ----------------------------- #
+# Escritura y lectura
+# ----------------------------- #
+def artifact_name(corpus_name, column, rep, ntag):
+    return f"{corpus_name}_{column.lower()}_{rep}_{ntag}"
+
+
+def _write_array(dirpath, name, arr):
+    np.save(os.path.join(dirpath, f"{name}.npy"), np.ascontiguousarray(arr))
+
+
+def doc_frequencies(X):
+    """Número de documentos en que aparece cada término (columnas con valor no nulo)."""
+    X = sp.csr_matrix(X)
+    return np.bincount(X.indices[X.data != 0], minlength=X.shape[1]).astype(np.int64)
+
+
+def smooth_idf(n_docs, doc_freq):
+    """idf a partir de las frecuencias de documento; misma fórmula que TfidfTransformer(smooth_idf=True)."""
+    return np.log((1.0 + n_docs) / (1.0 + np.asarray(doc_freq))) + 1.0
+
+
+def row_norms(X):
+    """Norma L2 de cada fila (la parte de la similitud coseno que no depende de la consulta)."""
+    X = sp.csr_matrix(X)
+    return np.sqrt(np.bincount(np.repeat(np.arange(X.shape[0]), np.diff(X.indptr)),
+                               weights=np.asarray(X.data, dtype=np.float64) ** 2, minlength=X.shape[0]))
+
+
+def save_store(path, X, vocab, params, meta, idf=None, extra=None, doc_freq=None):
+    """
+    Escribe un artefacto en formato store:
+        v-<artifact_id>/data.npy / indices.npy / indptr.npy   matriz CSR
+        v-<artifact_id>/vocab_blob.npy / vocab_offsets.npy / vocab_ids.npy   vocabulario (no hay con hashing: `vocab` None)
+        v-<artifact_id>/idf.npy                 (solo tfidf)
+        v-<artifact_id>/doc_freq.npy            documentos por término (actualización incremental)
+        v-<artifact_id>/row_norms.npy           norma L2 de cada fila (coseno como producto punto)
+        manifest.json                           forma, parámetros, `meta` y subdirectorio vigente (`arrays`)
+
+    Cada escritura crea su propio subdirectorio y luego reemplaza solo el
+    manifiesto, así que nunca se renombra ni se borra un archivo que otro
+    proceso pueda tener mapeado (en Windows eso falla). Se conserva además la
+    versión anterior, por si un lector acaba de leer el manifiesto viejo; las
+    más antiguas se borran cuando es posible (si siguen abiertas, en la
+    siguiente escritura).
+    """
+    X = sp.csr_matrix(X)
+    X.sort_indices()
+    artifact_id = uuid.uuid4().hex
+    arrays = f"{ARRAYS_PREFIX}{artifact_id}"
+    previous = read_store_manifest(path)
+    out = os.path.join(path, arrays)
+    os.makedirs(out)
+
+    _write_array(out, "data", X.data)
+    _write_array(out, "indices", X.indices)
+    _write_array(out, "indptr", X.indptr)
+    if vocab is not None:
+        _write_array(out, "vocab_blob", vocab.blob)
+        _write_array(out, "vocab_offsets", vocab.offsets)
+        _write_array(out, "vocab_ids", vocab.ids)
+    if idf is not None:
+        _write_array(out, "idf", idf)
+    _write_array(out, "doc_freq", doc_frequencies(X) if doc_freq is None else doc_freq)
+    _write_array(out, "row_norms", row_norms(X))
+
+    manifest = {
+        "format": STORE_FORMAT,
+        "version": STORE_VERSION,
+        "artifact_id": artifact_id,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "arrays": arrays,
+        "shape": list(X.shape),
+        "nnz": int(X.nnz),
+        "vectorizer": params,
+        "has_vocab": vocab is not None,
+        "has_idf": idf is not None,
+        "has_doc_freq": True,
+        "has_row_norms": True,
+        "meta": meta,
+    }
+    if extra:
+        manifest.update(extra)
+    tmp = os.path.join(path, f"{MANIFEST}.tmp-{uuid.uuid4().hex[:8]}")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, os.path.join(path, MANIFEST))
+
+    keep = {arrays}
+    if previous is not None:
+        keep.add(previous.get("arrays", ""))
+    _prune_arrays(path, keep)
+    return manifest
+
+
+def _prune_arrays(path, keep):
+    """Borra las versiones de arreglos de `path` que no están en `keep` ("" = formato sin subdirectorio)."""
+    for name in os.listdir(path):
+        full = os.path.join(path, name)
+        if name.startswith(ARRAYS_PREFIX) and os.path.isdir(full) and name not in keep:
+            shutil.rmtree(full, ignore_errors=True)
+        elif name.endswith(".npy") and "" not in keep:
+            try:
+                os.remove(full)
+            except OSError:
+                pass
+
+
+class VectorStore:
+    """Artefacto abierto: matriz CSR, vectorizador reconstruido y manifiesto."""
+
+    def __init__(self, path, manifest, X, vectorizer):
+        self.path = path
+        self.manifest = manifest
+        self.X = X
+        self.vectorizer = vectorizer
+        self.arrays_path = store_arrays_path(path, manifest)
+
+    @property
+    def meta(self):
+        return self.manifest.get("meta", {})
+
+    def doc_freq(self):
+        path = os.path.join(self.arrays_path, "doc_freq.npy")
+        if self.manifest.get("has_doc_freq") and os.path.exists(path):
+            return np.load(path)
+        return doc_frequencies(self.X)
+
+    def row_norms(self):
+        """Normas guardadas al escribir el artefacto (mapeadas), o calculadas si el artefacto es anterior."""
+        path = os.path.join(self.arrays_path, "row_norms.npy")
+        if self.manifest.get("has_row_norms") and os.path.exists(path):
+            return np.load(path, mmap_mode="r")
+        return row_norms(self.X)
+
+
+def verify_row_norms(path):
+    """Diferencia máxima entre las normas guardadas y las recalculadas desde X (None si no hay normas guardadas)."""
+    store = open_store(path)
+    if not store.manifest.get("has_row_norms"):
+        return None
+    expected = np.sqrt(np.asarray(store.X.multiply(store.X).sum(axis=1)).ravel())
+    return float(np.max(np.abs(store.row_norms() - expected), initial=0.0))
+
+
+def is_store(path):
+    return os.path.isfile(os.path.join(path, MANIFEST))
+
+
+def read_store_manifest(path):
+    """Manifiesto del artefacto en `path`, o None si no hay."""
+    if not is_store(path):
+        return None
+    with open(os.path.join(path, MANIFEST), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def store_arrays_path(path, manifest):
+    """Directorio con los .npy vigentes (los artefactos de versión 1 los tienen junto al manifiesto)."""
+    return os.path.join(path, manifest.get("arrays", ""))
+
+
+def artifact_signature(path):
+    """
+    Identifica la versión de un artefacto (artifact_id del store, o tamaño+mtime
+    del .pkl), para invalidar lo que se derive de él (índices, firmas, fragmentos).
+    """
+    manifest = read_store_manifest(path)
+    if manifest is not None:
+        return manifest["artifact_id"]
+    st = os.stat(path)
+    return f"{st.st_size}-{st.st_mtime_ns}"
+
+
+def open_store(path, mmap=True):
+    """Abre un artefacto; con `mmap=True` los arreglos se mapean (np.memmap) sin copiarlos a RAM."""
+    manifest_path = os.path.join(path, MANIFEST)
+    if not os.path.exists(manifest_path):
+        raise FileNotFoundError(f"No se encontró el archivo {manifest_path}")
+    with open(manifest_path, encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("format") != STORE_FORMAT:
+        raise ValueError(f"El directorio {path} no contiene un artefacto '{STORE_FORMAT}'.")
+    if manifest.get("version", 0) > STORE_VERSION:
+        raise ValueError(f"Versión de artefacto no soportada: {manifest.get('version')} (máx. {STORE_VERSION})")
+
+    mode = "r" if mmap else None
+    arrays = store_arrays_path(path, manifest)
+
+    def load(name):
+        return np.load(os.path.join(arrays, f"{name}.npy"), mmap_mode=mode)
+
+    X = sp.csr_matrix((load("data"), load("indices"), load("indptr")), shape=tuple(manifest["shape"]), copy=False)
+    if manifest["vectorizer"].get("hashing"):
+        from representation.hashing import HashedVectorizer
+        doc_freq = load("doc_freq") if manifest.get("has_doc_freq") else None
+        return VectorStore(path, manifest, X, HashedVectorizer.from_params(manifest["vectorizer"], doc_freq, X.shape[0]))
+    vocab = VocabTable(load("vocab_blob"), load("vocab_offsets"), load("vocab_ids"))
+    idf = load("idf") if manifest.get("has_idf") else None
+    return VectorStore(path, manifest, X, StoredVectorizer(manifest["vectorizer"], vocab, idf))
+
+
+def convert_pkl(pkl_path, out_path=None):
+    """Convierte un artefacto .pkl (formato anterior) al formato store."""
+    with open(pkl_path, "rb") as f:
+        payload = pickle.load(f)
+    vec = payload["vectorizer"]
+    out_path = out_path or os.path.splitext(pkl_path)[0]
+    idf = getattr(vec, "idf_", None)
+    if hasattr(vec, "bits"):
+        return save_store(out_path, payload["X"], None, vec.params(), payload.get("meta", {}), idf=idf)
+    return save_store(out_path, payload["X"], VocabTable.from_terms(vec.get_feature_names_out()),
+                      vectorizer_params(vec), payload.get("meta", {}), idf=idf)
+
+
+# ----------------------------- #
+# Argparse principal
+# ----------------------------- #
+def main():
+    parser = argparse.ArgumentParser(description="Convierte artefactos .pkl al formato store (mapeable en memoria) o muestra su manifiesto.")
+    parser.add_argument("--convert", metavar="DIR", help="Convierte todos los .pkl de DIR (p. ej. data/vectors).")
+    parser.add_argument("--info", metavar="PATH", help="Muestra el manifiesto de un artefacto.")
+    parser.add_argument("--verify", metavar="DIR", help="Comprueba las normas de fila guardadas de los artefactos de DIR.")
+    args = parser.parse_args()
+
+    if args.convert:
+        for pkl_path in sorted(glob.glob(os.path.join(args.convert, "*.pkl"))):
+            manifest = convert_pkl(pkl_path)
+            print(f"✅ {os.path.basename(pkl_path)} → {os.path.splitext(pkl_path)[0]}  ({manifest['shape'][0]}x{manifest['shape'][1]})")
+    if args.info:
+        print(json.dumps(open_store(args.info).manifest, ensure_ascii=False, indent=2))
+    if args.verify:
+        for path in sorted(glob.glob(os.path.join(args.verify, "*"))):
+            if not is_store(path):
+                continue
+            diff = verify_row_norms(path)
+            if diff is None:
+                print(f" {os.path.basename(path)}: sin normas guardadas (se calculan al cargar)")
+            else:
+                print(f" {'OK ' if diff < 1e-12 else 'ERR'} {os.path.basename(path)}  (dif. máx. {diff:.2e})")
+    if not args.convert and not args.info and not args.verify:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,22 @@
 import argparse
 import os
 import pickle
-import pandas as pd
-from sklearn.feature_extraction.text import CountVectorizer, TfidfVectorizer
-from normalization.normalization import normalize_text_nltk  
+from normalization.normalization import (
+    normalize_texts, configure_lemma_cache, lemma_cache,
+    file_sha256, read_normalized_manifest, write_normalized_manifest,
+)
+from representation.hashing import DEFAULT_BITS, HASHED_REPS, HashedVectorizer, base_rep, hash_corpus
+from representation.store import VocabTable, artifact_name, save_store, vectorizer_params
+
+FORMATS = ["store", "pkl", "both"]
+REPS = ["tfidf", "frequency", "binary"]
 
 # ----------------------------- #
 # Vectorizador base
 # ----------------------------- #
 def build_vectorizer(rep: str, ngram_range: tuple):
     """Crea un vectorizador según el tipo de representación."""
+    from sklearn.feature_extraction.text import CountVectorizer, TfidfVectorizer
     token_pattern = r"(?u)\w+|\?|\.|,|\¿|\!"
     if rep == "tfidf":
         return TfidfVectorizer(token_pattern=token_pattern, ngram_range=ngram_range)
@@ -20,75 +27,208 @@ def build_vectorizer(rep: str, ngram_range: tuple):
     else:
         raise ValueError(f"Tipo de vectorización no reconocido: {rep}")
 
+
+def derive_representation(counts, rep: str):
+    """
+    Obtiene la matriz de `rep` a partir de la matriz de conteos (misma salida
+    que ajustar el vectorizador correspondiente). Devuelve (X, idf o None).
+    """
+    if rep == "frequency":
+        return counts, None
+    elif rep == "binary":
+        X = counts.copy()
+        X.data[:] = 1
+        return X, None
+    elif rep == "tfidf":
+        from sklearn.feature_extraction.text import TfidfTransformer
+        transformer = TfidfTransformer()
+        return transformer.fit_transform(counts), transformer.idf_
+    else:
+        raise ValueError(f"Tipo de vectorización no reconocido: {rep}")
+
+
+def fitted_vectorizer(rep: str, ngram_range: tuple, vocabulary: dict, idf=None):
+    """Vectorizador de sklearn listo para transform, armado con el vocabulario (e idf) ya calculados."""
+    vec = build_vectorizer(rep, ngram_range)
+    vec.vocabulary_ = vocabulary
+    if idf is not None:
+        vec.idf_ = idf
+    return vec
+
 # ----------------------------- #
-# Vectorización por columna
+# Guardado de artefactos
 # ----------------------------- #
-def vectorize_column(df: pd.DataFrame, corpus_name: str, column: str, rep: str, ngram_range: tuple, outdir: str):
+def save_artifact(X, vec, features, df_index, corpus_name: str, column: str, rep: str, ngram_range: tuple,
+                  outdir: str, fmt: str = "store"):
     ntag = f"n{ngram_range[0]}-{ngram_range[1]}"
-    vec = build_vectorizer(rep, ngram_range)
-    X = vec.fit_transform(df[column].fillna(""))
-    features = vec.get_feature_names_out()
-
     os.makedirs(outdir, exist_ok=True)
-    fname = f"{corpus_name}_{column.lower()}_{rep}_{ntag}.pkl"
-    fpath = os.path.join(outdir, fname)
-
-    payload = {
-        "vectorizer": vec,
-        "X": X,
-        "feature_names": features,
-        "doc_ids": df.index.copy(),
-        "meta": {
-            "corpus": corpus_name,
-            "column": column,
-            "rep": rep,
-            "ngram_min": ngram_range[0],
-            "ngram_max": ngram_range[1],
-        },
+    name = artifact_name(corpus_name, column, rep, ntag)
+    meta = {
+        "corpus": corpus_name,
+        "column": column,
+        "rep": rep,
+        "ngram_min": ngram_range[0],
+        "ngram_max": ngram_range[1],
     }
 
-    with open(fpath, "wb") as f:
-        pickle.dump(payload, f)
+    # Formato store: arreglos .npy + manifiesto, se abre con np.memmap (ver representation/store.py)
+    if fmt in ("store", "both"):
+        fpath = os.path.join(outdir, name)
+        if isinstance(vec, HashedVectorizer):
+            # Sin vocabulario: basta con los parámetros del hashing y las frecuencias de documento.
+            save_store(fpath, X, None, vec.params(), meta, idf=vec.idf_, doc_freq=vec.doc_freq)
+        else:
+            save_store(fpath, X, VocabTable.from_terms(features), vectorizer_params(vec), meta,
+                       idf=getattr(vec, "idf_", None))
+        print(f"✅ {corpus_name} | {column} | {rep.upper()} | {ntag} → {fpath}")
+
+    # Formato anterior: un único .pkl con el vectorizador de sklearn
+    if fmt in ("pkl", "both"):
+        fpath = os.path.join(outdir, f"{name}.pkl")
+        payload = {
+            "vectorizer": vec,
+            "X": X,
+            "feature_names": features,
+            "doc_ids": df_index.copy(),
+            "meta": meta,
+        }
+        with open(fpath, "wb") as f:
+            pickle.dump(payload, f)
+        print(f"✅ {corpus_name} | {column} | {rep.upper()} | {ntag} → {fpath}")
 
-    print(f"✅ {corpus_name} | {column} | {rep.upper()} | {ntag} → {fpath}")
     print(f"   Documentos: {X.shape[0]} | Características: {X.shape[1]}")
 
+# ----------------------------- #
+# Vectorización por columna
+# ----------------------------- #
+def vectorize_field(df: "pd.DataFrame", corpus_name: str, column: str, reps, ngram_range: tuple, outdir: str,
+                    fmt: str = "store"):
+    """
+    Tokeniza y cuenta los n-gramas de la columna una sola vez y deriva de esa
+    matriz de conteos todas las representaciones pedidas (frecuencia, binaria, tfidf).
+    """
+    counter = build_vectorizer("frequency", ngram_range)
+    counts = counter.fit_transform(df[column].fillna(""))
+    features = counter.get_feature_names_out()
+
+    for rep in reps:
+        X, idf = derive_representation(counts, rep)
+        vec = fitted_vectorizer(rep, ngram_range, counter.vocabulary_, idf)
+        save_artifact(X, vec, features, df.index, corpus_name, column, rep, ngram_range, outdir, fmt)
+
+
+def vectorize_field_hashed(df: "pd.DataFrame", corpus_name: str, column: str, reps, ngram_range: tuple, outdir: str,
+                           fmt: str = "store", bits: int = DEFAULT_BITS, chunksize: int = 10_000):
+    """
+    Variante sin vocabulario de `vectorize_field` (reps "hashed-*"): cuenta los
+    n-gramas por bloques de `chunksize` filas en 2^bits columnas fijas y deriva
+    de esos conteos cada representación. La memoria del vectorizador no
+    depende del tamaño del corpus; la matriz de conteos sí (ver hash_corpus).
+    """
+    counts, hasher = hash_corpus(df[column].fillna(""), ngram_range, bits, chunksize)
+    for rep in reps:
+        vec = hasher.with_rep(base_rep(rep))
+        save_artifact(vec.weigh(counts), vec, None, df.index, corpus_name, column, rep, ngram_range, outdir, fmt)
+
+
+def vectorize_column(df: "pd.DataFrame", corpus_name: str, column: str, rep: str, ngram_range: tuple, outdir: str,
+                     fmt: str = "store", bits: int = DEFAULT_BITS):
+    if rep in HASHED_REPS:
+        vectorize_field_hashed(df, corpus_name, column, [rep], ngram_range, outdir, fmt, bits)
+    else:
+        vectorize_field(df, corpus_name, column, [rep], ngram_range, outdir, fmt)
+
+# ----------------------------- #
+# Corpus normalizado (caché)
+# ----------------------------- #
+def load_normalized_corpus(corpus_dir: str, corpus_name: str, fields, workers: int = 1, force: bool = False):
+    """
+    Devuelve el corpus con `fields` normalizados. Reutiliza
+    `{corpus}_normalized_corpus.csv` si su manifiesto indica que se generó a
+    partir del mismo archivo crudo (hash SHA-256) y ya contiene esas columnas;
+    en otro caso normaliza solo las columnas que falten y actualiza la caché.
+    Un CSV normalizado sin manifiesto (no lo escribió esta caché, p. ej. el
+    versionado en el repositorio) no se sobrescribe salvo con `force`.
+    """
+    import pandas as pd
+    raw_path = os.path.join(corpus_dir, f"{corpus_name}_raw_corpus.csv")
+    norm_path = os.path.join(corpus_dir, f"{corpus_name}_normalized_corpus.csv")
+    raw_hash = file_sha256(raw_path)
+
+    stored = read_normalized_manifest(norm_path)
+    manifest = None if force else stored
+    cached = manifest["columns"] if manifest and manifest.get("raw_sha256") == raw_hash else []
+
+    if cached:
+        df = pd.read_csv(norm_path, sep="\t", keep_default_na=False)
+    else:
+        df = pd.read_csv(raw_path, sep="\t").fillna("")
+
+    missing = [col for col in fields if col in df.columns and col not in cached]
+    if not missing:
+        print(f"\n♻️  Reutilizando corpus normalizado: {norm_path}")
+        return df
+
+    # 🔄 Normalizar texto según la configuración oficial (manteniendo puntuación)
+    for col in missing:
+        print(f"\n🔹 Normalizando {corpus_name} [{col}]...")
+        df[col] = normalize_texts(df[col].fillna("").astype(str), workers)
+
+    if os.path.exists(norm_path) and stored is None and not force:
+        print(f"   ⚠️  {norm_path} no tiene manifiesto: no se sobrescribe "
+              f"(use --force-normalize para reemplazarlo por la caché).")
+        return df
+
+    df.to_csv(norm_path, sep="\t", index=False)
+    write_normalized_manifest(norm_path, raw_path, list(cached) + missing, raw_sha256=raw_hash)
+    print(f"   Corpus normalizado guardado en: {norm_path}")
+    return df
+
 # ----------------------------- #
 # Vectorización general
 # ----------------------------- #
-def vectorize_corpus(basepath: str, corpus: str, field: str, rep: str, ngrams: str):
+def vectorize_corpus(basepath: str, corpus: str, field: str, rep: str, ngrams: str, fmt: str = "store",
+                     workers: int = 1, lemma_cache_path: str = None, force_normalize: bool = False,
+                     bits: int = DEFAULT_BITS, chunksize: int = 10_000):
     ngram_ranges = {
         "unigram": [(1, 1)],
         "bigram": [(2, 2)],
         "both": [(1, 1), (2, 2)],
     }
 
-    reps = [rep] if rep != "all" else ["tfidf", "frequency", "binary"]
+    families = {"all": REPS, "hashing": HASHED_REPS}
+    reps = families.get(rep, [rep])
+    vocab_reps = [r for r in reps if r not in HASHED_REPS]
+    hashed_reps = [r for r in reps if r in HASHED_REPS]
     fields = [field] if field != "Both" else ["Title", "Abstract"]
     corpora = [corpus] if corpus != "both" else ["arxiv", "pubmed"]
+    configure_lemma_cache(lemma_cache_path)
+
+    corpus_dir = os.path.join(basepath, "corpus")
+    outdir = os.path.join(basepath, "vectors")
 
     for corpus_name in corpora:
-        csv_path = os.path.join(basepath, f"corpus\\{corpus_name}_raw_corpus.csv")
+        csv_path = os.path.join(corpus_dir, f"{corpus_name}_raw_corpus.csv")
         if not os.path.exists(csv_path):
             print(f" No se encontró el archivo: {csv_path}")
             continue
 
-        df = pd.read_csv(csv_path, sep="\t")
-        df = df.fillna("")
+        df = load_normalized_corpus(corpus_dir, corpus_name, fields, workers, force_normalize)
 
-        # 🔄 Normalizar texto según la configuración oficial (manteniendo puntuación)
         for col in fields:
             if col not in df.columns:
                 print(f" Columna '{col}' no encontrada en {corpus_name}. Se omite.")
                 continue
 
-            print(f"\n🔹 Normalizando {corpus_name} [{col}]...")
-            df[col] = df[col].astype(str).apply(normalize_text_nltk)
+            for ngmin, ngmax in ngram_ranges[ngrams]:
+                if vocab_reps:
+                    vectorize_field(df, corpus_name, col, vocab_reps, (ngmin, ngmax), outdir, fmt)
+                if hashed_reps:
+                    vectorize_field_hashed(df, corpus_name, col, hashed_reps, (ngmin, ngmax), outdir, fmt,
+                                           bits, chunksize)
 
-            for rep_type in reps:
-                for ngmin, ngmax in ngram_ranges[ngrams]:
-                    outdir = os.path.join(basepath, "vectors")
-                    vectorize_column(df, corpus_name, col, rep_type, (ngmin, ngmax), outdir)
+    if lemma_cache_path:
+        lemma_cache.save(lemma_cache_path)
 
 # ----------------------------- #
 # Argparse principal
@@ -100,11 +240,22 @@ def main():
     parser.add_argument("--basepath", default=".", help="Ruta base donde están los corpus crudos y la carpeta vectors/.")
     parser.add_argument("--corpus", choices=["arxiv", "pubmed", "both"], default="both", help="Corpus a vectorizar.")
     parser.add_argument("--field", choices=["Title", "Abstract", "Both"], default="Both", help="Campo de texto a vectorizar.")
-    parser.add_argument("--rep", choices=["tfidf", "frequency", "binary", "all"], default="all", help="Tipo de vectorización.")
+    parser.add_argument("--rep", choices=REPS + HASHED_REPS + ["all", "hashing"], default="all",
+                        help="Tipo de vectorización. all: las tres con vocabulario | hashing: las tres sin vocabulario (hashed-*).")
     parser.add_argument("--ngrams", choices=["unigram", "bigram", "both"], default="both", help="Tipo de n-gramas.")
+    parser.add_argument("--format", choices=FORMATS, default="store",
+                        help="store: arreglos .npy mapeables + manifiesto | pkl: formato anterior | both.")
+    parser.add_argument("--hash-bits", type=int, default=DEFAULT_BITS,
+                        help="Con hashing: 2^k columnas fijas (el vectorizador no crece con el corpus).")
+    parser.add_argument("--chunksize", type=int, default=10_000, help="Con hashing: filas tokenizadas por bloque.")
+    parser.add_argument("--workers", type=int, default=1, help="Procesos para normalizar en paralelo (0 = todos los núcleos).")
+    parser.add_argument("--lemma-cache", default=None, help="Archivo JSON donde se carga/guarda la caché de lemas entre ejecuciones.")
+    parser.add_argument("--force-normalize", action="store_true",
+                        help="Ignora el corpus normalizado en caché y vuelve a normalizar desde el crudo.")
     args = parser.parse_args()
 
-    vectorize_corpus(args.basepath, args.corpus, args.field, args.rep, args.ngrams)
+    vectorize_corpus(args.basepath, args.corpus, args.field, args.rep, args.ngrams, args.format, args.workers,
+                     args.lemma_cache, args.force_normalize, args.hash_bits, args.chunksize)
 
 if __name__ == "__main__":
     main()
@@ -1,11 +1,16 @@
 import logging
 import re
 import xml.etree.ElementTree as ET
-from typing import List, Dict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+from itertools import count
+from typing import Iterable, Iterator, List, Dict, Optional
 from urllib.parse import urlencode
 
+from .checkpoint import Checkpoint, arxiv_key, doi_key
+from .concurrency import prefetch_ordered
 from .http import HttpClient
-from .io_utils import write_tsv, normalize_authors, ddmmyyyy
+from .io_utils import append_tsv, write_tsv, normalize_authors, ddmmyyyy
 
 log = logging.getLogger(__name__)
 
@@ -16,50 +21,78 @@ SECTION_LONG = {
     "cs.CV": "Computer Vision and Pattern Recognition",
     "cs.CR": "Cryptography and Security",
 }
+STREAM_CHUNK = 64 * 1024
+ARXIV_HEADER = ["DOI", "Title", "Authors", "Abstract", "Section", "Date"]
 
 def _strip_version(arxiv_id: str) -> str:
     return re.sub(r"v\d+$", "", arxiv_id.strip())
 
-def _parse_atom(xml_text: str) -> List[Dict[str, object]]:
-    ns = {
-        "atom": "http://www.w3.org/2005/Atom",
-        "arxiv": "http://arxiv.org/schemas/atom",
+ATOM_NS = {
+    "atom": "http://www.w3.org/2005/Atom",
+    "arxiv": "http://arxiv.org/schemas/atom",
+}
+_ENTRY_TAG = f"{{{ATOM_NS['atom']}}}entry"
+
+def _entry_dict(entry: ET.Element) -> Dict[str, object]:
+    ns = ATOM_NS
+    id_txt = (entry.findtext("atom:id", default="", namespaces=ns) or "").strip()
+    m = re.search(r"(\d{4}\.\d{4,5}(?:v\d+)?)$", id_txt)
+    arxiv_id = m.group(1) if m else id_txt.rsplit("/", 1)[-1]
+
+    title = (entry.findtext("atom:title", default="", namespaces=ns) or "").strip()
+
+    authors: List[str] = []
+    for a in entry.findall("atom:author", ns):
+        nm = (a.findtext("atom:name", default="", namespaces=ns) or "").strip()
+        if nm:
+            authors.append(nm)
+
+    summary = (entry.findtext("atom:summary", default="", namespaces=ns) or "").strip()
+    published = (entry.findtext("atom:published", default="", namespaces=ns) or "").strip()
+
+    doi = ""
+    doi_el = entry.find("arxiv:doi", ns)
+    if doi_el is not None and doi_el.text:
+        doi = doi_el.text.strip()
+
+    return {
+        "id": arxiv_id,
+        "title": title,
+        "authors": authors,
+        "summary": summary,
+        "published": published,
+        "doi": doi,
     }
-    out: List[Dict[str, object]] = []
-    root = ET.fromstring(xml_text)
-
-    for entry in root.findall("atom:entry", ns):
-        id_txt = (entry.findtext("atom:id", default="", namespaces=ns) or "").strip()
-        m = re.search(r"(\d{4}\.\d{4,5}(?:v\d+)?)$", id_txt)
-        arxiv_id = m.group(1) if m else id_txt.rsplit("/", 1)[-1]
-
-        title = (entry.findtext("atom:title", default="", namespaces=ns) or "").strip()
-
-        authors: List[str] = []
-        for a in entry.findall("atom:author", ns):
-            nm = (a.findtext("atom:name", default="", namespaces=ns) or "").strip()
-            if nm:
-                authors.append(nm)
-
-        summary = (entry.findtext("atom:summary", default="", namespaces=ns) or "").strip()
-        published = (entry.findtext("atom:published", default="", namespaces=ns) or "").strip()
-
-        doi = ""
-        doi_el = entry.find("arxiv:doi", ns)
-        if doi_el is not None and doi_el.text:
-            doi = doi_el.text.strip()
-
-        out.append({
-            "id": arxiv_id,
-            "title": title,
-            "authors": authors,
-            "summary": summary,
-            "published": published,
-            "doi": doi,
-        })
-    return out
-
-def _api_query(http: HttpClient, cat: str, start: int, max_results: int) -> List[Dict[str, object]]:
+
+def iter_atom_entries(chunks: Iterable) -> Iterator[Dict[str, object]]:
+    """
+    Parser incremental de un feed Atom: recibe el cuerpo en trozos (bytes o
+    str), entrega cada <entry> en cuanto se cierra y lo descarta del árbol,
+    de modo que nunca se mantiene la respuesta completa en memoria.
+    """
+    parser = ET.XMLPullParser(events=("start", "end"))
+    root = None
+
+    def drain():
+        nonlocal root
+        for event, elem in parser.read_events():
+            if root is None:
+                root = elem
+            elif event == "end" and elem.tag == _ENTRY_TAG:
+                yield _entry_dict(elem)
+                root.clear()
+
+    for chunk in chunks:
+        parser.feed(chunk)
+        yield from drain()
+    parser.close()
+    yield from drain()
+
+def _parse_atom(xml_text: str) -> List[Dict[str, object]]:
+    return list(iter_atom_entries([xml_text]))
+
+def _api_stream(http: HttpClient, cat: str, start: int, max_results: int,
+                api_url: str = ARXIV_API) -> Iterator[Dict[str, object]]:
     params = {
         "search_query": f"cat:{cat}",
         "sortBy": "submittedDate",
@@ -67,27 +100,54 @@ def _api_query(http: HttpClient, cat: str, start: int, max_results: int) -> List
         "start": start,
         "max_results": max_results,
     }
-    url = f"{ARXIV_API}?{urlencode(params)}"
-    r = http.get(url, raise_for_status=True)
+    url = f"{api_url}?{urlencode(params)}"
+    r = http.get(url, raise_for_status=True, stream=True)
     log.debug("[arXiv API] %s -> %s", url, r.status_code)
-    return _parse_atom(r.text)
+    try:
+        yield from iter_atom_entries(r.iter_content(chunk_size=STREAM_CHUNK))
+    finally:
+        r.close()
 
-def collect_arxiv(http: HttpClient, per_section_exact: int = 100, page_size: int = 200) -> List[List[str]]:
-    all_rows: List[List[str]] = []
+def _api_query(http: HttpClient, cat: str, start: int, max_results: int, api_url: str = ARXIV_API) -> List[Dict[str, object]]:
+    return list(_api_stream(http, cat, start, max_results, api_url))
 
-    for sec in ARXIV_SECTIONS:
-        long_name = SECTION_LONG.get(sec, sec)
-        rows: List[List[str]] = []
-        seen = set()
-        start = 0
+def _entry_row(e: Dict[str, object], long_name: str) -> Optional[List[str]]:
+    """Fila del TSV para una entrada, o None si no tiene abstract."""
+    abstract = (e.get("summary") or "").strip()
+    if not abstract:
+        return None  # abstract obligatorio
 
-        while len(rows) < per_section_exact:
-            entries = _api_query(http, sec, start=start, max_results=page_size)
-            if not entries:
+    title = (e.get("title") or "").strip()
+    authors = normalize_authors([str(x) for x in (e.get("authors") or [])])
+    raw_date = (e.get("published") or "").strip()
+    date = ddmmyyyy(raw_date)
+    doi = (e.get("doi") or "").strip()
+    if not doi:
+        base_id = _strip_version(e["id"])
+        doi = f"10.48550/arXiv.{base_id}"
+
+    return [doi, title, authors, abstract, long_name, date]
+
+def iter_section_rows(sec: str, pages: Iterator[Iterable[Dict[str, object]]], per_section_exact: int) -> Iterator[List[str]]:
+    """
+    Consume páginas de `sec` en orden y entrega filas válidas y sin repetir a
+    medida que se decodifican, hasta `per_section_exact`. Una página vacía
+    indica que no hay más resultados.
+    """
+    long_name = SECTION_LONG.get(sec, sec)
+    seen = set()
+    n = 0
+
+    with closing(pages):
+        while n < per_section_exact:
+            entries = next(pages, None)
+            if entries is None:
                 break
 
+            empty = True
             for e in entries:
-                if len(rows) >= per_section_exact:
+                empty = False
+                if n >= per_section_exact:
                     break
 
                 arxiv_id = e["id"]
@@ -95,30 +155,128 @@ def collect_arxiv(http: HttpClient, per_section_exact: int = 100, page_size: int
                     continue
                 seen.add(arxiv_id)
 
-                abstract = (e.get("summary") or "").strip()
-                if not abstract:
-                    continue  # abstract obligatorio
+                row = _entry_row(e, long_name)
+                if row is None:
+                    continue
 
-                title = (e.get("title") or "").strip()
-                authors = normalize_authors([str(x) for x in (e.get("authors") or [])])
-                raw_date = (e.get("published") or "").strip()
-                date = ddmmyyyy(raw_date)
-                doi = (e.get("doi") or "").strip()
-                if not doi:
-                    base_id = _strip_version(arxiv_id)
-                    doi = f"10.48550/arXiv.{base_id}"
+                n += 1
+                yield row
 
-                rows.append([doi, title, authors, abstract, long_name, date])
+            if hasattr(entries, "close"):
+                entries.close()  # libera la conexión si la página no se leyó completa
+            if empty:
+                break
 
-            start += page_size
+    if n < per_section_exact:
+        log.warning("[arXiv API] WARNING: %s solo recolectó %d/%d", sec, n, per_section_exact)
 
-        if len(rows) < per_section_exact:
-            log.warning("[arXiv API] WARNING: %s solo recolectó %d/%d", sec, len(rows), per_section_exact)
+def _section_rows(sec: str, pages: Iterator[Iterable[Dict[str, object]]], per_section_exact: int) -> List[List[str]]:
+    return list(iter_section_rows(sec, pages, per_section_exact))
 
-        all_rows.extend(rows[:per_section_exact])
+def _section_pages(http: HttpClient, sec: str, page_size: int, api_url: str = ARXIV_API):
+    # Cada página es un generador: la solicitud se hace solo cuando se pide la página.
+    start = 0
+    while True:
+        yield _api_stream(http, sec, start=start, max_results=page_size, api_url=api_url)
+        start += page_size
 
+def iter_arxiv(http: HttpClient, per_section_exact: int = 100, page_size: int = 200,
+               api_url: str = ARXIV_API) -> Iterator[List[str]]:
+    """Filas de todas las secciones, en orden, según se van recibiendo (p. ej. para `save_arxiv_corpus`)."""
+    for sec in ARXIV_SECTIONS:
+        yield from iter_section_rows(sec, _section_pages(http, sec, page_size, api_url), per_section_exact)
+
+def collect_arxiv(http: HttpClient, per_section_exact: int = 100, page_size: int = 200,
+                  api_url: str = ARXIV_API) -> List[List[str]]:
+    return list(iter_arxiv(http, per_section_exact, page_size, api_url))
+
+def collect_arxiv_concurrent(http: HttpClient, per_section_exact: int = 100, page_size: int = 200,
+                             workers: int = 4, prefetch: int = 0, api_url: str = ARXIV_API) -> List[List[str]]:
+    """
+    Igual que `collect_arxiv` (mismas filas y en el mismo orden), pero las
+    secciones se recorren en paralelo y cada una pide hasta `prefetch` páginas
+    por adelantado (por defecto, las necesarias para la cuota) en un pool de
+    `workers` hilos. El límite por host y la tasa los impone `http.limiter`.
+    """
+    window = prefetch or max(1, -(-per_section_exact // page_size))
+
+    def fetch(job):
+        sec, start = job
+        return _api_query(http, sec, start=start, max_results=page_size, api_url=api_url)
+
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="arxiv-page") as pages_pool, \
+         ThreadPoolExecutor(max_workers=len(ARXIV_SECTIONS), thread_name_prefix="arxiv-sec") as sections_pool:
+
+        def section(sec):
+            starts = ((sec, start) for start in count(0, page_size))
+            return _section_rows(sec, prefetch_ordered(pages_pool, fetch, starts, window), per_section_exact)
+
+        futures = [sections_pool.submit(section, sec) for sec in ARXIV_SECTIONS]
+        all_rows: List[List[str]] = []
+        for fut in futures:
+            all_rows.extend(fut.result())
     return all_rows
 
-def save_arxiv_corpus(rows: List[List[str]], out_path: str = "arxiv_raw_corpus.csv") -> None:
-    header = ["DOI", "Title", "Authors", "Abstract", "Section", "Date"]
-    write_tsv(out_path, rows, header)
+def collect_arxiv_checkpointed(http: HttpClient, checkpoint: Checkpoint, out_path: str,
+                               per_section_exact: int = 100, page_size: int = 200, resume: bool = False,
+                               api_url: str = ARXIV_API) -> int:
+    """
+    Recolección reanudable: por cada sección pagina desde el cursor guardado,
+    omite los artículos ya vistos en la sección en ejecuciones anteriores (id de arXiv o DOI)
+    y agrega al final de `out_path` solo las filas nuevas, página a página.
+    Devuelve cuántas filas se agregaron en esta llamada.
+    """
+    # Lo visto se guarda por sección (como en collect_arxiv): un artículo con
+    # listado cruzado puede aparecer en varias secciones, pero nunca dos veces en la misma.
+    section_code = {long_name: sec for sec, long_name in SECTION_LONG.items()}
+    checkpoint.start("arxiv", resume)
+    checkpoint.sync_tsv(lambda row: f"arxiv:{section_code.get(row.get('Section'), row.get('Section'))}", out_path)
+    added = 0
+
+    for sec in ARXIV_SECTIONS:
+        long_name = SECTION_LONG.get(sec, sec)
+        start, collected, done = checkpoint.cursor("arxiv", sec, initial=0)
+        section_seen = set()  # como en iter_section_rows: ids ya considerados en esta ejecución
+        if collected:
+            log.info("[arXiv API] %s: reanudando en start=%d (%d/%d ya recolectados)", sec, start, collected, per_section_exact)
+
+        while not done and collected < per_section_exact:
+            entries = _api_query(http, sec, start=start, max_results=page_size, api_url=api_url)
+            if not entries:
+                done = True
+                checkpoint.commit_page("arxiv", sec, start, collected, done, [], seen_source=f"arxiv:{sec}")
+                break
+
+            rows: List[List[str]] = []
+            keys: List[str] = []
+            consumed = 0
+            for e in entries:
+                if collected + len(rows) >= per_section_exact:
+                    break
+                consumed += 1
+                if e["id"] in section_seen:
+                    continue
+                section_seen.add(e["id"])
+                row = _entry_row(e, long_name)
+                if row is None:
+                    continue
+                row_ids = [arxiv_key(e["id"]), doi_key(row[0])]
+                if checkpoint.is_seen(f"arxiv:{sec}", row_ids) or any(k in keys for k in row_ids):
+                    continue
+                rows.append(row)
+                keys.extend(row_ids)
+
+            append_tsv(out_path, rows, ARXIV_HEADER)
+            collected += len(rows)
+            added += len(rows)
+            # Si la página no se recorrió entera, se vuelve a pedir al reanudar (lo ya visto se omite).
+            start = start + page_size if consumed == len(entries) else start
+            checkpoint.commit_page("arxiv", sec, start, collected, done, keys, seen_source=f"arxiv:{sec}")
+
+        if collected < per_section_exact:
+            log.warning("[arXiv API] WARNING: %s solo recolectó %d/%d", sec, collected, per_section_exact)
+
+    return added
+
+def save_arxiv_corpus(rows: Iterable[List[str]], out_path: str = "arxiv_raw_corpus.csv") -> int:
+    return write_tsv(out_path, rows, ARXIV_HEADER)
@@ -0,0 +1,173 @@
+import argparse
+import html
+import random
+import re
+import time
+from bs4 import BeautifulSoup
+from scraper.pubmed import (
+    _page_rows, _page_rows_soup, _rows_from_chunks, _split_records, _trending_url,
+    clean_pubmed_abstract, normalize_authors, FIELD_KEYS,
+)
+from scraper.io_utils import ddmmyyyy
+
+
+# ---------------------- #
+#  Implementación previa #
+# ---------------------- #
+def legacy_parse_record(text):
+    """`_parse_medline_record` tal como estaba antes del tokenizador (re.match / re.search por línea)."""
+    data = {k: [] for k in FIELD_KEYS}
+    current_key = None
+    for ln in text.splitlines():
+        m = re.match(r"^([A-Z]{2,4})\s*-\s(.*)$", ln)
+        if m:
+            key, val = m.group(1).strip(), m.group(2).rstrip()
+            current_key = key if key in FIELD_KEYS else None
+            if current_key:
+                data[current_key].append(val)
+        else:
+            if current_key in ("TI", "AB"):
+                data[current_key].append(ln.rstrip())
+
+    def year(t):
+        m = re.search(r"(19|20)\d{2}", t)
+        return f"01/01/{m.group(0)}" if m else ""
+
+    def pick_doi(values):
+        for v in values:
+            m = re.search(r"(10\.\d{4,9}/\S+)", v)
+            if m:
+                return m.group(1).rstrip(").;]")
+        return ""
+
+    title = " ".join(data["TI"]).strip()
+    abstract = clean_pubmed_abstract(" ".join(data["AB"]).strip())
+    journal = " ".join(data["JT"]).strip()
+    doi = pick_doi(data["LID"]) or pick_doi(data["AID"])
+    date = ddmmyyyy(" ".join(data["DP"]).strip()) or year(doi) or year(journal) or year(title) or year(abstract)
+    return {"title": title, "abstract": abstract, "authors": [a.strip() for a in data["AU"] if a.strip()],
+            "journal": journal, "date": date, "doi": doi}
+
+
+def legacy_page_rows(html_text):
+    soup = BeautifulSoup(html_text, "html.parser")
+    rows = []
+    for pre in soup.select("pre.search-results-chunk"):
+        for rec_text in _split_records(pre.get_text("\n")):
+            meta = legacy_parse_record(rec_text)
+            if meta["abstract"] and meta["date"] and meta["doi"]:
+                rows.append([meta["doi"], meta["title"], normalize_authors(meta["authors"]),
+                             meta["abstract"], meta["journal"], meta["date"]])
+    return rows
+
+
+# ---------------------- #
+#  Página de prueba      #
+# ---------------------- #
+WORDS = ("protein cell patients clinical model expression cancer risk analysis data treatment "
+         "gene response study results method association brain immune therapy signal").split()
+
+
+def _wrap(tag, text, width=82):
+    """Campo MEDLINE con líneas de continuación de 6 espacios, como en format=pubmed."""
+    lines, line = [], f"{tag:<4}- "
+    for word in text.split():
+        if len(line) + len(word) + 1 > width:
+            lines.append(line.rstrip())
+            line = "      "
+        line += word + " "
+    lines.append(line.rstrip())
+    return lines
+
+
+def synthetic_page(n_records, rng):
+    """Página con la misma estructura que /trending/?format=pubmed (registros MEDLINE dentro de <pre>)."""
+    records = []
+    for i in range(n_records):
+        lines = [f"PMID- {38000000 + i}", "OWN - NLM", "STAT- Publisher", f"DP  - 2024 {rng.choice(['Jan', 'Feb', 'Mar'])} {rng.randint(1, 28)}"]
+        lines += _wrap("TI", " ".join(rng.choices(WORDS, k=rng.randint(8, 20))) + ".")
+        if rng.random() > 0.1:
+            abstract = " ".join(f"{sec}: " + " ".join(rng.choices(WORDS, k=40)) + "."
+                                for sec in ("BACKGROUND", "METHODS", "RESULTS", "CONCLUSIONS"))
+            lines += _wrap("AB", abstract.replace("risk", "risk &lt;5% &amp; more"))
+        for _ in range(rng.randint(1, 8)):
+            lines.append(f"FAU - {rng.choice(WORDS).title()}, {rng.choice('ABCDEFG')}")
+            lines.append(f"AU  - {rng.choice(WORDS).title()} {rng.choice('ABCDEFG')}")
+        lines.append("LA  - eng")
+        lines.append("PT  - Journal Article")
+        lines.append(f"JT  - Journal of {rng.choice(WORDS).title()} Research")
+        if rng.random() > 0.1:
+            lines.append(f"LID - 10.{rng.randint(1000, 99999)}/j.{rng.choice(WORDS)}.2024.{i} [doi]")
+        lines.append(f"AID - S{rng.randint(10**6, 10**7)} [pii]")
+        lines.append("SO  - J Res. 2024 Jan;12(3):100-110.")
+        records.append("\n".join(lines))
+    body = "\n\n".join(records)
+    return ("<!DOCTYPE html><html><head><title>Trending - PubMed</title></head><body>"
+            "<div class='search-results'><pre class=\"search-results-chunk\">\n" + body + "\n</pre></div>"
+            "<footer>" + "<a href='#'>link</a>" * 200 + "</footer></body></html>")
+
+
+# ---------------------- #
+#  Utilidades de medida  #
+# ---------------------- #
+def best_time(func, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def chunked(text, size):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+# ---------------------- #
+#       ARGPARSE         #
+# ---------------------- #
+def main():
+    parser = argparse.ArgumentParser(description="Compara el parseo de páginas MEDLINE de PubMed: BeautifulSoup (anterior) vs. tokenizador de una pasada.")
+    parser.add_argument("--fixture", default=None, help="Página guardada de /trending/?format=pubmed (si se omite, se genera una sintética).")
+    parser.add_argument("--save-fixture", default=None, metavar="PATH", help="Descarga la página 1 de Trending en PATH y la usa como fixture.")
+    parser.add_argument("--records", type=int, default=200, help="Registros de la página sintética.")
+    parser.add_argument("--chunk", type=int, default=64 * 1024, help="Tamaño de trozo para simular la lectura en streaming.")
+    parser.add_argument("--repeat", type=int, default=5, help="Repeticiones por medida (se reporta la mejor).")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.save_fixture:
+        from scraper.http import HttpClient
+        page = HttpClient().get(_trending_url(1, 100)).text
+        with open(args.save_fixture, "w", encoding="utf-8") as f:
+            f.write(page)
+        args.fixture = args.save_fixture
+    if args.fixture:
+        with open(args.fixture, encoding="utf-8") as f:
+            page = f.read()
+    else:
+        page = synthetic_page(args.records, random.Random(args.seed))
+
+    n_records = html.unescape(page).count("PMID- ")
+    reference = legacy_page_rows(page)
+    candidates = {
+        "anterior (bs4)": lambda: legacy_page_rows(page),
+        "bs4 + regex compilados": lambda: _page_rows_soup(page),
+        "tokenizador": lambda: _page_rows(page),
+        "tokenizador streaming": lambda: _rows_from_chunks(chunked(page, args.chunk)),
+    }
+    for name, func in candidates.items():
+        if (func() or []) != reference:
+            raise AssertionError(f"{name}: las filas no coinciden con la implementación anterior")
+
+    print(f"Página: {len(page) / 1024:.0f} KiB | {n_records} registros | {len(reference)} filas válidas")
+    print(f"{'implementación':>24} | {'tiempo':>10} | {'registros/s':>12} | {'x':>6}")
+    base = None
+    for name, func in candidates.items():
+        t = best_time(func, args.repeat)
+        base = base or t
+        print(f"{name:>24} | {t * 1e3:>8.2f}ms | {n_records / t:>12.0f} | {base / t:>5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
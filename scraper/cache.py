@@ -0,0 +1,179 @@
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from typing import Dict, Optional
+
+import requests
+
+CACHE_VERSION = 1
+BODY_SUFFIX = ".body"
+META_SUFFIX = ".json"
+
+
+def cache_key(url: str, params=None) -> str:
+    """Clave estable de una solicitud GET: hash de la URL final (con `params` ya codificados)."""
+    full_url = requests.Request("GET", url, params=params).prepare().url
+    return hashlib.sha256(full_url.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    Caché de respuestas HTTP en disco: por cada clave, `{clave}.body` con el
+    cuerpo tal cual y `{clave}.json` con URL, cabeceras de validación (ETag,
+    Last-Modified) y fecha de guardado.
+
+    - Una entrada es fresca durante `ttl` segundos; pasado ese tiempo se
+      revalida con If-None-Match / If-Modified-Since (ver HttpClient.get).
+    - Si el tamaño total supera `max_bytes`, se eliminan las entradas usadas
+      hace más tiempo (la fecha de uso es el mtime del .json).
+    """
+
+    def __init__(self, directory: str, ttl: float = 24 * 3600, max_bytes: int = 512 * 1024 * 1024):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.stats = {"hits": 0, "revalidated": 0, "misses": 0, "stored": 0, "evicted": 0}
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._index: Dict[str, list] = {}  # clave -> [tamaño, último uso]
+        for name in os.listdir(directory):
+            if name.endswith(META_SUFFIX):
+                key = name[:-len(META_SUFFIX)]
+                body = self._path(key, BODY_SUFFIX)
+                if os.path.exists(body):
+                    self._index[key] = [os.path.getsize(body), os.path.getmtime(self._path(key, META_SUFFIX))]
+
+    def _path(self, key: str, suffix: str) -> str:
+        return os.path.join(self.directory, key + suffix)
+
+    def count(self, name: str, value: int = 1) -> None:
+        """Suma a `stats[name]`; el cliente HTTP se comparte entre hilos."""
+        with self._lock:
+            self.stats[name] = self.stats.get(name, 0) + value
+
+    @property
+    def total_bytes(self) -> int:
+        return sum(size for size, _ in self._index.values())
+
+    # ---- lectura ----
+    def lookup(self, key: str) -> Optional[dict]:
+        """Metadatos de la entrada (con `fresh` calculado según el TTL) o None."""
+        try:
+            with open(self._path(key, META_SUFFIX), encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if meta.get("version") != CACHE_VERSION or not os.path.exists(self._path(key, BODY_SUFFIX)):
+            return None
+        meta["fresh"] = self.ttl is not None and time.time() - meta.get("stored_at", 0) < self.ttl
+        return meta
+
+    def validators(self, meta: dict) -> Dict[str, str]:
+        headers = {}
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+        return headers
+
+    def response(self, key: str, meta: dict) -> requests.Response:
+        """Respuesta construida desde disco; el cuerpo se lee del archivo (también con iter_content)."""
+        r = requests.Response()
+        r.status_code = meta.get("status", 200)
+        r.url = meta["url"]
+        r.headers.update(meta.get("headers", {}))
+        r.encoding = meta.get("encoding")
+        r.raw = open(self._path(key, BODY_SUFFIX), "rb")
+        r.from_cache = True
+        now = time.time()
+        with self._lock:
+            if key in self._index:
+                self._index[key][1] = now
+        try:
+            os.utime(self._path(key, META_SUFFIX), (now, now))
+        except OSError:
+            pass
+        return r
+
+    # ---- escritura ----
+    def store(self, key: str, r: requests.Response, chunk_size: int = 64 * 1024) -> requests.Response:
+        """
+        Guarda el cuerpo de `r` en disco a medida que se descarga (no se
+        retiene completo en memoria) y devuelve la respuesta servida desde la caché.
+        """
+        tmp = f"{self._path(key, BODY_SUFFIX)}.tmp-{uuid.uuid4().hex[:8]}"
+        size = 0
+        try:
+            with open(tmp, "wb") as f:
+                for chunk in r.iter_content(chunk_size=chunk_size):
+                    f.write(chunk)
+                    size += len(chunk)
+        except BaseException:
+            os.remove(tmp)
+            raise
+        finally:
+            r.close()
+        os.replace(tmp, self._path(key, BODY_SUFFIX))
+        meta = {
+            "version": CACHE_VERSION,
+            "url": r.url,
+            "status": r.status_code,
+            "headers": {k: v for k, v in r.headers.items()
+                        if k.lower() in ("content-type", "etag", "last-modified", "date")},
+            "encoding": r.encoding,
+            "etag": r.headers.get("ETag"),
+            "last_modified": r.headers.get("Last-Modified"),
+            "stored_at": time.time(),
+            "size": size,
+        }
+        self._write_meta(key, meta)
+        with self._lock:
+            self._index[key] = [size, time.time()]
+            self.stats["stored"] += 1
+            self._evict(keep=key)
+        return self.response(key, meta)
+
+    def refresh(self, key: str, meta: dict, r: requests.Response) -> None:
+        """Tras un 304: la entrada vuelve a ser fresca y se actualizan sus validadores."""
+        meta = {k: v for k, v in meta.items() if k != "fresh"}
+        meta["stored_at"] = time.time()
+        meta["etag"] = r.headers.get("ETag") or meta.get("etag")
+        meta["last_modified"] = r.headers.get("Last-Modified") or meta.get("last_modified")
+        self._write_meta(key, meta)
+
+    def _write_meta(self, key: str, meta: dict) -> None:
+        tmp = f"{self._path(key, META_SUFFIX)}.tmp-{uuid.uuid4().hex[:8]}"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(tmp, self._path(key, META_SUFFIX))
+
+    def _evict(self, keep: Optional[str] = None) -> None:
+        total = self.total_bytes
+        if self.max_bytes is None or total <= self.max_bytes:
+            return
+        for key, (size, _) in sorted(self._index.items(), key=lambda kv: kv[1][1]):
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            for suffix in (BODY_SUFFIX, META_SUFFIX):
+                try:
+                    os.remove(self._path(key, suffix))
+                except OSError:
+                    pass
+            del self._index[key]
+            total -= size
+            self.stats["evicted"] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            for key in list(self._index):
+                for suffix in (BODY_SUFFIX, META_SUFFIX):
+                    try:
+                        os.remove(self._path(key, suffix))
+                    except OSError:
+                        pass
+            self._index.clear()
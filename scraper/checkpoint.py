@@ -0,0 +1,128 @@
+import csv
+import re
+import sqlite3
+from pathlib import Path
+from typing import Iterable, Tuple
+
+_ARXIV_DOI = re.compile(r"^10\.48550/arxiv\.(.+)$", re.IGNORECASE)
+
+
+def doi_key(doi: str) -> str:
+    return f"doi:{str(doi).strip().lower()}"
+
+
+def arxiv_key(arxiv_id: str) -> str:
+    base_id = re.sub(r"v\d+$", "", str(arxiv_id).strip())
+    return f"arxiv:{base_id}"
+
+
+def row_keys(doi: str) -> list:
+    """Claves de deduplicación de una fila ya guardada (por su DOI; los DOI de arXiv dan también el id)."""
+    keys = [doi_key(doi)]
+    m = _ARXIV_DOI.match(str(doi).strip())
+    if m:
+        keys.append(arxiv_key(m.group(1)))
+    return keys
+
+
+class Checkpoint:
+    """
+    Estado de recolección persistente en SQLite, para reanudar y no repetir artículos:
+
+        cursors(source, key, position, collected, done)
+            posición de paginación (offset de arXiv por sección, página de PubMed),
+            filas recolectadas en la ejecución actual y si ya no hay más resultados.
+        seen(source, key)
+            DOIs (`doi:...`) e ids de arXiv (`arxiv:...`) ya escritos en el TSV
+            (en arXiv, `source` es `arxiv:<sección>`).
+
+    Cada página se confirma en una sola transacción (`commit_page`) después de
+    agregar sus filas al TSV.
+    """
+
+    def __init__(self, path: str):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS cursors (
+                source TEXT NOT NULL,
+                key TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                collected INTEGER NOT NULL DEFAULT 0,
+                done INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (source, key)
+            );
+            CREATE TABLE IF NOT EXISTS seen (
+                source TEXT NOT NULL,
+                key TEXT NOT NULL,
+                PRIMARY KEY (source, key)
+            );
+        """)
+        self.conn.commit()
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ---- ejecución ----
+    def start(self, source: str, resume: bool) -> None:
+        """Sin `resume`, una ejecución nueva vuelve a paginar desde el principio (lo ya visto se sigue omitiendo)."""
+        if not resume:
+            with self.conn:
+                self.conn.execute("DELETE FROM cursors WHERE source = ?", (source,))
+
+    def cursor(self, source: str, key: str, initial: int) -> Tuple[int, int, bool]:
+        """(posición, filas recolectadas, terminado) del cursor `key`."""
+        row = self.conn.execute(
+            "SELECT position, collected, done FROM cursors WHERE source = ? AND key = ?", (source, key)
+        ).fetchone()
+        if row is None:
+            return initial, 0, False
+        return row[0], row[1], bool(row[2])
+
+    # ---- deduplicación ----
+    def is_seen(self, source: str, keys: Iterable[str]) -> bool:
+        keys = list(keys)
+        if not keys:
+            return False
+        marks = ",".join("?" * len(keys))
+        return self.conn.execute(
+            f"SELECT 1 FROM seen WHERE source = ? AND key IN ({marks}) LIMIT 1", (source, *keys)
+        ).fetchone() is not None
+
+    def sync_tsv(self, source, path: str) -> int:
+        """
+        Marca como vistos los DOIs del TSV existente. Cubre un corte entre la
+        escritura del TSV y la confirmación de la página, y TSV generados sin checkpoint.
+        `source` puede ser una función fila -> source (p. ej. una por sección de arXiv).
+        """
+        p = Path(path)
+        if not p.exists():
+            return 0
+        pairs = []
+        with p.open(encoding="utf-8", newline="") as f:
+            for row in csv.DictReader(f, delimiter="\t"):
+                doi = (row.get("DOI") or "").strip()
+                if doi:
+                    src = source(row) if callable(source) else source
+                    pairs.extend((src, k) for k in row_keys(doi))
+        with self.conn:
+            self.conn.executemany("INSERT OR IGNORE INTO seen VALUES (?, ?)", pairs)
+        return len(pairs)
+
+    def commit_page(self, source: str, key: str, position: int, collected: int, done: bool,
+                    seen_keys: Iterable[str], seen_source: str = None) -> None:
+        """Guarda el cursor y las claves vistas de una página (por defecto, bajo el mismo `source`)."""
+        seen_source = seen_source or source
+        with self.conn:
+            self.conn.executemany("INSERT OR IGNORE INTO seen VALUES (?, ?)", ((seen_source, k) for k in seen_keys))
+            self.conn.execute(
+                "INSERT OR REPLACE INTO cursors VALUES (?, ?, ?, ?, ?)",
+                (source, key, position, collected, int(done)),
+            )
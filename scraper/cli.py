@@ -1,8 +1,12 @@
 import argparse
 import logging
+from .cache import ResponseCache
+from .checkpoint import Checkpoint
+from .concurrency import HostLimiter
 from .http import HttpClient
-from .arxiv import collect_arxiv, save_arxiv_corpus
-from .pubmed import collect_pubmed_html, save_pubmed_corpus
+from .arxiv import iter_arxiv, collect_arxiv_concurrent, collect_arxiv_checkpointed, save_arxiv_corpus
+from .eutils import iter_pubmed_eutils, eutils_rate, DEFAULT_TERM, DEFAULT_RELDATE, EFETCH_BATCH, EUTILS_BASE
+from .pubmed import collect_pubmed_html, collect_pubmed_concurrent, collect_pubmed_checkpointed, save_pubmed_corpus
 
 def main():
     ap = argparse.ArgumentParser(description="Practice II - Web Scraping (arXiv & PubMed)")
@@ -17,29 +21,119 @@ def main():
     ap.add_argument("--pubmed-page-size", type=int, default=100,
                     help="Tamaño por página (recomendado 100)")
 
+    ap.add_argument("--pubmed-backend", choices=["html", "eutils"], default="html",
+                    help="html: páginas de Trending | eutils: ESearch con historial + EFetch por lotes")
+    ap.add_argument("--eutils-term", default=DEFAULT_TERM,
+                    help="Consulta de ESearch para el backend eutils")
+    ap.add_argument("--eutils-reldate", type=int, default=DEFAULT_RELDATE,
+                    help="Solo artículos de los últimos N días (fecha Entrez); 0 = sin límite")
+    ap.add_argument("--eutils-batch", type=int, default=EFETCH_BATCH,
+                    help="PMIDs por solicitud EFetch")
+    ap.add_argument("--eutils-base", default=EUTILS_BASE,
+                    help="URL base de E-utilities (p. ej. un servidor local con respuestas grabadas)")
+
     ap.add_argument("--arxiv-out", default="arxiv_raw_corpus.csv")
     ap.add_argument("--pubmed-out", default="pubmed_raw_corpus.csv")
 
+    ap.add_argument("--workers", type=int, default=1,
+                    help="Hilos para descargar secciones/páginas en paralelo (1 = secuencial)")
+    ap.add_argument("--prefetch", type=int, default=0,
+                    help="Páginas pedidas por adelantado por sección (0 = las necesarias para la cuota)")
+    ap.add_argument("--per-host", type=int, default=4,
+                    help="Máximo de solicitudes simultáneas por host (con --workers > 1)")
+    ap.add_argument("--rate", type=float, default=None,
+                    help="Solicitudes por segundo por host (token bucket); sin límite si se omite")
+    ap.add_argument("--burst", type=int, default=1,
+                    help="Ráfaga máxima del token bucket")
+
+    ap.add_argument("--cache-dir", default=None,
+                    help="Directorio para cachear respuestas HTTP en disco (deshabilitado si se omite)")
+    ap.add_argument("--cache-ttl", type=float, default=24 * 3600,
+                    help="Segundos durante los que una respuesta cacheada se usa sin revalidar")
+    ap.add_argument("--cache-max-mb", type=float, default=512,
+                    help="Tamaño máximo de la caché; se descartan primero las entradas usadas hace más tiempo")
+
+    ap.add_argument("--checkpoint", default=None,
+                    help="Base SQLite con cursores y DOIs vistos: agrega solo artículos nuevos al final de los TSV "
+                         "(en lugar de reescribirlos) y permite reanudar")
+    ap.add_argument("--resume", action="store_true",
+                    help="Con --checkpoint, continúa la ejecución anterior desde el último cursor guardado")
+
+    ap.add_argument("--update-vectors", metavar="BASEPATH", default=None,
+                    help="Tras recolectar, agrega solo los artículos nuevos (por DOI) al corpus y a los "
+                         "artefactos de BASEPATH (corpus/ y vectors/) sin re-vectorizar todo")
+
     args = ap.parse_args()
+    if args.checkpoint and args.pubmed_backend == "eutils" and args.repo in ("pubmed", "both"):
+        ap.error("--checkpoint solo está disponible con --pubmed-backend html")
 
     logging.basicConfig(
         level=logging.DEBUG if args.debug else logging.INFO,
         format="%(levelname)s:%(name)s:%(message)s"
     )
 
-    http = HttpClient()
+    concurrent = args.workers > 1
+    rate = args.rate
+    if rate is None and args.pubmed_backend == "eutils" and args.repo in ("pubmed", "both"):
+        rate = eutils_rate()  # límite de NCBI: 3 solicitudes/s (10 con NCBI_API_KEY)
+    limiter = HostLimiter(args.per_host, rate, args.burst) if concurrent or rate else None
+    cache = ResponseCache(args.cache_dir, ttl=args.cache_ttl, max_bytes=int(args.cache_max_mb * 1024 * 1024)) \
+        if args.cache_dir else None
+    http = HttpClient(limiter=limiter, cache=cache)
+    checkpoint = Checkpoint(args.checkpoint) if args.checkpoint else None
+    if checkpoint is not None and concurrent:
+        print("[Checkpoint] La recolección reanudable es secuencial; se ignora --workers.")
 
     if args.repo in ("arxiv", "both"):
         print(f"[arXiv] Recolectando {args.arxiv_per_section} por sección...")
-        arxiv_rows = collect_arxiv(http, per_section_exact=args.arXiv_per_section if hasattr(args, 'arXiv_per_section') else args.arxiv_per_section)
-        save_arxiv_corpus(arxiv_rows, args.arxiv_out)
-        print(f"[arXiv] Guardado en {args.arxiv_out} ({len(arxiv_rows)} filas)")
+        if checkpoint is not None:
+            n_rows = collect_arxiv_checkpointed(http, checkpoint, args.arxiv_out,
+                                                per_section_exact=args.arxiv_per_section, resume=args.resume)
+            print(f"[arXiv] {n_rows} filas nuevas agregadas a {args.arxiv_out}")
+        else:
+            if concurrent:
+                arxiv_rows = collect_arxiv_concurrent(http, per_section_exact=args.arxiv_per_section,
+                                                      workers=args.workers, prefetch=args.prefetch)
+            else:
+                # Secuencial: las filas se escriben en el TSV a medida que se parsean las respuestas.
+                arxiv_rows = iter_arxiv(http, per_section_exact=args.arxiv_per_section)
+            n_rows = save_arxiv_corpus(arxiv_rows, args.arxiv_out)
+            print(f"[arXiv] Guardado en {args.arxiv_out} ({n_rows} filas)")
+        if args.update_vectors:
+            from representation.incremental import update_corpus
+            update_corpus(args.update_vectors, "arxiv", args.arxiv_out)
 
     if args.repo in ("pubmed", "both"):
         print(f"[PubMed] Recolectando {args.pubmed_total} (páginas de {args.pubmed_page_size})...")
-        pubmed_rows = collect_pubmed_html(http, required_total=args.pubmed_total, page_size=args.pubmed_page_size)
-        save_pubmed_corpus(pubmed_rows, args.pubmed_out)
-        print(f"[PubMed] Guardado en {args.pubmed_out} ({len(pubmed_rows)} filas)")
+        if checkpoint is not None:
+            n_rows = collect_pubmed_checkpointed(http, checkpoint, args.pubmed_out, required_total=args.pubmed_total,
+                                                 page_size=args.pubmed_page_size, resume=args.resume)
+            print(f"[PubMed] {n_rows} filas nuevas agregadas a {args.pubmed_out}")
+        elif args.pubmed_backend == "eutils":
+            n_rows = save_pubmed_corpus(iter_pubmed_eutils(http, required_total=args.pubmed_total, term=args.eutils_term,
+                                                           reldate=args.eutils_reldate, batch_size=args.eutils_batch,
+                                                           base_url=args.eutils_base),
+                                        args.pubmed_out)
+            print(f"[PubMed] Guardado en {args.pubmed_out} ({n_rows} filas, E-utilities)")
+        else:
+            if concurrent:
+                pubmed_rows = collect_pubmed_concurrent(http, required_total=args.pubmed_total, page_size=args.pubmed_page_size,
+                                                        workers=args.workers, prefetch=args.prefetch)
+            else:
+                pubmed_rows = collect_pubmed_html(http, required_total=args.pubmed_total, page_size=args.pubmed_page_size)
+            save_pubmed_corpus(pubmed_rows, args.pubmed_out)
+            print(f"[PubMed] Guardado en {args.pubmed_out} ({len(pubmed_rows)} filas)")
+        if args.update_vectors:
+            from representation.incremental import update_corpus
+            update_corpus(args.update_vectors, "pubmed", args.pubmed_out)
+
+    if checkpoint is not None:
+        checkpoint.close()
+
+    if cache is not None:
+        st = cache.stats
+        print(f"[HTTP] Caché: {st['hits']} aciertos, {st['revalidated']} revalidadas (304), "
+              f"{st['misses']} descargas, {st['evicted']} descartadas")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,122 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import Executor
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, Optional
+from urllib.parse import urlsplit
+
+
+class TokenBucket:
+    """
+    Limitador token-bucket: `rate` solicitudes por segundo en promedio, con
+    ráfagas de hasta `burst`. `acquire()` bloquea hasta que hay un token.
+    """
+
+    def __init__(self, rate: float, burst: int = 1, clock: Callable[[], float] = time.monotonic):
+        if rate <= 0:
+            raise ValueError("rate debe ser > 0")
+        self.rate = float(rate)
+        self.burst = max(1, int(burst))
+        self.clock = clock
+        self.tokens = float(self.burst)
+        self.updated = clock()
+        self.lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self) -> float:
+        """Consume un token; devuelve los segundos que hubo que esperar."""
+        waited = 0.0
+        while True:
+            with self.lock:
+                self._refill(self.clock())
+                if self.tokens >= 1.0:
+                    self.tokens -= 1.0
+                    return waited
+                delay = (1.0 - self.tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+class HostLimiter:
+    """
+    Límite por host: como mucho `max_per_host` solicitudes simultáneas y, si se
+    indica `rate`, un token-bucket independiente por host.
+    """
+
+    def __init__(self, max_per_host: int = 4, rate: Optional[float] = None, burst: int = 1):
+        self.max_per_host = max(1, int(max_per_host))
+        self.rate = rate
+        self.burst = burst
+        self._semaphores: Dict[str, threading.BoundedSemaphore] = {}
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def _for_host(self, host: str):
+        with self._lock:
+            if host not in self._semaphores:
+                self._semaphores[host] = threading.BoundedSemaphore(self.max_per_host)
+                if self.rate:
+                    self._buckets[host] = TokenBucket(self.rate, self.burst)
+            return self._semaphores[host], self._buckets.get(host)
+
+    def acquire(self, url: str) -> Callable[[], None]:
+        """
+        Ocupa un turno del host de `url` (y un token, si hay tasa) y devuelve
+        la función que lo libera; se puede llamar más de una vez.
+        """
+        sem, bucket = self._for_host(urlsplit(url).netloc)
+        sem.acquire()
+        try:
+            if bucket is not None:
+                bucket.acquire()
+        except BaseException:
+            sem.release()
+            raise
+        lock = threading.Lock()
+        held = [True]
+
+        def release() -> None:
+            with lock:
+                if not held[0]:
+                    return
+                held[0] = False
+            sem.release()
+
+        return release
+
+    @contextmanager
+    def slot(self, url: str):
+        release = self.acquire(url)
+        try:
+            yield
+        finally:
+            release()
+
+
+def prefetch_ordered(executor: Executor, fn: Callable, args: Iterable, window: int) -> Iterator:
+    """
+    Aplica `fn` a cada elemento de `args` en `executor`, con hasta `window`
+    llamadas en curso, y entrega los resultados en el orden de `args`.
+    Al cerrar el generador (p. ej. al alcanzar la cuota) se cancelan las
+    llamadas pendientes que aún no empezaron.
+    """
+    args = iter(args)
+    pending = deque()
+    try:
+        for a in args:
+            pending.append(executor.submit(fn, a))
+            if len(pending) >= max(1, window):
+                break
+        while pending:
+            result = pending.popleft().result()
+            for a in args:
+                pending.append(executor.submit(fn, a))
+                break
+            yield result
+    finally:
+        for fut in pending:
+            fut.cancel()
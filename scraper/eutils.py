@@ -0,0 +1,101 @@
+import codecs
+import logging
+import os
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from .http import HttpClient
+from .pubmed import STREAM_CHUNK, _meta_row, iter_medline_records
+
+log = logging.getLogger(__name__)
+
+EUTILS_BASE = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils"
+DEFAULT_TERM = "hasabstract"
+DEFAULT_RELDATE = 30
+EFETCH_BATCH = 500
+
+def eutils_params(**params) -> Dict[str, object]:
+    """Parámetros comunes de E-utilities (tool/email y NCBI_API_KEY si está definida)."""
+    base = {"tool": "nlp-practica2"}
+    if os.environ.get("NCBI_EMAIL"):
+        base["email"] = os.environ["NCBI_EMAIL"]
+    if os.environ.get("NCBI_API_KEY"):
+        base["api_key"] = os.environ["NCBI_API_KEY"]
+    base.update(params)
+    return base
+
+def eutils_rate() -> float:
+    """Solicitudes por segundo permitidas por NCBI (10 con API key, 3 sin ella)."""
+    return 10.0 if os.environ.get("NCBI_API_KEY") else 3.0
+
+def esearch_history(http: HttpClient, term: str = DEFAULT_TERM, reldate: Optional[int] = DEFAULT_RELDATE,
+                    base_url: str = EUTILS_BASE) -> Dict[str, object]:
+    """
+    Ejecuta la búsqueda una sola vez y deja los PMIDs en el historial del
+    servidor; devuelve {"count", "webenv", "query_key"} para paginar con EFetch.
+    No pasa por la caché de respuestas: el WebEnv caduca en el servidor mucho
+    antes que el TTL de la caché y con `reldate` el resultado cambia cada día.
+    """
+    params = eutils_params(db="pubmed", term=term, usehistory="y", retmax=0, retmode="json")
+    if reldate:
+        params.update(reldate=reldate, datetype="edat")
+    r = http.get(f"{base_url}/esearch.fcgi", params=params, use_cache=False)
+    result = r.json().get("esearchresult", {})
+    if "webenv" not in result or "querykey" not in result:
+        raise RuntimeError(f"[E-utilities] ESearch sin historial: {result.get('ERROR') or result}")
+    log.debug("[E-utilities] ESearch '%s' -> %s resultados", term, result.get("count"))
+    return {"count": int(result.get("count", 0)), "webenv": result["webenv"], "query_key": result["querykey"]}
+
+def _lines(chunks: Iterable[str]) -> Iterator[str]:
+    buf = ""
+    for chunk in chunks:
+        buf += chunk
+        lines = buf.split("\n")
+        buf = lines.pop()
+        for ln in lines:
+            yield ln.rstrip("\r")
+    if buf:
+        yield buf.rstrip("\r")
+
+def efetch_records(http: HttpClient, history: Dict[str, object], retstart: int, retmax: int,
+                   base_url: str = EUTILS_BASE) -> Iterator[Dict[str, object]]:
+    """Registros MEDLINE de un lote del historial, tokenizados a medida que llega la respuesta."""
+    params = eutils_params(db="pubmed", query_key=history["query_key"], WebEnv=history["webenv"],
+                           retstart=retstart, retmax=retmax, rettype="medline", retmode="text")
+    r = http.get(f"{base_url}/efetch.fcgi", params=params, stream=True)
+    decoder = codecs.getincrementaldecoder(r.encoding or "utf-8")(errors="replace")
+    try:
+        chunks = (decoder.decode(c) for c in r.iter_content(chunk_size=STREAM_CHUNK))
+        yield from iter_medline_records(_lines(chunks))
+    finally:
+        r.close()
+
+def iter_pubmed_eutils(http: HttpClient, required_total: int = 300, term: str = DEFAULT_TERM,
+                       reldate: Optional[int] = DEFAULT_RELDATE, batch_size: int = EFETCH_BATCH,
+                       base_url: str = EUTILS_BASE) -> Iterator[List[str]]:
+    """
+    Filas válidas (mismo formato y filtros que `collect_pubmed_html`) hasta
+    `required_total`: una ESearch con historial y EFetch por lotes de
+    `batch_size` PMIDs, sin volver a enviar la consulta ni la lista de ids.
+    """
+    if required_total <= 0:
+        return
+    history = esearch_history(http, term, reldate, base_url)
+    n = 0
+    retstart = 0
+    while retstart < history["count"]:
+        for meta in efetch_records(http, history, retstart, batch_size, base_url):
+            row = _meta_row(meta)
+            if row is None:
+                continue
+            n += 1
+            yield row
+            if n >= required_total:
+                return
+        retstart += batch_size
+    log.warning("[E-utilities] WARNING: solo se recolectaron %d/%d (la búsqueda tiene %d resultados)",
+                n, required_total, history["count"])
+
+def collect_pubmed_eutils(http: HttpClient, required_total: int = 300, term: str = DEFAULT_TERM,
+                          reldate: Optional[int] = DEFAULT_RELDATE, batch_size: int = EFETCH_BATCH,
+                          base_url: str = EUTILS_BASE) -> List[List[str]]:
+    return list(iter_pubmed_eutils(http, required_total, term, reldate, batch_size, base_url))
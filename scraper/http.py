@@ -1,16 +1,41 @@
 # scraper/http.py
 import os
+import random
 import time
 import logging
+from email.utils import parsedate_to_datetime
 import requests
 
+from .cache import cache_key
+
 log = logging.getLogger(__name__)
 
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+def retry_after_seconds(value) -> float | None:
+    """Valor de Retry-After (segundos o fecha HTTP) en segundos, o None si no se puede interpretar."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
 class HttpClient:
-    def __init__(self, sleep: float = 0.5, timeout: int = 20):
+    def __init__(self, sleep: float = 0.5, timeout: int = 20, limiter=None, cache=None,
+                 tries: int = 4, max_backoff: float = 60.0):
         self.session = requests.Session()
         self.sleep = sleep
         self.timeout = timeout
+        # Opcional: HostLimiter (scraper/concurrency.py) para uso desde varios hilos
+        self.limiter = limiter
+        # Opcional: ResponseCache (scraper/cache.py) en disco
+        self.cache = cache
+        self.tries = max(1, tries)
+        self.max_backoff = max_backoff
         self.session.headers.update({
             "User-Agent": "Mozilla/5.0 (compatible; NLP-Practica2/1.0; +https://github.com/yourproject)"
         })
@@ -23,18 +48,100 @@ class HttpClient:
                     jar.set(k, v)
             self.session.cookies.update(jar)
 
-    def get(self, url: str, params=None, raise_for_status: bool = True):
-        tries = 3
-        for i in range(tries):
+    def _send(self, url: str, params=None, stream: bool = False, headers=None):
+        if self.limiter is None:
+            return self.session.get(url, params=params, timeout=self.timeout, stream=stream, headers=headers)
+        release = self.limiter.acquire(url)
+        try:
+            r = self.session.get(url, params=params, timeout=self.timeout, stream=stream, headers=headers)
+        except BaseException:
+            release()
+            raise
+        if not stream:
+            release()
+            return r
+        # Con stream=True el cuerpo se descarga después: el turno del host se libera al cerrar la respuesta.
+        close = r.close
+
+        def close_and_release():
             try:
-                r = self.session.get(url, params=params, timeout=self.timeout)
-                if raise_for_status:
-                    r.raise_for_status()
-                return r
-            except Exception as e:
+                close()
+            finally:
+                release()
+
+        r.close = close_and_release
+        return r
+
+    @staticmethod
+    def _check(r):
+        """raise_for_status cerrando antes la respuesta (libera la conexión y el turno del host)."""
+        try:
+            r.raise_for_status()
+        except requests.HTTPError:
+            r.close()
+            raise
+
+    def backoff(self, attempt: int, retry_after: float | None = None) -> float:
+        """Espera exponencial con jitter completo; si el servidor indicó Retry-After, no se espera menos."""
+        delay = random.uniform(0, min(self.max_backoff, self.sleep * (2 ** attempt)))
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.max_backoff))
+        return delay
+
+    def _fetch(self, url: str, params=None, stream: bool = False, headers=None):
+        """
+        Envía la solicitud reintentando errores de red y respuestas 429/5xx
+        hasta `tries` veces. Devuelve la última respuesta obtenida.
+        """
+        for i in range(self.tries):
+            last = i == self.tries - 1
+            try:
+                r = self._send(url, params=params, stream=stream, headers=headers)
+            except requests.RequestException as e:
+                if last:
+                    raise
                 log.warning("[HTTP] intento %d falló para %s: %r", i+1, url, e)
-                time.sleep(self.sleep * (i+1))
-        r = self.session.get(url, params=params, timeout=self.timeout)
+                time.sleep(self.backoff(i))
+                continue
+            if r.status_code not in RETRY_STATUS or last:
+                return r
+            retry_after = retry_after_seconds(r.headers.get("Retry-After"))
+            log.warning("[HTTP] intento %d falló para %s: HTTP %d (Retry-After=%s)",
+                        i+1, url, r.status_code, r.headers.get("Retry-After"))
+            r.close()
+            time.sleep(self.backoff(i, retry_after))
+
+    def get(self, url: str, params=None, raise_for_status: bool = True, stream: bool = False,
+            use_cache: bool = True):
+        # Con stream=True solo se reintenta hasta recibir las cabeceras; el cuerpo se lee después.
+        # Con caché, el cuerpo se vuelca a disco mientras se descarga y se lee desde allí.
+        # use_cache=False: la respuesta no se lee ni se guarda en la caché (p. ej. estado del servidor que caduca).
+        if self.cache is None or not use_cache:
+            r = self._fetch(url, params=params, stream=stream)
+            if raise_for_status:
+                self._check(r)
+            return r
+
+        key = cache_key(url, params)
+        meta = self.cache.lookup(key)
+        if meta is not None and meta["fresh"]:
+            self.cache.count("hits")
+            return self.cache.response(key, meta)
+
+        headers = self.cache.validators(meta) if meta is not None else None
+        r = self._fetch(url, params=params, stream=True, headers=headers)
+        if meta is not None and r.status_code == 304:
+            r.close()
+            self.cache.count("revalidated")
+            self.cache.refresh(key, meta, r)
+            return self.cache.response(key, meta)
+
+        self.cache.count("misses")
         if raise_for_status:
-            r.raise_for_status()
-        return r
+            self._check(r)
+        if r.status_code != 200 or "no-store" in r.headers.get("Cache-Control", ""):
+            if not stream:
+                r.content  # se lee ya el cuerpo para no retener el turno del host
+                r.close()
+            return r
+        return self.cache.store(key, r)
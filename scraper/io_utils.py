@@ -1,4 +1,5 @@
 import csv
+import os
 from pathlib import Path
 from typing import Iterable, List
 from datetime import datetime
@@ -8,20 +9,58 @@ def ensure_parent(path: str | Path) -> Path:
     p.parent.mkdir(parents=True, exist_ok=True)
     return p
 
-def write_tsv(path: str | Path, rows: Iterable[List[str]], header: List[str]) -> None:
+def _tsv_row(r: List[str], header: List[str]) -> List[str]:
+    cleaned = []
+    for x in r:
+        if x is None:
+            cleaned.append("")
+        else:
+            cleaned.append(str(x).replace("\n", " ").replace("\r", " ").strip())
+    return cleaned + [""] * (len(header) - len(cleaned))
+
+def write_tsv(path: str | Path, rows: Iterable[List[str]], header: List[str]) -> int:
+    """
+    Escribe `rows` (puede ser un generador: se escribe a medida que llegan) y
+    devuelve cuántas filas escribió. Se escribe en un temporal junto al destino
+    que solo lo reemplaza si el generador termina sin error: un fallo a mitad
+    de la recolección no deja el TSV anterior truncado.
+    """
+    p = ensure_parent(path)
+    tmp = p.with_name(f"{p.name}.tmp-{os.getpid()}")
+    n = 0
+    try:
+        with tmp.open("w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f, delimiter="\t", quoting=csv.QUOTE_MINIMAL)
+            writer.writerow(header)
+            for r in rows:
+                writer.writerow(_tsv_row(r, header))
+                n += 1
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, p)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    return n
+
+def append_tsv(path: str | Path, rows: Iterable[List[str]], header: List[str]) -> int:
+    """
+    Agrega `rows` al final del TSV (escribe la cabecera solo si el archivo no
+    existe o está vacío) y fuerza la escritura a disco antes de volver.
+    """
     p = ensure_parent(path)
-    with p.open("w", encoding="utf-8", newline="") as f:
+    n = 0
+    new_file = not p.exists() or p.stat().st_size == 0
+    with p.open("a", encoding="utf-8", newline="") as f:
         writer = csv.writer(f, delimiter="\t", quoting=csv.QUOTE_MINIMAL)
-        writer.writerow(header)
+        if new_file:
+            writer.writerow(header)
         for r in rows:
-            cleaned = []
-            for x in r:
-                if x is None:
-                    cleaned.append("")
-                else:
-                    cleaned.append(str(x).replace("\n", " ").replace("\r", " ").strip())
-            row = cleaned + [""] * (len(header) - len(cleaned))
-            writer.writerow(row)
+            writer.writerow(_tsv_row(r, header))
+            n += 1
+        f.flush()
+        os.fsync(f.fileno())
+    return n
 
 def ddmmyyyy(date_like: str) -> str:
     if not date_like:
@@ -1,12 +1,21 @@
-from typing import List, Dict
-from bs4 import BeautifulSoup
+from typing import Iterable, Iterator, List, Dict, Optional
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+from itertools import count
+from datetime import datetime
+import codecs
+import html
 import re
 
+from .checkpoint import Checkpoint, doi_key
+from .concurrency import prefetch_ordered
 from .http import HttpClient
-from .io_utils import write_tsv, ddmmyyyy
+from .io_utils import append_tsv, write_tsv, ddmmyyyy
 
 PUBMED_BASE = "https://pubmed.ncbi.nlm.nih.gov"
 TRENDING = f"{PUBMED_BASE}/trending/"
+PUBMED_HEADER = ["DOI", "Title", "Authors", "Abstract", "Journal", "Date"]
+STREAM_CHUNK = 64 * 1024
 
 FIELD_KEYS = {"TI", "AB", "AU", "JT", "DP", "LID", "AID"}
 
@@ -35,26 +44,52 @@ def _split_records(block_text: str) -> List[str]:
         records.append(current)
     return ["\n".join(r) for r in records]
 
+_FIELD_LINE = re.compile(r"^([A-Z]{2,4})\s*-\s(.*)$")
+_DOI = re.compile(r"(10\.\d{4,9}/\S+)")
+_YEAR = re.compile(r"(19|20)\d{2}")
+_MEDLINE_DATE = re.compile(r"^(\d{4}) ([A-Za-z]{3}) (\d{1,2})$")
+_MONTHS = {m: i for i, m in enumerate(
+    ["jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"], start=1)}
+
+def _medline_date(date_raw: str) -> str:
+    """`ddmmyyyy` con atajo para la forma habitual de DP ("2024 Jan 05"), sin probar cada formato con strptime."""
+    m = _MEDLINE_DATE.match(date_raw)
+    if m:
+        month = _MONTHS.get(m.group(2).lower())
+        if month:
+            try:
+                return datetime(int(m.group(1)), month, int(m.group(3))).strftime("%d/%m/%Y")
+            except ValueError:
+                pass
+    return ddmmyyyy(date_raw)
+
 def _extract_year_from_text(text: str) -> str:
-    m = re.search(r"(19|20)\d{2}", text)
+    m = _YEAR.search(text)
     if m:
         return f"01/01/{m.group(0)}"
     return ""
 
-def _parse_medline_record(text: str) -> Dict[str, str | List[str]]:
-    data: Dict[str, List[str]] = {k: [] for k in FIELD_KEYS}
-    current_key = None
-    for ln in text.splitlines():
-        m = re.match(r"^([A-Z]{2,4})\s*-\s(.*)$", ln)
+def _pick_doi(values: List[str]) -> str:
+    for v in values:
+        m = _DOI.search(v)
         if m:
-            key, val = m.group(1).strip(), m.group(2).rstrip()
-            current_key = key if key in FIELD_KEYS else None
-            if current_key:
-                data[current_key].append(val)
-        else:
-            if current_key in ("TI", "AB"):
-                data[current_key].append(ln.rstrip())
+            return m.group(1).rstrip(").;]")
+    return ""
+
+def _add_line(data: Dict[str, List[str]], current_key: Optional[str], ln: str) -> Optional[str]:
+    """Acumula una línea MEDLINE en `data`; devuelve el campo activo para las líneas de continuación."""
+    # Solo una línea que empieza en mayúscula puede abrir un campo (evita el regex en las continuaciones).
+    m = _FIELD_LINE.match(ln) if "A" <= ln[:1] <= "Z" else None
+    if m:
+        key, val = m.group(1).strip(), m.group(2).rstrip()
+        current_key = key if key in FIELD_KEYS else None
+        if current_key:
+            data[current_key].append(val)
+    elif current_key in ("TI", "AB"):
+        data[current_key].append(ln.rstrip())
+    return current_key
 
+def _finish_record(data: Dict[str, List[str]]) -> Dict[str, str | List[str]]:
     title = " ".join(data["TI"]).strip()
     abstract = " ".join(data["AB"]).strip()
     abstract = clean_pubmed_abstract(abstract)
@@ -62,16 +97,9 @@ def _parse_medline_record(text: str) -> Dict[str, str | List[str]]:
     journal = " ".join(data["JT"]).strip()
     date_raw = " ".join(data["DP"]).strip()
 
-    def pick_doi(values: List[str]) -> str:
-        for v in values:
-            m = re.search(r"(10\.\d{4,9}/\S+)", v)
-            if m:
-                return m.group(1).rstrip(").;]")
-        return ""
-
-    doi = pick_doi(data["LID"]) or pick_doi(data["AID"])
+    doi = _pick_doi(data["LID"]) or _pick_doi(data["AID"])
 
-    date_final = ddmmyyyy(date_raw)
+    date_final = _medline_date(date_raw)
     if not date_final:
         date_final = _extract_year_from_text(doi)
     if not date_final:
@@ -88,49 +116,230 @@ def _parse_medline_record(text: str) -> Dict[str, str | List[str]]:
         "doi": doi,
     }
 
-def collect_pubmed_html(http: HttpClient, required_total: int = 300, page_size: int = 100) -> List[List[str]]:
-    all_rows: List[List[str]] = []
-    page = 1
-    while len(all_rows) < required_total:
-        url = (
-            f"{TRENDING}"
-            f"?term=&ac=yes&schema=none&page={page}"
-            f"&show_snippets=on&sort=relevance&sort_order=desc"
-            f"&format=pubmed&size={page_size}"
-        )
-        r = http.get(url)
-        soup = BeautifulSoup(r.text, "html.parser")
-        pre_blocks = soup.select("pre.search-results-chunk")
-        if not pre_blocks:
-            break
+def _parse_medline_record(text: str) -> Dict[str, str | List[str]]:
+    data: Dict[str, List[str]] = {k: [] for k in FIELD_KEYS}
+    current_key = None
+    for ln in text.splitlines():
+        current_key = _add_line(data, current_key, ln)
+    return _finish_record(data)
 
-        for pre in pre_blocks:
-            for rec_text in _split_records(pre.get_text("\n")):
-                meta = _parse_medline_record(rec_text)
-                if not meta["abstract"]:
-                    continue
-                if not meta["date"]:
-                    continue
-                if not meta["doi"]:
+def iter_medline_records(lines: Iterable[Optional[str]]) -> Iterator[Dict[str, str | List[str]]]:
+    """
+    Tokenizador MEDLINE de una sola pasada: recibe líneas (None marca el fin
+    de un bloque <pre>) y entrega cada registro en cuanto empieza el siguiente
+    "PMID- ". Equivale a `_split_records` + `_parse_medline_record` sin
+    volver a unir y partir el texto.
+    """
+    data: Dict[str, List[str]] = {k: [] for k in FIELD_KEYS}
+    current_key = None
+    has_lines = False
+    for ln in lines:
+        if ln is None or ln.startswith("PMID- "):
+            if has_lines:
+                yield _finish_record(data)
+                data = {k: [] for k in FIELD_KEYS}
+            current_key = None
+            has_lines = False
+            if ln is None:
+                continue
+        has_lines = True
+        current_key = _add_line(data, current_key, ln)
+    if has_lines:
+        yield _finish_record(data)
+
+_PRE_OPEN = re.compile(r"""<pre\b[^>]*\bclass\s*=\s*["'][^"']*\bsearch-results-chunk\b[^"']*["'][^>]*>""", re.IGNORECASE)
+_PRE_CLOSE = re.compile(r"</pre\s*>", re.IGNORECASE)
+_TAGS = re.compile(r"(?:<[^>]*>)+")
+
+class _PreScanner:
+    """
+    Extrae el texto de los bloques <pre class="search-results-chunk"> de un
+    HTML que llega en trozos, sin construir el árbol del documento. Entrega
+    líneas completas (con entidades decodificadas) y None al cerrar cada bloque;
+    `blocks` cuenta los bloques encontrados.
+    """
+
+    def __init__(self):
+        self.blocks = 0
+
+    @staticmethod
+    def _text_lines(text: str) -> List[str]:
+        if "<" in text:
+            text = _TAGS.sub("\n", text)
+        if "&" in text:
+            text = html.unescape(text)
+        return text.splitlines()
+
+    def lines(self, chunks: Iterable[str]) -> Iterator[Optional[str]]:
+        buf = ""
+        inside = False
+        for chunk in chunks:
+            buf += chunk
+            while True:
+                if not inside:
+                    m = _PRE_OPEN.search(buf)
+                    if m is None:
+                        # Conserva la cola por si la etiqueta de apertura quedó partida entre trozos.
+                        buf = buf[-512:]
+                        break
+                    inside = True
+                    self.blocks += 1
+                    buf = buf[m.end():]
+                m = _PRE_CLOSE.search(buf)
+                if m is not None:
+                    yield from self._text_lines(buf[:m.start()])
+                    yield None
+                    inside = False
+                    buf = buf[m.end():]
                     continue
-                row = [
-                    meta["doi"],
-                    meta["title"],
-                    normalize_authors(meta["authors"]),
-                    meta["abstract"],
-                    meta["journal"],
-                    meta["date"],
-                ]
-                all_rows.append(row)
-                if len(all_rows) >= required_total:
-                    break
-            if len(all_rows) >= required_total:
+                cut = buf.rfind("\n")
+                if cut >= 0:
+                    # Solo líneas completas; "\n" se parte aparte para conservar las líneas vacías.
+                    for piece in buf[:cut].split("\n"):
+                        yield from (self._text_lines(piece) or [""])
+                    buf = buf[cut + 1:]
                 break
+        if inside:
+            yield from self._text_lines(buf)
+            yield None
+
+def _meta_row(meta: Dict[str, str | List[str]]) -> Optional[List[str]]:
+    if not meta["abstract"]:
+        return None
+    if not meta["date"]:
+        return None
+    if not meta["doi"]:
+        return None
+    return [
+        meta["doi"],
+        meta["title"],
+        normalize_authors(meta["authors"]),
+        meta["abstract"],
+        meta["journal"],
+        meta["date"],
+    ]
+
+def _rows_from_chunks(chunks: Iterable[str]) -> Optional[List[List[str]]]:
+    scanner = _PreScanner()
+    rows = [row for row in map(_meta_row, iter_medline_records(scanner.lines(chunks))) if row is not None]
+    return rows if scanner.blocks else None
+
+def _trending_url(page: int, page_size: int, base_url: str = PUBMED_BASE) -> str:
+    return (
+        f"{base_url}/trending/"
+        f"?term=&ac=yes&schema=none&page={page}"
+        f"&show_snippets=on&sort=relevance&sort_order=desc"
+        f"&format=pubmed&size={page_size}"
+    )
 
-        page += 1
+def _page_rows(html_text: str) -> Optional[List[List[str]]]:
+    """Filas válidas de una página de resultados, o None si la página no trae registros."""
+    return _rows_from_chunks([html_text])
 
+def _page_rows_soup(html_text: str) -> Optional[List[List[str]]]:
+    """Implementación con BeautifulSoup (referencia para `bench_medline.py`)."""
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(html_text, "html.parser")
+    pre_blocks = soup.select("pre.search-results-chunk")
+    if not pre_blocks:
+        return None
+
+    rows: List[List[str]] = []
+    for pre in pre_blocks:
+        for rec_text in _split_records(pre.get_text("\n")):
+            row = _meta_row(_parse_medline_record(rec_text))
+            if row is not None:
+                rows.append(row)
+    return rows
+
+def _fetch_page_rows(http: HttpClient, url: str) -> Optional[List[List[str]]]:
+    """Descarga la página en streaming y tokeniza los registros a medida que llega el cuerpo."""
+    r = http.get(url, stream=True)
+    decoder = codecs.getincrementaldecoder(r.encoding or "utf-8")(errors="replace")
+    try:
+        chunks = (decoder.decode(c) for c in r.iter_content(chunk_size=STREAM_CHUNK))
+        return _rows_from_chunks(chunks)
+    finally:
+        r.close()
+
+def _take_rows(pages: Iterator[Optional[List[List[str]]]], required_total: int) -> List[List[str]]:
+    """Consume páginas en orden hasta reunir `required_total` filas o llegar a una página vacía."""
+    all_rows: List[List[str]] = []
+    with closing(pages):
+        while len(all_rows) < required_total:
+            rows = next(pages, None)
+            if rows is None:
+                break
+            all_rows.extend(rows[:required_total - len(all_rows)])
     return all_rows[:required_total]
 
-def save_pubmed_corpus(rows: List[List[str]], out_path: str = "pubmed_raw_corpus.tsv") -> None:
-    header = ["DOI", "Title", "Authors", "Abstract", "Journal", "Date"]
-    write_tsv(out_path, rows, header)
+def collect_pubmed_html(http: HttpClient, required_total: int = 300, page_size: int = 100,
+                        base_url: str = PUBMED_BASE) -> List[List[str]]:
+    def pages():
+        for page in count(1):
+            yield _fetch_page_rows(http, _trending_url(page, page_size, base_url))
+
+    return _take_rows(pages(), required_total)
+
+def collect_pubmed_concurrent(http: HttpClient, required_total: int = 300, page_size: int = 100,
+                              workers: int = 4, prefetch: int = 0, base_url: str = PUBMED_BASE) -> List[List[str]]:
+    """
+    Igual que `collect_pubmed_html` (mismas filas y en el mismo orden), pero
+    descarga y parsea hasta `prefetch` páginas a la vez (por defecto, las
+    necesarias para la cuota más una) en un pool de `workers` hilos.
+    """
+    window = prefetch or -(-required_total // page_size) + 1
+
+    def fetch(page):
+        return _fetch_page_rows(http, _trending_url(page, page_size, base_url))
+
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="pubmed-page") as pool:
+        return _take_rows(prefetch_ordered(pool, fetch, count(1), window), required_total)
+
+def collect_pubmed_checkpointed(http: HttpClient, checkpoint: Checkpoint, out_path: str,
+                                required_total: int = 300, page_size: int = 100, resume: bool = False,
+                                base_url: str = PUBMED_BASE) -> int:
+    """
+    Recolección reanudable de Trending: continúa desde la página guardada,
+    descarta DOIs ya vistos (en esta y en ejecuciones anteriores) y agrega al
+    final de `out_path` solo las filas nuevas, página a página.
+    Devuelve cuántas filas se agregaron en esta llamada.
+    """
+    checkpoint.start("pubmed", resume)
+    checkpoint.sync_tsv("pubmed", out_path)
+    page, collected, done = checkpoint.cursor("pubmed", "trending", initial=1)
+    if collected:
+        print(f"[PubMed] Reanudando en la página {page} ({collected}/{required_total} ya recolectados)")
+    added = 0
+
+    while not done and collected < required_total:
+        page_rows = _fetch_page_rows(http, _trending_url(page, page_size, base_url))
+        if page_rows is None:
+            done = True
+            checkpoint.commit_page("pubmed", "trending", page, collected, done, [])
+            break
+
+        rows: List[List[str]] = []
+        keys: List[str] = []
+        consumed = 0
+        for row in page_rows:
+            if collected + len(rows) >= required_total:
+                break
+            consumed += 1
+            key = doi_key(row[0])
+            if key in keys or checkpoint.is_seen("pubmed", [key]):
+                continue
+            rows.append(row)
+            keys.append(key)
+
+        append_tsv(out_path, rows, PUBMED_HEADER)
+        collected += len(rows)
+        added += len(rows)
+        # Si la página no se recorrió entera, se vuelve a pedir al reanudar (lo ya visto se omite).
+        page = page + 1 if consumed == len(page_rows) else page
+        checkpoint.commit_page("pubmed", "trending", page, collected, done, keys)
+
+    return added
+
+def save_pubmed_corpus(rows: Iterable[List[str]], out_path: str = "pubmed_raw_corpus.tsv") -> int:
+    return write_tsv(out_path, rows, PUBMED_HEADER)
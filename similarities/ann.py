@@ -0,0 +1,273 @@
+import argparse
+import glob
+import json
+import os
+import shutil
+import time
+import uuid
+import numpy as np
+import scipy.sparse as sp
+from similarities.topk import topk_indices, pad_topk
+from representation.store import MANIFEST, artifact_signature, is_store, open_store
+
+ANN_FORMAT = "simdoc-ann"
+ANN_VERSION = 1
+PROJECTIONS = ["svd", "rp"]
+DEFAULTS = {"projection": "svd", "dim": 128, "nlist": 0, "nprobe": 8, "rerank": 10, "n_iter": 10, "seed": 0}
+
+
+# ---------------------- #
+#  Utilidades            #
+# ---------------------- #
+def _l2_rows(X):
+    X = sp.csr_matrix(X, dtype=np.float64)
+    norms = np.sqrt(np.asarray(X.multiply(X).sum(axis=1)).ravel())
+    norms[norms == 0] = 1.0
+    return (sp.diags(1.0 / norms) @ X).tocsr()
+
+
+def _project(Xn, components):
+    """Filas normalizadas proyectadas (densas, float32) y vueltas a normalizar."""
+    # En float32, como `components`: si no, scipy convierte la matriz entera en cada producto.
+    V = Xn.astype(np.float32) @ components
+    return _l2_dense(np.asarray(V.toarray() if sp.issparse(V) else V, dtype=np.float32))
+
+
+def _l2_dense(V):
+    norms = np.linalg.norm(V, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return V / norms
+
+
+def ann_path(vectors_dir, name):
+    """Los índices ANN se guardan junto a los artefactos, en vectors/ann/<artefacto>/."""
+    return os.path.join(vectors_dir, "ann", name)
+
+
+def spherical_kmeans(V, n_clusters, n_iter, rng, batch=8192):
+    """k-means sobre vectores normalizados (similitud coseno), con asignación por lotes."""
+    n = V.shape[0]
+    C = V[rng.choice(n, size=n_clusters, replace=False)].copy()
+    assign = np.zeros(n, dtype=np.int64)
+    for _ in range(n_iter):
+        for start in range(0, n, batch):
+            assign[start:start + batch] = np.argmax(V[start:start + batch] @ C.T, axis=1)
+        members = sp.csr_matrix((np.ones(n), (assign, np.arange(n))), shape=(n_clusters, n))
+        sums = np.asarray(members @ V)
+        empty = np.asarray(members.sum(axis=1)).ravel() == 0
+        if empty.any():
+            sums[empty] = V[rng.choice(n, size=int(empty.sum()), replace=False)]
+        C = _l2_dense(sums)
+    for start in range(0, n, batch):
+        assign[start:start + batch] = np.argmax(V[start:start + batch] @ C.T, axis=1)
+    return C, assign
+
+
+# ---------------------- #
+#  Índice IVF            #
+# ---------------------- #
+class AnnIndex:
+    """
+    Búsqueda aproximada: las filas de X se proyectan a `dim` dimensiones densas
+    (TruncatedSVD o proyección aleatoria dispersa) y se agrupan con k-means en
+    `nlist` listas (IVF). Una consulta solo recorre las `nprobe` listas con el
+    centroide más cercano; de esos candidatos, los `rerank * k` mejores se
+    vuelven a puntuar con el coseno exacto sobre X, así que las similitudes
+    devueltas son las mismas que en la búsqueda exhaustiva.
+    """
+
+    def __init__(self, params, centroids, list_ptr, list_docs, vectors, components, n_docs, manifest=None):
+        self.params = params
+        self.centroids = centroids
+        self.list_ptr = list_ptr
+        self.list_docs = list_docs
+        self.vectors = vectors
+        self.components = components
+        self.n_docs = n_docs
+        self.manifest = manifest or {}
+        self._X = None
+
+    # ---- construcción ----
+    @classmethod
+    def build(cls, X, projection="svd", dim=128, nlist=0, n_iter=10, seed=0, sample=100_000, **_):
+        if projection not in PROJECTIONS:
+            raise ValueError(f"Proyección no reconocida: {projection}")
+        Xn = _l2_rows(X)
+        n, n_terms = Xn.shape
+        rng = np.random.default_rng(seed)
+
+        if projection == "svd":
+            dim = max(1, min(dim, n_terms - 1, n - 1))
+            from sklearn.decomposition import TruncatedSVD
+            svd = TruncatedSVD(n_components=dim, random_state=seed)
+            svd.fit(Xn if n <= sample else Xn[rng.choice(n, size=sample, replace=False)])
+            components = svd.components_.T.astype(np.float32)
+        else:
+            from sklearn.random_projection import SparseRandomProjection
+            rp = SparseRandomProjection(n_components=dim, random_state=seed)
+            rp.fit(Xn[:1])
+            components = sp.csr_matrix(rp.components_.T, dtype=np.float32)
+
+        V = _project(Xn, components)
+        nlist = nlist or max(1, int(np.sqrt(n)))
+        nlist = min(nlist, n)
+        train = V if n <= sample else V[rng.choice(n, size=sample, replace=False)]
+        C, _ = spherical_kmeans(train, nlist, n_iter, rng)
+        assign = np.argmax(V @ C.T, axis=1) if n <= sample else np.concatenate(
+            [np.argmax(V[s:s + 8192] @ C.T, axis=1) for s in range(0, n, 8192)])
+
+        order = np.argsort(assign, kind="stable")
+        list_ptr = np.zeros(nlist + 1, dtype=np.int64)
+        np.cumsum(np.bincount(assign, minlength=nlist), out=list_ptr[1:])
+        params = {"projection": projection, "dim": int(dim), "nlist": int(nlist), "n_iter": n_iter, "seed": seed}
+        return cls(params, C.astype(np.float32), list_ptr, order.astype(np.int64), V[order], components, n)
+
+    # ---- consulta ----
+    def attach(self, X):
+        """Matriz original (para el re-ranking exacto); se normaliza una sola vez."""
+        self._X = _l2_rows(X)
+        return self
+
+    def project(self, Q):
+        return _project(_l2_rows(Q), self.components)
+
+    def candidates(self, qv, nprobe):
+        probe = topk_indices(self.centroids @ qv, min(nprobe, self.centroids.shape[0]))
+        ranges = [np.arange(self.list_ptr[c], self.list_ptr[c + 1]) for c in probe]
+        return np.concatenate(ranges) if ranges else np.empty(0, dtype=np.int64)
+
+    def search(self, q, k, nprobe=None, rerank=None, stats=None):
+        """(doc_ids, similitudes) aproximados de los `k` documentos más similares a la fila `q`."""
+        nprobe = nprobe or DEFAULTS["nprobe"]
+        rerank = rerank or DEFAULTS["rerank"]
+        q = sp.csr_matrix(q)
+        if q.nnz == 0:
+            return pad_topk(np.empty(0, dtype=np.int64), np.empty(0), k, self.n_docs)
+
+        qv = self.project(q)[0]
+        pos = self.candidates(qv, nprobe)
+        approx = self.vectors[pos] @ qv
+        keep = topk_indices(approx, rerank * k if self._X is not None else k)
+        docs = self.list_docs[pos[keep]]
+        if stats is not None:
+            stats["ann_candidates"] = stats.get("ann_candidates", 0) + int(pos.size)
+            stats["ann_docs"] = stats.get("ann_docs", 0) + self.n_docs
+
+        if self._X is None:
+            return pad_topk(docs, approx[keep].astype(np.float64), k, self.n_docs)
+        exact = np.asarray((self._X[docs] @ _l2_rows(q).T).todense()).ravel()
+        top = topk_indices(exact, k)
+        docs, scores = docs[top], exact[top]
+        positive = scores > 0
+        return pad_topk(docs[positive], scores[positive], k, self.n_docs)
+
+    # ---- persistencia ----
+    def save(self, path, source=None):
+        tmp = f"{path}.tmp-{uuid.uuid4().hex[:8]}"
+        os.makedirs(tmp)
+        arrays = {"centroids": self.centroids, "list_ptr": self.list_ptr, "list_docs": self.list_docs,
+                  "vectors": self.vectors}
+        if sp.issparse(self.components):
+            c = sp.csr_matrix(self.components)
+            arrays.update(components_data=c.data, components_indices=c.indices, components_indptr=c.indptr)
+        else:
+            arrays["components"] = self.components
+        for name, arr in arrays.items():
+            np.save(os.path.join(tmp, f"{name}.npy"), np.ascontiguousarray(arr))
+
+        manifest = {
+            "format": ANN_FORMAT,
+            "version": ANN_VERSION,
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "params": self.params,
+            "n_docs": int(self.n_docs),
+            "components_shape": list(self.components.shape),
+            "sparse_components": sp.issparse(self.components),
+            "source": source or {},
+        }
+        with open(os.path.join(tmp, MANIFEST), "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+        old = None
+        if os.path.exists(path):
+            old = f"{path}.old-{uuid.uuid4().hex[:8]}"
+            os.replace(path, old)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(tmp, path)
+        if old:
+            shutil.rmtree(old, ignore_errors=True)
+        self.manifest = manifest
+        return manifest
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        with open(os.path.join(path, MANIFEST), encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("format") != ANN_FORMAT or manifest.get("version", 0) > ANN_VERSION:
+            raise ValueError(f"El directorio {path} no contiene un índice '{ANN_FORMAT}' compatible.")
+        mode = "r" if mmap else None
+
+        def load(name):
+            return np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mode)
+
+        if manifest["sparse_components"]:
+            components = sp.csr_matrix((load("components_data"), load("components_indices"), load("components_indptr")),
+                                       shape=tuple(manifest["components_shape"]))
+        else:
+            components = load("components")
+        return cls(manifest["params"], load("centroids"), load("list_ptr"), load("list_docs"), load("vectors"),
+                   components, manifest["n_docs"], manifest)
+
+
+def load_or_build(artifact, X, vectors_dir, name, options=None, verbose=True):
+    """
+    Abre el índice ANN de `artifact` si existe, corresponde a la versión actual
+    del artefacto y se construyó con las mismas opciones; si no, lo construye y lo guarda.
+    """
+    options = {**DEFAULTS, **(options or {})}
+    path = ann_path(vectors_dir, name)
+    signature = artifact_signature(artifact)
+    wanted = {k: options[k] for k in ("projection", "dim", "nlist", "n_iter", "seed")}
+    if os.path.isfile(os.path.join(path, MANIFEST)):
+        index = AnnIndex.load(path)
+        source = index.manifest.get("source", {})
+        if source.get("signature") == signature and source.get("options") == wanted:
+            return index
+    if verbose:
+        print(f" Construyendo índice ANN ({options['projection']}, dim={options['dim']}) para {name}...")
+    index = AnnIndex.build(X, **wanted)
+    index.save(path, source={"artifact": os.path.basename(artifact), "signature": signature, "options": wanted})
+    return index
+
+
+# ---------------------- #
+#       ARGPARSE         #
+# ---------------------- #
+def main():
+    parser = argparse.ArgumentParser(description="Construye los índices ANN (proyección densa + IVF) de los artefactos de data/vectors.")
+    parser.add_argument("--basepath", default=".", help="Ruta base con data/vectors/.")
+    parser.add_argument("--projection", choices=PROJECTIONS, default=DEFAULTS["projection"],
+                        help="svd: TruncatedSVD | rp: proyección aleatoria dispersa.")
+    parser.add_argument("--dim", type=int, default=DEFAULTS["dim"], help="Dimensiones de la proyección.")
+    parser.add_argument("--nlist", type=int, default=DEFAULTS["nlist"], help="Listas IVF (0 = √n).")
+    parser.add_argument("--seed", type=int, default=DEFAULTS["seed"])
+    args = parser.parse_args()
+
+    vectors_dir = os.path.join(args.basepath, "data", "vectors")
+    options = {"projection": args.projection, "dim": args.dim, "nlist": args.nlist, "seed": args.seed}
+    for path in sorted(glob.glob(os.path.join(vectors_dir, "*"))):
+        if is_store(path):
+            X, name = open_store(path).X, os.path.basename(path)
+        elif path.endswith(".pkl") and not is_store(path[:-4]):
+            import pickle
+            with open(path, "rb") as f:
+                X = pickle.load(f)["X"]
+            name = os.path.basename(path)[:-4]
+        else:
+            continue
+        index = load_or_build(path, X, vectors_dir, name, options, verbose=False)
+        print(f"✅ {name} → {ann_path(vectors_dir, name)}  ({index.n_docs} docs, {index.params['nlist']} listas, dim {index.params['dim']})")
+
+
+if __name__ == "__main__":
+    main()
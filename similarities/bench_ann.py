@@ -0,0 +1,118 @@
+import argparse
+import glob
+import os
+import pickle
+import time
+import numpy as np
+import scipy.sparse as sp
+from similarities.ann import AnnIndex, PROJECTIONS
+from similarities.bench_index import brute_search
+from similarities.inverted_index import InvertedIndex
+from representation.store import is_store, open_store
+
+
+# ---------------------- #
+#  Medidas               #
+# ---------------------- #
+def recall(exact, approx):
+    """
+    Fracción del top-k exacto (similitud > 0) recuperada. Un documento empatado
+    con el k-ésimo cuenta como acierto (las puntuaciones aproximadas ya son exactas tras el re-ranking).
+    """
+    (_, scores), (_, found) = exact, approx
+    truth = scores[scores > 0]
+    if truth.size == 0:
+        return 1.0
+    hits = np.count_nonzero(found >= truth.min() - 1e-9)
+    return min(hits, truth.size) / truth.size
+
+
+def run(name, search, queries, exact, repeat):
+    best = float("inf")
+    results = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        results = [search(q) for q in queries]
+        best = min(best, time.perf_counter() - t0)
+    r = np.mean([recall(e, a) for e, a in zip(exact, results)])
+    print(f"{name:>16} | {r:>9.3f} | {best / len(queries) * 1e3:>10.3f}ms")
+
+
+def compare(X, queries, k, nprobes, projection, dim, repeat, seed):
+    exact = [brute_search(q, X, k) for q in queries]
+    index = InvertedIndex.from_matrix(X)
+    t0 = time.perf_counter()
+    ann = AnnIndex.build(X, projection=projection, dim=dim, seed=seed).attach(X)
+    build = time.perf_counter() - t0
+    print(f" ANN: {projection}, dim {ann.params['dim']}, {ann.params['nlist']} listas, construido en {build:.2f}s")
+    print(f"{'método':>16} | {'recall@' + str(k):>9} | {'latencia':>12}")
+    run("brute", lambda q: brute_search(q, X, k), queries, exact, repeat)
+    run("index", lambda q: index.search(q, k), queries, exact, repeat)
+    for nprobe in nprobes:
+        run(f"ann nprobe={nprobe}", lambda q: ann.search(q, k, nprobe), queries, exact, repeat)
+
+
+def topic_corpus(n_docs, n_terms, n_topics, terms_per_doc, rng):
+    """Corpus sintético con temas: cada documento mezcla términos de su tema y términos generales."""
+    topic_terms = rng.integers(0, n_terms, size=(n_topics, n_terms // n_topics))
+    topics = rng.integers(0, n_topics, size=n_docs)
+    own = terms_per_doc // 2
+    rows, cols = [], []
+    for d, t in enumerate(topics):
+        cols.extend(rng.choice(topic_terms[t], size=own))
+        cols.extend(rng.integers(0, n_terms, size=terms_per_doc - own))
+        rows.extend([d] * terms_per_doc)
+    X = sp.csr_matrix((np.ones(len(cols)), (rows, cols)), shape=(n_docs, n_terms))
+    X.sum_duplicates()
+    return X
+
+
+# ---------------------- #
+#       ARGPARSE         #
+# ---------------------- #
+def main():
+    parser = argparse.ArgumentParser(description="Recall@k y latencia del índice ANN (proyección densa + IVF) frente a la búsqueda exacta.")
+    parser.add_argument("--basepath", default=".", help="Ruta base con data/vectors/ (artefactos reales).")
+    parser.add_argument("--synthetic", type=int, default=0, metavar="N", help="Usa además un corpus sintético con temas de N documentos.")
+    parser.add_argument("--terms", type=int, default=50_000)
+    parser.add_argument("--projection", choices=PROJECTIONS, default="svd")
+    parser.add_argument("--dim", type=int, default=128)
+    parser.add_argument("--nprobe", default="1,4,8,16", help="Valores de nprobe a comparar, separados por coma.")
+    parser.add_argument("--topk", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--pattern", default="*", help="Filtro (glob) de artefactos en data/vectors/.")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    nprobes = [int(n) for n in args.nprobe.split(",")]
+
+    for path in sorted(glob.glob(os.path.join(args.basepath, "data", "vectors", args.pattern))):
+        if is_store(path):
+            X = open_store(path).X
+        elif path.endswith(".pkl"):
+            with open(path, "rb") as f:
+                X = pickle.load(f)["X"]
+        else:
+            continue
+        rows = rng.choice(X.shape[0], size=min(args.queries, X.shape[0]), replace=False)
+        print(f"\n== {os.path.basename(path)} ({X.shape[0]}×{X.shape[1]}) ==")
+        compare(sp.csr_matrix(X), [X[r] for r in rows], args.topk, nprobes, args.projection, args.dim, args.repeat, args.seed)
+
+    if args.synthetic:
+        X = topic_corpus(args.synthetic, args.terms, max(10, args.synthetic // 500), 60, rng)
+        rows = rng.choice(X.shape[0], size=args.queries, replace=False)
+        # Consultas: la mitad de los términos de un documento del corpus.
+        queries = []
+        for r in rows:
+            q = X[r].copy()
+            q.data[rng.random(q.nnz) < 0.5] = 0
+            q.eliminate_zeros()
+            queries.append(q)
+        print(f"\n== sintético ({X.shape[0]}×{X.shape[1]}) ==")
+        compare(X, queries, args.topk, nprobes, args.projection, args.dim, args.repeat, args.seed)
+
+
+if __name__ == "__main__":
+    main()
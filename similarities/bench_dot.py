@@ -0,0 +1,89 @@
+import argparse
+import glob
+import os
+import pickle
+import numpy as np
+import scipy.sparse as sp
+from sklearn.metrics.pairwise import cosine_similarity
+from similarities.bench_index import zipf_corpus
+from similarities.bench_topk import best_time
+from similarities.scatter import cosine_scores, inverse_norms_of
+from similarities.topk import topk_indices
+from representation.store import is_store, open_store, row_norms
+
+
+# ---------------------- #
+#  Caminos a comparar    #
+# ---------------------- #
+def cosine_path(X, Q, k):
+    """Recuperación anterior: cosine_similarity recalcula las normas de X en cada llamada."""
+    S = cosine_similarity(Q, X, dense_output=False).tocsr()
+    out = []
+    for q in range(S.shape[0]):
+        s = S.getrow(q).toarray().ravel()
+        top = topk_indices(s, k)
+        out.append((top, s[top]))
+    return out
+
+
+def dot_path(X, Q, inverse_norms, k):
+    """Producto directo con la consulta normalizada y las normas inversas precalculadas."""
+    out = []
+    for s in cosine_scores(X, Q, inverse_norms):
+        top = topk_indices(s, k)
+        out.append((top, s[top]))
+    return out
+
+
+def compare(name, X, Q, inverse_norms, k, repeat):
+    old = cosine_path(X, Q, k)
+    new = dot_path(X, Q, inverse_norms, k)
+    diff = max(float(np.max(np.abs(a[1] - b[1]), initial=0.0)) for a, b in zip(old, new))
+    same = sum(np.allclose(a[1], b[1], rtol=0, atol=1e-12) for a, b in zip(old, new))
+    t_old = best_time(lambda: cosine_path(X, Q, k), repeat) / Q.shape[0]
+    t_new = best_time(lambda: dot_path(X, Q, inverse_norms, k), repeat) / Q.shape[0]
+    print(f"{name:>34} | {same:>4}/{Q.shape[0]:<4} | {diff:>8.1e} | {t_old * 1e3:>9.3f}ms | {t_new * 1e3:>9.3f}ms | {t_old / t_new:>5.1f}x")
+    return same == Q.shape[0]
+
+
+# ---------------------- #
+#       ARGPARSE         #
+# ---------------------- #
+def main():
+    parser = argparse.ArgumentParser(description="cosine_similarity (normas recalculadas por consulta) vs. producto punto con normas guardadas: verificación y tiempo por consulta.")
+    parser.add_argument("--basepath", default=".", help="Ruta base con data/vectors/.")
+    parser.add_argument("--sizes", type=float, nargs="*", default=[1e5], help="Tamaños de corpus sintético (Zipf) a medir.")
+    parser.add_argument("--terms", type=int, default=50_000)
+    parser.add_argument("--queries", type=int, default=20, help="Consultas por artefacto (filas del propio corpus).")
+    parser.add_argument("--topk", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=3, help="Repeticiones por medida (se reporta la mejor).")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    print(f"{'artefacto':>34} | {'iguales':>9} | {'dif. máx':>8} | {'coseno':>11} | {'punto':>11} | {'x':>6}")
+    all_ok = True
+    for path in sorted(glob.glob(os.path.join(args.basepath, "data", "vectors", "*"))):
+        if is_store(path):
+            store = open_store(path)
+            X, norms = store.X, store.row_norms()
+        elif path.endswith(".pkl"):
+            with open(path, "rb") as f:
+                X = sp.csr_matrix(pickle.load(f)["X"])
+            norms = row_norms(X)
+        else:
+            continue
+        Q = X[rng.choice(X.shape[0], size=min(args.queries, X.shape[0]), replace=False)]
+        all_ok &= compare(os.path.basename(path), X, Q, inverse_norms_of(norms), args.topk, args.repeat)
+
+    for size in args.sizes:
+        X = zipf_corpus(int(size), args.terms, 80, rng)
+        X.data = rng.random(X.nnz)
+        Q = X[rng.choice(X.shape[0], size=args.queries, replace=False)]
+        all_ok &= compare(f"zipf {int(size)}", X, Q, inverse_norms_of(row_norms(X)), args.topk, args.repeat)
+
+    print("\n✅ Mismas similitudes en todas las consultas" if all_ok else "\n Hay consultas con similitudes distintas")
+
+
+if __name__ == "__main__":
+    main()
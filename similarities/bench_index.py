@@ -0,0 +1,119 @@
+import argparse
+import glob
+import os
+import pickle
+import time
+import numpy as np
+import scipy.sparse as sp
+from sklearn.metrics.pairwise import cosine_similarity
+from similarities.inverted_index import InvertedIndex
+from similarities.topk import topk_indices
+from representation.store import is_store, open_store
+
+
+# ---------------------- #
+#  Comparación de rutas  #
+# ---------------------- #
+def brute_search(q, X, k):
+    similarities = cosine_similarity(q, X).ravel()
+    top = topk_indices(similarities, k)
+    return top, similarities[top]
+
+
+def same_ranking(brute, indexed, atol=1e-9):
+    """Mismas puntuaciones en el mismo orden (los empates pueden cambiar de documento)."""
+    (_, s_brute), (_, s_index) = brute, indexed
+    return s_brute.shape == s_index.shape and np.allclose(s_brute, s_index, atol=atol)
+
+
+def verify_artifacts(base_path, k, n_queries, rng):
+    """Usa filas del propio corpus como consultas y compara ambas rutas por artefacto."""
+    candidates = sorted(glob.glob(os.path.join(base_path, "data", "vectors", "*")))
+    paths = [p for p in candidates if p.endswith(".pkl") or is_store(p)]
+    if not paths:
+        print(f" No se encontraron artefactos en {os.path.join(base_path, 'data', 'vectors')}")
+        return True
+
+    all_ok = True
+    for path in paths:
+        if is_store(path):
+            X = open_store(path).X
+        else:
+            with open(path, "rb") as f:
+                X = pickle.load(f)["X"]
+        index = InvertedIndex.from_matrix(X)
+        rows = rng.choice(X.shape[0], size=min(n_queries, X.shape[0]), replace=False)
+        stats = {}
+        ok = True
+        for r in rows:
+            exact = brute_search(X[r], X, k)
+            ok &= same_ranking(exact, index.search(X[r], k))
+            ok &= same_ranking(exact, index.search_maxscore(X[r], k, stats))
+        all_ok &= ok
+        skipped = 100.0 * stats["postings_skipped"] / max(stats["postings_total"], 1)
+        print(f" {'OK ' if ok else 'ERR'} {os.path.basename(path)}  ({len(rows)} consultas, MaxScore omite {skipped:.1f}% postings)")
+    return all_ok
+
+
+def zipf_corpus(n_docs, n_terms, terms_per_doc, rng):
+    """Corpus sintético con frecuencias de término tipo Zipf."""
+    probs = 1.0 / np.arange(1, n_terms + 1)
+    probs /= probs.sum()
+    indices = rng.choice(n_terms, size=n_docs * terms_per_doc, p=probs)
+    indptr = np.arange(0, n_docs * terms_per_doc + 1, terms_per_doc)
+    X = sp.csr_matrix((np.ones(indices.size), indices, indptr), shape=(n_docs, n_terms))
+    X.sum_duplicates()
+    return X
+
+
+def bench_scaling(sizes, n_terms, terms_per_doc, query_terms, k, n_queries, rng):
+    print(f"\n{'docs':>10} | {'brute':>10} | {'index':>10} | {'maxscore':>10} | {'x':>6}")
+    for size in sizes:
+        n = int(size)
+        X = zipf_corpus(n, n_terms, terms_per_doc, rng)
+        index = InvertedIndex.from_matrix(X)
+        # Consultas cortas (tipo título) con términos de la cola de la distribución.
+        queries = [
+            sp.csr_matrix((np.ones(query_terms), (np.zeros(query_terms, dtype=int),
+                           rng.choice(np.arange(n_terms // 10, n_terms), query_terms, replace=False))),
+                          shape=(1, n_terms))
+            for _ in range(n_queries)
+        ]
+        t0 = time.perf_counter()
+        for q in queries:
+            brute_search(q, X, k)
+        t_brute = (time.perf_counter() - t0) / n_queries
+        t0 = time.perf_counter()
+        for q in queries:
+            index.search(q, k)
+        t_index = (time.perf_counter() - t0) / n_queries
+        t0 = time.perf_counter()
+        for q in queries:
+            index.search_maxscore(q, k)
+        t_max = (time.perf_counter() - t0) / n_queries
+        print(f"{n:>10} | {t_brute * 1e3:>8.2f}ms | {t_index * 1e3:>8.2f}ms | {t_max * 1e3:>8.2f}ms | {t_brute / t_index:>5.1f}x")
+
+
+# ---------------------- #
+#       ARGPARSE         #
+# ---------------------- #
+def main():
+    parser = argparse.ArgumentParser(description="Verifica y mide el índice invertido (exacto y MaxScore) frente al coseno exhaustivo.")
+    parser.add_argument("--basepath", default=".", help="Ruta base con data/vectors/.")
+    parser.add_argument("--topk", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=20, help="Consultas por artefacto / tamaño.")
+    parser.add_argument("--sizes", type=float, nargs="+", default=[1e4, 1e5, 1e6], help="Tamaños del corpus sintético.")
+    parser.add_argument("--terms", type=int, default=50000, help="Vocabulario del corpus sintético.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--skip-verify", action="store_true", help="No comparar contra los artefactos reales.")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    if not args.skip_verify:
+        if not verify_artifacts(args.basepath, args.topk, args.queries, rng):
+            raise SystemExit(1)
+    bench_scaling(args.sizes, args.terms, 8, 5, args.topk, args.queries, rng)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+
+# Entradas de línea de comandos del proyecto (se miden con --help: importación + argparse).
+CLIS = [
+    "normalization.normalization",
+    "representation.vectorize",
+    "representation.incremental",
+    "representation.store",
+    "representation.shards",
+    "similarities.retrieve_similar_articles",
+    "similarities.service",
+    "similarities.ann",
+    "similarities.minhash",
+    "similarities.neighbors",
+    "scraper.cli",
+]
+HEAVY = ["pandas", "sklearn", "nltk", "scipy.stats", "bs4", "requests"]
+
+IMPORT_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+
+# ---------------------- #
+#  Medición              #
+# ---------------------- #
+def parse_importtime(stderr):
+    """[(módulo, propio µs, acumulado µs, nivel)] de la salida de `python -X importtime`."""
+    rows = []
+    for line in stderr.splitlines():
+        m = IMPORT_LINE.match(line)
+        if m:
+            rows.append((m.group(4), int(m.group(1)), int(m.group(2)), (len(m.group(3)) - 1) // 2))
+    return rows
+
+
+def run_cli(module, basepath, args=("--help",)):
+    """Un arranque en frío: tiempo total del proceso y registro de importaciones."""
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-m", module, *args],
+                          cwd=basepath, capture_output=True, text=True)
+    return time.perf_counter() - start, proc.returncode, parse_importtime(proc.stderr)
+
+
+def measure(module, basepath, repeat):
+    """Mejor de `repeat` arranques (el primero también calienta la caché de disco)."""
+    best = None
+    for _ in range(repeat):
+        wall, code, rows = run_cli(module, basepath)
+        if best is None or wall < best[0]:
+            best = (wall, code, rows)
+    wall, code, rows = best
+    top = sorted((r for r in rows if r[3] == 0), key=lambda r: -r[2])
+    loaded = {r[0] for r in rows}
+    return {
+        "wall_ms": round(wall * 1e3, 1),
+        "import_ms": round(sum(r[2] for r in rows if r[3] == 0) / 1e3, 1),
+        "returncode": code,
+        "heavy": [name for name in HEAVY if name in loaded],
+        "top": [[name, round(cum / 1e3, 1)] for name, _, cum, _ in top[:3]],
+    }
+
+
+# ---------------------- #
+#       ARGPARSE         #
+# ---------------------- #
+def main():
+    parser = argparse.ArgumentParser(description="Arranque en frío de cada CLI (python -X importtime -m <cli> --help): tiempo total, importaciones y dependencias pesadas cargadas.")
+    parser.add_argument("--basepath", default=".", help="Raíz del proyecto (donde se ejecuta cada CLI).")
+    parser.add_argument("--cli", nargs="*", default=CLIS, help="Módulos a medir.")
+    parser.add_argument("--repeat", type=int, default=3, help="Arranques por CLI (se reporta el mejor).")
+    parser.add_argument("--save", default=None, help="Guarda los resultados en este JSON.")
+    parser.add_argument("--baseline", default=None, help="JSON de una medición anterior con el que comparar.")
+    args = parser.parse_args()
+
+    baseline = {}
+    if args.baseline and os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    results = {}
+    print(f"{'cli':>40} | {'total':>9} | {'imports':>9} | {'antes':>9} | {'pesadas cargadas':<32} | más costosas")
+    for module in args.cli:
+        r = results[module] = measure(module, args.basepath, args.repeat)
+        before = f"{baseline[module]['wall_ms']:>7.1f}ms" if module in baseline else f"{'-':>9}"
+        top = ", ".join(f"{name} {ms:.0f}ms" for name, ms in r["top"])
+        status = "" if r["returncode"] == 0 else f"  (código {r['returncode']})"
+        print(f"{module:>40} | {r['wall_ms']:>7.1f}ms | {r['import_ms']:>7.1f}ms | {before} | "
+              f"{', '.join(r['heavy']) or '-':<32} | {top}{status}")
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"\n✅ Resultados guardados en {args.save}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+import argparse
+import time
+import numpy as np
+from similarities.topk import topk_indices, merge_topk
+
+
+# ---------------------- #
+#  Utilidades de medida  #
+# ---------------------- #
+def best_time(func, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def full_sort(scores, k):
+    return scores.argsort()[::-1][:k]
+
+
+def bench_size(n, k, shards, repeat, rng):
+    scores = rng.random(n, dtype=np.float64)
+
+    t_sort = best_time(lambda: full_sort(scores, k), repeat)
+    t_part = best_time(lambda: topk_indices(scores, k), repeat)
+
+    # Misma comprobación que la recuperación: ambos caminos deben coincidir.
+    if not np.array_equal(np.sort(full_sort(scores, k)), np.sort(topk_indices(scores, k))):
+        raise AssertionError("topk_indices no coincide con argsort completo")
+
+    # Fusión entre fragmentos: top-k por fragmento + heap vs. concatenar y ordenar.
+    parts = np.array_split(scores, shards)
+
+    def sort_merge():
+        merged = []
+        for p in parts:
+            merged.extend(p[full_sort(p, k)].tolist())
+        return sorted(merged, reverse=True)[:k]
+
+    def heap_merge():
+        ranked = [p[topk_indices(p, k)].tolist() for p in parts]
+        return merge_topk(ranked, k, key=lambda x: x)
+
+    t_sort_merge = best_time(sort_merge, repeat)
+    t_heap_merge = best_time(heap_merge, repeat)
+    return t_sort, t_part, t_sort_merge, t_heap_merge
+
+
+# ---------------------- #
+#       ARGPARSE         #
+# ---------------------- #
+def main():
+    parser = argparse.ArgumentParser(description="Compara argsort completo vs. selección parcial top-k (argpartition + heap).")
+    parser.add_argument("--sizes", type=float, nargs="+", default=[1e5, 1e6, 1e7], help="Tamaños de corpus a simular.")
+    parser.add_argument("--topk", type=int, default=10, help="Número de resultados a conservar.")
+    parser.add_argument("--shards", type=int, default=8, help="Fragmentos a fusionar con heap.")
+    parser.add_argument("--repeat", type=int, default=3, help="Repeticiones por medida (se reporta la mejor).")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    print(f"{'docs':>12} | {'argsort':>10} | {'partial':>10} | {'x':>6} | {'sort-merge':>10} | {'heap-merge':>10} | {'x':>6}")
+    for size in args.sizes:
+        n = int(size)
+        t_sort, t_part, t_sm, t_hm = bench_size(n, args.topk, args.shards, args.repeat, rng)
+        print(f"{n:>12} | {t_sort * 1e3:>8.2f}ms | {t_part * 1e3:>8.2f}ms | {t_sort / t_part:>5.1f}x"
+              f" | {t_sm * 1e3:>8.2f}ms | {t_hm * 1e3:>8.2f}ms | {t_sm / t_hm:>5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,491 @@
+import os
+import pickle
+import numpy as np
+from normalization.normalization import normalize_single_text  # usa la misma normalización NLTK
+from similarities.topk import topk_indices, merge_topk
+from similarities.inverted_index import InvertedIndex
+from similarities.result_cache import text_key
+from similarities.scatter import ScatterGather, cosine_scores, inverse_norms_of
+from representation.shards import (Shard, manifest_signature, open_shards, read_shards_manifest, shard_rows,
+                                   shards_path, shards_signature)
+from representation.store import artifact_name, artifact_signature, is_store, open_store, row_norms
+
+CORPORA = ["arxiv", "pubmed"]
+METHODS = ["brute", "index", "maxscore", "ann"]
+
+
+# ---------------------- #
+#  Carga de modelos      #
+# ---------------------- #
+def ngram_code(ngram_type: str) -> str:
+    if ngram_type == "unigram":
+        return "n1-1"
+    elif ngram_type == "bigram":
+        return "n2-2"
+    elif ngram_type == "both":
+        return "n1-2"
+    else:
+        raise ValueError("Tipo de n-grama no reconocido.")
+
+
+def load_pkl(base_path, corpus_name, field, vector_type, ngram_type):
+    field = field.lower()
+    ntag = ngram_code(ngram_type)
+    vectors_dir = os.path.join(base_path, "data", "vectors")
+    fname = f"{corpus_name}_{field}_{vector_type}_{ntag}.pkl"
+    path = os.path.join(vectors_dir, fname)
+
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"No se encontró el archivo {path}")
+
+    with open(path, "rb") as f:
+        data = pickle.load(f)
+
+    if not isinstance(data, dict) or "vectorizer" not in data or "X" not in data:
+        raise ValueError(f"El archivo {path} no contiene las claves esperadas ('vectorizer', 'X').")
+
+    return data["vectorizer"], data["X"]
+
+
+def artifact_path(base_path, corpus_name, field, vector_type, ngram_type):
+    """Ruta del artefacto que usa `load_vectors` (directorio store o .pkl)."""
+    path = os.path.join(base_path, "data", "vectors", artifact_name(corpus_name, field, vector_type, ngram_code(ngram_type)))
+    return path if is_store(path) else f"{path}.pkl"
+
+
+def load_vectors(base_path, corpus_name, field, vector_type, ngram_type):
+    """
+    Carga un modelo (vectorizador, X). Prefiere el formato store (mapeado en
+    memoria, compartido entre procesos vía caché del SO) y recurre al .pkl si
+    el artefacto aún no se ha convertido.
+    """
+    path = os.path.join(base_path, "data", "vectors", artifact_name(corpus_name, field, vector_type, ngram_code(ngram_type)))
+    if is_store(path):
+        store = open_store(path)
+        return store.vectorizer, store.X
+    return load_pkl(base_path, corpus_name, field, vector_type, ngram_type)
+
+
+def load_row_norms(base_path, corpus_name, field, vector_type, ngram_type, X=None):
+    """
+    Norma L2 de cada fila de X. El formato store las guarda al escribir el
+    artefacto; para los .pkl se calculan una vez desde X.
+    """
+    path = artifact_path(base_path, corpus_name, field, vector_type, ngram_type)
+    return open_store(path).row_norms() if is_store(path) else row_norms(X)
+
+
+def metadata_path(base_path, corpus_name):
+    return os.path.join(base_path, "data", "corpus", f"{corpus_name}_raw_corpus.csv")
+
+
+def metadata_signature(base_path, corpus_name):
+    """(tamaño, mtime) del CSV crudo del corpus (None si no existe): cambia al agregar o volver a descargar filas."""
+    try:
+        st = os.stat(metadata_path(base_path, corpus_name))
+    except FileNotFoundError:
+        return None
+    return st.st_size, st.st_mtime_ns
+
+
+def load_metadata(base_path, corpus_name):
+    csv_path = metadata_path(base_path, corpus_name)
+    if not os.path.exists(csv_path):
+        raise FileNotFoundError(f"No se encontró el archivo {csv_path}")
+    import pandas as pd
+    return pd.read_csv(csv_path, sep="\t")
+
+
+def recall_at_k(approx, exact):
+    """
+    Fracción de los resultados exactos con similitud > 0 recuperada. Un documento
+    empatado con el k-ésimo exacto cuenta como acierto (los métodos devuelven similitudes exactas).
+    """
+    found = relevant = 0
+    for a, b in zip(approx, exact):
+        truth = [r["Similarity"] for r in b if r["Similarity"] > 0]
+        if not truth:
+            continue
+        relevant += len(truth)
+        found += min(len(truth), sum(r["Similarity"] >= min(truth) - 1e-9 for r in a))
+    return found / relevant if relevant else 1.0
+
+
+# ---------------------- #
+#  Motor residente       #
+# ---------------------- #
+class SimilarityEngine:
+    """
+    Mantiene en memoria los modelos vectoriales y los metadatos de cada corpus
+    para responder muchas consultas sin volver a leer los artefactos ni los CSV.
+
+    Los modelos se cargan bajo demanda la primera vez que se piden y quedan
+    residentes, indexados por (corpus, campo, vectorización, n-gramas).
+
+    `method` elige cómo se puntúa: "brute" compara contra todas las filas de X
+    con un producto punto y las normas de fila guardadas en el artefacto;
+    "index" usa un índice invertido y solo puntúa los documentos que comparten
+    términos con la consulta; "maxscore" usa el mismo índice con poda MaxScore
+    (resultado exacto, menos postings recorridos); "ann" es aproximado:
+    proyección densa + IVF (similarities/ann.py), con `ann_options` (nprobe,
+    rerank, projection, dim, nlist). Los índices ANN se guardan en
+    data/vectors/ann/ y se reconstruyen si cambia el artefacto.
+    Las estadísticas de poda se acumulan en `stats`.
+
+    Con `shards` > 1 cada corpus se divide en fragmentos (`shard_by`: "range"
+    o "doi"; se usan los guardados con `python -m representation.shards` si
+    coinciden, o se dividen en memoria) y, con `workers` > 1, los pares
+    (corpus, fragmento) se puntúan en paralelo en un pool de hilos o de
+    procesos (`executor`); los top-k parciales se fusionan con un heap.
+    No aplica a "ann", que ya recorre solo una parte del corpus.
+
+    Con `cache` (un ResultCache) se guardan la normalización de cada consulta
+    y su top-k, con la versión de los artefactos en la clave: si un artefacto
+    se reescribe, su modelo se vuelve a cargar y los resultados anteriores
+    dejan de usarse.
+    """
+
+    def __init__(self, base_path: str = ".", corpora=None, method: str = "brute", ann_options=None,
+                 shards: int = 1, shard_by: str = "range", workers: int = 1, executor: str = "thread", cache=None):
+        if method not in METHODS:
+            raise ValueError(f"Método de búsqueda no reconocido: {method}")
+        self.base_path = base_path
+        self.corpora = list(corpora) if corpora else list(CORPORA)
+        self.method = method
+        self.ann_options = dict(ann_options or {})
+        self.shards = max(1, shards)
+        self.shard_by = shard_by
+        self._scatter = ScatterGather(workers, executor)
+        self.cache = cache
+        self._models = {}
+        self._versions = {}
+        self._metadata = {}
+        self._metadata_versions = {}
+        self._indexes = {}
+        self._ann = {}
+        self._norms = {}
+        self._shards = {}
+        self._shard_versions = {}
+        self._shard_indexes = {}
+        self.stats = {}
+
+    def get_model(self, corpus_name, field, vector_type, ngram_type):
+        key = (corpus_name, field.lower(), vector_type, ngram_code(ngram_type))
+        if key not in self._models:
+            self._versions[key] = self.artifact_version(corpus_name, field, vector_type, ngram_type)
+            self._models[key] = load_vectors(self.base_path, corpus_name, field, vector_type, ngram_type)
+        return self._models[key]
+
+    def artifact_version(self, corpus_name, field, vector_type, ngram_type):
+        """artifact_signature del artefacto en disco (None si no existe)."""
+        try:
+            return artifact_signature(artifact_path(self.base_path, corpus_name, field, vector_type, ngram_type))
+        except FileNotFoundError:
+            return None
+
+    def artifact_versions(self, field, vector_type, ngram_type):
+        """
+        Versión actual de los artefactos de cada corpus (y de su CSV de
+        metadatos). Si alguno cambió desde que se cargó (p. ej. vectorize_column
+        o append_to_store lo reescribieron), se descartan su modelo, todo lo
+        derivado y los metadatos del corpus para que la próxima consulta use
+        los nuevos.
+        """
+        versions = []
+        for corpus_name in self.corpora:
+            key = (corpus_name, field.lower(), vector_type, ngram_code(ngram_type))
+            version = self.artifact_version(corpus_name, field, vector_type, ngram_type)
+            if key in self._models and self._versions.get(key) != version:
+                self.forget(key)
+                self._metadata.pop(corpus_name, None)
+            versions.append((corpus_name, version, metadata_signature(self.base_path, corpus_name)))
+        return tuple(versions)
+
+    def forget(self, key):
+        """Descarta el modelo (corpus, campo, vectorización, n-gramas) y sus índices, normas y fragmentos."""
+        for cache in (self._models, self._versions, self._indexes, self._ann, self._norms):
+            cache.pop(key, None)
+        self.forget_shards(key)
+
+    def forget_shards(self, key):
+        """Descarta los fragmentos del modelo `key` y sus índices."""
+        self._shards.pop(key, None)
+        self._shard_versions.pop(key, None)
+        for index_key in [k for k in self._shard_indexes if k[:4] == key]:
+            del self._shard_indexes[index_key]
+
+    def get_inverse_norms(self, corpus_name, field, vector_type, ngram_type):
+        key = (corpus_name, field.lower(), vector_type, ngram_code(ngram_type))
+        if key not in self._norms:
+            _, X = self.get_model(corpus_name, field, vector_type, ngram_type)
+            norms = load_row_norms(self.base_path, corpus_name, field, vector_type, ngram_type, X)
+            self._norms[key] = inverse_norms_of(norms)
+        return self._norms[key]
+
+    def get_shards(self, corpus_name, field, vector_type, ngram_type):
+        """
+        (fragmentos, ruta en disco o None). Se abren los de data/vectors/shards/
+        si coinciden en número, esquema y versión del artefacto; si no, se
+        dividen en memoria (el pool de procesos necesita los guardados).
+        Los guardados se vuelven a abrir si se reescribieron desde la última vez.
+        """
+        key = (corpus_name, field.lower(), vector_type, ngram_code(ngram_type))
+        if key in self._shards and self._shards[key][1] is not None \
+                and shards_signature(self._shards[key][1]) != self._shard_versions.get(key):
+            self.forget_shards(key)
+        if key not in self._shards:
+            _, X = self.get_model(corpus_name, field, vector_type, ngram_type)
+            source = artifact_path(self.base_path, corpus_name, field, vector_type, ngram_type)
+            path = shards_path(os.path.join(self.base_path, "data", "vectors"), artifact_name(*key))
+            manifest = read_shards_manifest(path)
+            if (manifest is not None and manifest["n_shards"] == max(1, min(self.shards, X.shape[0]))
+                    and manifest["scheme"] == self.shard_by
+                    and manifest["source"].get("signature") == artifact_signature(source)):
+                shards, _ = open_shards(path)
+                self._shard_versions[key] = manifest_signature(manifest)
+            elif self._scatter.uses_processes:
+                raise ValueError(f"El pool de procesos necesita los fragmentos guardados de {artifact_name(*key)}: "
+                                 f"python -m representation.shards --shards {self.shards} --by {self.shard_by}")
+            elif self.shards == 1:
+                norms = load_row_norms(self.base_path, corpus_name, field, vector_type, ngram_type, X)
+                shards, path = [Shard(X, np.arange(X.shape[0]), norms)], None
+            else:
+                dois = self.get_metadata(corpus_name)["DOI"].to_numpy() if self.shard_by == "doi" else None
+                parts = shard_rows(X.shape[0], self.shards, self.shard_by, dois)
+                shards, path = [Shard.from_rows(X, rows) for rows in parts], None
+            self._shards[key] = (shards, path)
+        return self._shards[key]
+
+    def get_shard_index(self, corpus_name, field, vector_type, ngram_type, i):
+        key = (corpus_name, field.lower(), vector_type, ngram_code(ngram_type), i)
+        if key not in self._shard_indexes:
+            shards, _ = self.get_shards(corpus_name, field, vector_type, ngram_type)
+            self._shard_indexes[key] = InvertedIndex.from_matrix(shards[i].X)
+        return self._shard_indexes[key]
+
+    def uses_scatter(self, method):
+        return method in ("brute", "index", "maxscore") and (self.shards > 1 or self._scatter.workers > 1)
+
+    def get_index(self, corpus_name, field, vector_type, ngram_type):
+        key = (corpus_name, field.lower(), vector_type, ngram_code(ngram_type))
+        if key not in self._indexes:
+            _, X = self.get_model(corpus_name, field, vector_type, ngram_type)
+            self._indexes[key] = InvertedIndex.from_matrix(X)
+        return self._indexes[key]
+
+    def get_ann(self, corpus_name, field, vector_type, ngram_type):
+        key = (corpus_name, field.lower(), vector_type, ngram_code(ngram_type))
+        if key not in self._ann:
+            from similarities.ann import load_or_build
+            _, X = self.get_model(corpus_name, field, vector_type, ngram_type)
+            path = artifact_path(self.base_path, corpus_name, field, vector_type, ngram_type)
+            vectors_dir = os.path.join(self.base_path, "data", "vectors")
+            name = artifact_name(corpus_name, field, vector_type, ngram_code(ngram_type))
+            self._ann[key] = load_or_build(path, X, vectors_dir, name, self.ann_options).attach(X)
+        return self._ann[key]
+
+    def get_metadata(self, corpus_name):
+        """Metadatos del corpus; se vuelven a leer si el CSV crudo cambió desde la última carga."""
+        version = metadata_signature(self.base_path, corpus_name)
+        if corpus_name not in self._metadata or self._metadata_versions.get(corpus_name) != version:
+            self._metadata[corpus_name] = load_metadata(self.base_path, corpus_name)
+            self._metadata_versions[corpus_name] = version
+        return self._metadata[corpus_name]
+
+    def preload(self, fields, vector_types, ngram_types):
+        """Carga por adelantado todas las combinaciones indicadas (las que existan)."""
+        for corpus_name in self.corpora:
+            try:
+                self.get_metadata(corpus_name)
+            except FileNotFoundError as e:
+                print(f" {e}")
+                continue
+            for field in fields:
+                for vector_type in vector_types:
+                    for ngram_type in ngram_types:
+                        try:
+                            self.get_model(corpus_name, field, vector_type, ngram_type)
+                            if self.method == "ann":
+                                self.get_ann(corpus_name, field, vector_type, ngram_type)
+                            elif self.uses_scatter(self.method):
+                                self.get_shards(corpus_name, field, vector_type, ngram_type)
+                            elif self.method != "brute":
+                                self.get_index(corpus_name, field, vector_type, ngram_type)
+                            else:
+                                self.get_inverse_norms(corpus_name, field, vector_type, ngram_type)
+                        except (FileNotFoundError, ValueError) as e:
+                            print(f" {e}")
+
+    def clear(self):
+        self._models.clear()
+        self._versions.clear()
+        self._metadata.clear()
+        self._metadata_versions.clear()
+        self._indexes.clear()
+        self._ann.clear()
+        self._norms.clear()
+        self._shards.clear()
+        self._shard_versions.clear()
+        self._shard_indexes.clear()
+
+    def close(self):
+        """Libera el pool de trabajadores (si se creó)."""
+        self._scatter.close()
+
+    def query(self, query_text, field, vector_type, ngram_type, topk=10, normalized=False, method=None):
+        """
+        Devuelve los `topk` artículos más similares a `query_text` entre todos los corpus.
+        Si `normalized` es False, el texto se normaliza con la misma tubería NLTK del corpus.
+        """
+        return self.query_batch([query_text], field, vector_type, ngram_type, topk, normalized, method)[0]
+
+    def query_batch(self, query_texts, field, vector_type, ngram_type, topk=10, normalized=False, method=None):
+        """
+        Igual que `query` pero para muchas consultas a la vez: todas se apilan en
+        una sola matriz dispersa y se hace un único producto por corpus (o por fragmento).
+        Devuelve una lista de resultados por consulta, en el mismo orden.
+        `method` permite usar otro método distinto al del motor en esta llamada.
+        Con `cache`, solo se buscan las consultas que no estén ya guardadas.
+        """
+        method = method or self.method
+        if not normalized:
+            query_texts = [self.normalize(t) for t in query_texts]
+        # Siempre (haya caché o no): descarta los modelos cuyo artefacto cambió en disco antes de buscar,
+        # para no combinar una matriz vieja con metadatos recargados.
+        versions = self.artifact_versions(field, vector_type, ngram_type)
+        if self.cache is None or method == "cosine" or not query_texts:
+            return self._search_batch(query_texts, field, vector_type, ngram_type, topk, method)
+
+        config = (field.lower(), vector_type, ngram_code(ngram_type), topk, method,
+                  tuple(sorted(self.ann_options.items())) if method == "ann" else None, versions)
+        keys = [(text_key(t), *config) for t in query_texts]
+        results = [self.cache.get(key) for key in keys]
+        missing = [q for q, rows in enumerate(results) if rows is None]
+        if missing:
+            fresh = self._search_batch([query_texts[q] for q in missing], field, vector_type, ngram_type, topk, method)
+            for q, rows in zip(missing, fresh):
+                self.cache.put(keys[q], rows)
+                results[q] = rows
+        return [[dict(row) for row in rows] for rows in results]
+
+    def normalize(self, text):
+        """normalize_single_text, con el resultado guardado en la caché (si hay)."""
+        if self.cache is None:
+            return normalize_single_text(text)
+        key = ("normalized", text_key(text))
+        normalized = self.cache.get(key)
+        if normalized is None:
+            normalized = normalize_single_text(text)
+            self.cache.put(key, normalized)
+        return normalized
+
+    def _search_batch(self, query_texts, field, vector_type, ngram_type, topk, method):
+        # Una lista ordenada por (consulta, corpus o fragmento); al final se fusionan con un heap.
+        per_corpus = [[] for _ in query_texts]
+        if not query_texts:
+            return per_corpus
+        pending = []
+
+        for corpus_name in self.corpora:
+            try:
+                vectorizer, X_corpus = self.get_model(corpus_name, field, vector_type, ngram_type)
+                corpus_df = self.get_metadata(corpus_name)
+                if len(corpus_df) != X_corpus.shape[0]:
+                    raise ValueError(f"{corpus_name}: el CSV tiene {len(corpus_df)} filas y la matriz "
+                                     f"{field}/{vector_type} {X_corpus.shape[0]}; vuelva a vectorizar el corpus.")
+            except (FileNotFoundError, ValueError) as e:
+                print(f" {e}")
+                continue
+
+            X_query = vectorizer.transform(query_texts)
+
+            if self.uses_scatter(method):
+                shards, path = self.get_shards(corpus_name, field, vector_type, ngram_type)
+                signature = self._shard_versions.get((corpus_name, field.lower(), vector_type, ngram_code(ngram_type)))
+                for i, shard in enumerate(shards):
+                    index = None
+                    if method != "brute" and not self._scatter.uses_processes:
+                        index = self.get_shard_index(corpus_name, field, vector_type, ngram_type, i)
+                    future = self._scatter.submit(shard, X_query, topk, method, index, path, i, signature)
+                    pending.append((corpus_name, corpus_df, future))
+                continue
+
+            if method == "ann":
+                ann = self.get_ann(corpus_name, field, vector_type, ngram_type)
+                nprobe, rerank = self.ann_options.get("nprobe"), self.ann_options.get("rerank")
+                for q in range(X_query.shape[0]):
+                    top_indices, scores = ann.search(X_query[q], topk, nprobe, rerank, self.stats)
+                    per_corpus[q].append(self._rows(corpus_name, corpus_df, top_indices, scores))
+                continue
+
+            if method == "cosine":
+                # Camino de referencia (normas de X recalculadas en cada llamada), usado por `verify`.
+                from sklearn.metrics.pairwise import cosine_similarity
+                S = cosine_similarity(X_query, X_corpus, dense_output=False).tocsr()
+                for q in range(S.shape[0]):
+                    similarities = S.getrow(q).toarray().ravel()
+                    top_indices = topk_indices(similarities, topk)
+                    per_corpus[q].append(self._rows(corpus_name, corpus_df, top_indices, similarities[top_indices]))
+                continue
+
+            if method != "brute":
+                index = self.get_index(corpus_name, field, vector_type, ngram_type)
+                for q in range(X_query.shape[0]):
+                    if method == "maxscore":
+                        top_indices, scores = index.search_maxscore(X_query[q], topk, self.stats)
+                    else:
+                        top_indices, scores = index.search(X_query[q], topk)
+                    per_corpus[q].append(self._rows(corpus_name, corpus_df, top_indices, scores))
+                continue
+
+            inverse_norms = self.get_inverse_norms(corpus_name, field, vector_type, ngram_type)
+            for q, similarities in enumerate(cosine_scores(X_corpus, X_query, inverse_norms)):
+                top_indices = topk_indices(similarities, topk)
+                per_corpus[q].append(self._rows(corpus_name, corpus_df, top_indices, similarities[top_indices]))
+
+        for corpus_name, corpus_df, future in pending:
+            results, stats = future.result()
+            for name, value in stats.items():
+                self.stats[name] = self.stats.get(name, 0) + value
+            for q, (top_indices, scores) in enumerate(results):
+                per_corpus[q].append(self._rows(corpus_name, corpus_df, top_indices, scores))
+
+        return [merge_topk(lists, topk) for lists in per_corpus]
+
+    def verify(self, query_texts, field, vector_type, ngram_type, topk=10, normalized=False):
+        """
+        Compara el método del motor contra la búsqueda exhaustiva sobre las mismas
+        consultas ("brute" se compara con cosine_similarity, que recalcula las
+        normas de X). Devuelve cuántas consultas difieren en las puntuaciones del
+        top-k (los empates pueden intercambiar documentos), el recall@k respecto
+        a los documentos con similitud > 0 del resultado exacto y las estadísticas de poda.
+        """
+        if not normalized:
+            query_texts = [self.normalize(t) for t in query_texts]
+        self.stats = {}
+        fast = self.query_batch(query_texts, field, vector_type, ngram_type, topk, normalized=True)
+        reference = "cosine" if self.method == "brute" else "brute"
+        exact = self.query_batch(query_texts, field, vector_type, ngram_type, topk, normalized=True, method=reference)
+
+        mismatches = 0
+        for a, b in zip(fast, exact):
+            sa = [round(r["Similarity"], 9) for r in a]
+            sb = [round(r["Similarity"], 9) for r in b]
+            if sa != sb:
+                mismatches += 1
+        return {"queries": len(query_texts), "mismatches": mismatches,
+                "recall": recall_at_k(fast, exact), **self.stats}
+
+    @staticmethod
+    def _rows(corpus_name, corpus_df, top_indices, scores):
+        rows = []
+        for idx, score in zip(top_indices, scores):
+            row = corpus_df.iloc[idx]
+            rows.append({
+                "Corpus": corpus_name,
+                "Title": row["Title"],
+                "DOI": row["DOI"],
+                "Date": row.get("Date", "N/A"),
+                "Similarity": float(score)
+            })
+        return rows
@@ -0,0 +1,154 @@
+import numpy as np
+import scipy.sparse as sp
+from similarities.topk import topk_indices, pad_topk
+
+
+# ---------------------- #
+#  Índice invertido      #
+# ---------------------- #
+class InvertedIndex:
+    """
+    Índice invertido (término → lista de documentos y pesos) construido a partir
+    de la misma matriz CSR que guarda `representation/vectorize.py`.
+
+    Los pesos se guardan ya divididos por la norma L2 de cada documento, de modo
+    que el producto con la consulta normalizada es exactamente la similitud coseno.
+    Solo se acumulan los documentos que comparten algún término con la consulta.
+
+    `max_weights` guarda el peso máximo de cada lista de postings; es la cota
+    superior por término que usa la poda MaxScore (`search_maxscore`).
+    """
+
+    def __init__(self, term_ptr, doc_ids, weights, n_docs):
+        self.term_ptr = term_ptr
+        self.doc_ids = doc_ids
+        self.weights = weights
+        self.n_docs = n_docs
+        self.n_terms = term_ptr.shape[0] - 1
+        lengths = np.diff(term_ptr)
+        self.max_weights = np.zeros(self.n_terms)
+        nonempty = lengths > 0
+        self.max_weights[nonempty] = np.maximum.reduceat(weights, term_ptr[:-1][nonempty]) if weights.size else 0.0
+
+    @classmethod
+    def from_matrix(cls, X):
+        X = sp.csr_matrix(X, dtype=np.float64)
+        norms = np.sqrt(np.asarray(X.multiply(X).sum(axis=1)).ravel())
+        norms[norms == 0] = 1.0
+        Xn = sp.diags(1.0 / norms) @ X
+        # En CSC cada columna (término) es una lista de postings contigua.
+        Xc = Xn.tocsc()
+        Xc.sort_indices()
+        return cls(Xc.indptr.astype(np.int64), Xc.indices.astype(np.int32), Xc.data, X.shape[0])
+
+    def postings(self, term):
+        start, end = self.term_ptr[term], self.term_ptr[term + 1]
+        return self.doc_ids[start:end], self.weights[start:end]
+
+    @staticmethod
+    def _query_terms(q):
+        """Términos y pesos L2-normalizados de una consulta (fila dispersa o vector)."""
+        q = sp.csr_matrix(q, dtype=np.float64)
+        terms, weights = q.indices, q.data
+        norm = np.sqrt(np.dot(weights, weights))
+        if norm == 0:
+            return terms[:0], weights[:0]
+        return terms, weights / norm
+
+    def score(self, q):
+        """
+        Acumulación término a término. Devuelve (doc_ids, puntuaciones) solo de
+        los documentos con al menos un término en común con la consulta.
+        """
+        terms, q_weights = self._query_terms(q)
+        docs_parts, contrib_parts = [], []
+        for term, qw in zip(terms, q_weights):
+            docs, weights = self.postings(term)
+            if docs.size:
+                docs_parts.append(docs)
+                contrib_parts.append(weights * qw)
+        if not docs_parts:
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float64)
+
+        docs = np.concatenate(docs_parts)
+        contrib = np.concatenate(contrib_parts)
+        order = np.argsort(docs, kind="stable")
+        docs, contrib = docs[order], contrib[order]
+        uniq, starts = np.unique(docs, return_index=True)
+        return uniq, np.add.reduceat(contrib, starts)
+
+    def search(self, q, k):
+        """
+        Devuelve (doc_ids, puntuaciones) de los `k` documentos más similares, en
+        orden descendente. Si menos de `k` documentos comparten términos, se
+        completa con documentos de similitud 0 (como en la búsqueda exhaustiva).
+        """
+        docs, scores = self.score(q)
+        top = topk_indices(scores, k)
+        return self._pad(docs[top], scores[top], k)
+
+    def search_maxscore(self, q, k, stats=None):
+        """
+        Búsqueda top-k exacta con poda MaxScore.
+
+        Los términos se recorren de mayor a menor cota (peso de la consulta por el
+        peso máximo de su lista). Mientras la suma de cotas de los términos
+        restantes supere al k-ésimo mejor puntaje parcial, cualquier documento
+        nuevo aún puede entrar al top-k y las listas se acumulan completas. En
+        cuanto deja de superarlo, solo se actualizan los candidatos ya vistos
+        (búsqueda binaria en la lista) y se descartan los que, aun sumando todas
+        las cotas restantes, no alcanzan el umbral.
+
+        Si se pasa un dict en `stats`, se acumulan en él los postings totales,
+        los puntuados y los omitidos.
+        """
+        terms, q_weights = self._query_terms(q)
+        bounds = q_weights * self.max_weights[terms]
+        order = np.argsort(-bounds, kind="stable")
+        terms, q_weights, bounds = terms[order], q_weights[order], bounds[order]
+        # remaining[i] = suma de cotas de los términos i, i+1, ...
+        remaining = np.concatenate([np.cumsum(bounds[::-1])[::-1], [0.0]])
+
+        cand_docs = np.empty(0, dtype=np.int32)
+        cand_scores = np.empty(0, dtype=np.float64)
+        threshold = 0.0
+        total = scored = 0
+
+        for i, (term, qw) in enumerate(zip(terms, q_weights)):
+            docs, weights = self.postings(term)
+            total += docs.size
+            if docs.size == 0:
+                continue
+
+            if cand_docs.size < k or remaining[i] > threshold:
+                # Fase completa: documentos nuevos todavía pueden entrar al top-k.
+                all_docs = np.concatenate([cand_docs, docs])
+                all_scores = np.concatenate([cand_scores, weights * qw])
+                idx = np.argsort(all_docs, kind="stable")
+                all_docs, all_scores = all_docs[idx], all_scores[idx]
+                cand_docs, starts = np.unique(all_docs, return_index=True)
+                cand_scores = np.add.reduceat(all_scores, starts)
+                scored += docs.size
+            else:
+                # Fase de poda: solo candidatos que aún pueden alcanzar el umbral.
+                keep = cand_scores + remaining[i] >= threshold
+                cand_docs, cand_scores = cand_docs[keep], cand_scores[keep]
+                pos = np.searchsorted(docs, cand_docs)
+                pos_ok = np.minimum(pos, docs.size - 1)
+                hit = (pos < docs.size) & (docs[pos_ok] == cand_docs)
+                cand_scores[hit] += weights[pos_ok[hit]] * qw
+                scored += int(hit.sum())
+
+            if cand_docs.size >= k:
+                threshold = cand_scores[topk_indices(cand_scores, k)[-1]]
+
+        if stats is not None:
+            stats["postings_total"] = stats.get("postings_total", 0) + total
+            stats["postings_scored"] = stats.get("postings_scored", 0) + scored
+            stats["postings_skipped"] = stats.get("postings_skipped", 0) + total - scored
+
+        top = topk_indices(cand_scores, k)
+        return self._pad(cand_docs[top], cand_scores[top], k)
+
+    def _pad(self, docs, scores, k):
+        return pad_topk(docs, scores, k, self.n_docs)
@@ -0,0 +1,380 @@
+import argparse
+import json
+import os
+import shutil
+import time
+import uuid
+import zlib
+import numpy as np
+import scipy.sparse as sp
+from normalization.normalization import normalize_single_text
+from representation.store import MANIFEST, artifact_name, artifact_signature
+from similarities.engine import CORPORA, SimilarityEngine, artifact_path, ngram_code
+
+MINHASH_FORMAT = "simdoc-minhash"
+MINHASH_VERSION = 1
+DEFAULTS = {"num_perm": 128, "bands": 32, "seed": 1}
+_PRIME = (1 << 31) - 1
+_EMPTY = np.uint32(0xFFFFFFFF)
+
+
+# ---------------------- #
+#  Firmas MinHash        #
+# ---------------------- #
+def term_keys(terms):
+    """
+    Clave estable (crc32) de cada n-grama. No depende del vocabulario de cada
+    artefacto, así que las firmas de arXiv y PubMed son comparables entre sí.
+    """
+    return np.fromiter((zlib.crc32(str(t).encode("utf-8")) for t in terms), dtype=np.uint32, count=len(terms))
+
+
+def hash_params(num_perm, seed):
+    """Coeficientes de las `num_perm` funciones h(x) = (a·x + b) mod p."""
+    rng = np.random.default_rng(seed)
+    return rng.integers(1, _PRIME, size=num_perm, dtype=np.int64), rng.integers(0, _PRIME, size=num_perm, dtype=np.int64)
+
+
+def signatures(X, keys, num_perm=128, seed=1, max_cells=1 << 23):
+    """
+    Firma MinHash (n_docs × num_perm, uint32) de cada fila de la matriz binaria X,
+    tratando la fila como el conjunto de claves de sus n-gramas. Las filas vacías
+    quedan con todos los valores en 0xFFFFFFFF. Se procesa por bloques de filas
+    para no materializar más de `max_cells` hashes a la vez.
+    """
+    X = sp.csr_matrix(X)
+    a, b = hash_params(num_perm, seed)
+    sig = np.full((X.shape[0], num_perm), _EMPTY, dtype=np.uint32)
+    values = np.asarray(keys, dtype=np.int64)[X.indices] % _PRIME
+    lengths = np.diff(X.indptr)
+    budget = max(1, max_cells // num_perm)
+
+    start = 0
+    while start < X.shape[0]:
+        end = int(np.searchsorted(X.indptr, X.indptr[start] + budget, "right")) - 1
+        end = min(max(end, start + 1), X.shape[0])
+        lo, hi = X.indptr[start], X.indptr[end]
+        rows = np.flatnonzero(lengths[start:end])
+        if rows.size:
+            H = (a[:, None] * values[None, lo:hi] + b[:, None]) % _PRIME
+            sig[start + rows] = np.minimum.reduceat(H, X.indptr[start + rows] - lo, axis=1).T
+        start = end
+    return sig
+
+
+# ---------------------- #
+#  Índice LSH (bandas)   #
+# ---------------------- #
+class LshIndex:
+    """
+    Divide cada firma en `bands` bandas de `num_perm / bands` valores; dos
+    documentos son candidatos si coinciden en al menos una banda. Con b bandas
+    de r filas, un par con Jaccard s es candidato con probabilidad 1 - (1 - s^r)^b
+    (umbral aproximado (1/b)^(1/r)). Solo se comparan los candidatos, nunca todos los pares.
+    """
+
+    def __init__(self, sig, bands=32, seed=1):
+        num_perm = sig.shape[1]
+        if num_perm % bands:
+            raise ValueError(f"num_perm ({num_perm}) debe ser múltiplo de bands ({bands}).")
+        self.bands = bands
+        self.rows = num_perm // bands
+        self._mult = np.random.default_rng(seed).integers(1, 1 << 62, size=self.rows, dtype=np.uint64) | np.uint64(1)
+        # Los documentos vacíos no se indexan (coincidirían todos entre sí).
+        self.ids = np.flatnonzero(sig[:, 0] != _EMPTY)
+        keys = self.band_keys(sig[self.ids])
+        self._order = np.argsort(keys, axis=0, kind="stable")
+        self._sorted = np.take_along_axis(keys, self._order, axis=0)
+
+    def band_keys(self, sig):
+        """Clave de 64 bits de cada banda (n × bands)."""
+        bands = sig.reshape(sig.shape[0], self.bands, self.rows).astype(np.uint64)
+        return (bands * self._mult).sum(axis=2)
+
+    def candidates(self, sig_row):
+        """Documentos que comparten al menos una banda con la firma `sig_row`."""
+        keys = self.band_keys(sig_row.reshape(1, -1))[0]
+        found = []
+        for band, key in enumerate(keys):
+            column = self._sorted[:, band]
+            lo, hi = np.searchsorted(column, key, "left"), np.searchsorted(column, key, "right")
+            found.append(self._order[lo:hi, band])
+        return np.unique(self.ids[np.concatenate(found)]) if found else np.empty(0, dtype=np.int64)
+
+    def pairs(self, max_bucket=1000):
+        """
+        Pares candidatos (i < j), sin repetir, de todos los buckets. Los buckets
+        con más de `max_bucket` documentos (texto genérico repetido) se omiten.
+        """
+        found = []
+        for band in range(self.bands):
+            column = self._sorted[:, band]
+            starts = np.flatnonzero(np.r_[True, column[1:] != column[:-1]])
+            sizes = np.diff(np.r_[starts, column.size])
+            for start, size in zip(starts[sizes > 1], sizes[sizes > 1]):
+                if size > max_bucket:
+                    continue
+                members = self.ids[self._order[start:start + size, band]]
+                i, j = np.triu_indices(size, 1)
+                found.append(np.stack([members[i], members[j]], axis=1))
+        if not found:
+            return np.empty((0, 2), dtype=np.int64)
+        pairs = np.sort(np.concatenate(found), axis=1)
+        return np.unique(pairs, axis=0)
+
+
+# ---------------------- #
+#  Persistencia          #
+# ---------------------- #
+def minhash_path(vectors_dir, name):
+    return os.path.join(vectors_dir, "minhash", name)
+
+
+def save_signatures(path, sig, params, source):
+    tmp = f"{path}.tmp-{uuid.uuid4().hex[:8]}"
+    os.makedirs(tmp)
+    np.save(os.path.join(tmp, "signatures.npy"), sig)
+    manifest = {
+        "format": MINHASH_FORMAT,
+        "version": MINHASH_VERSION,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "params": params,
+        "n_docs": int(sig.shape[0]),
+        "source": source,
+    }
+    with open(os.path.join(tmp, MANIFEST), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    old = None
+    if os.path.exists(path):
+        old = f"{path}.old-{uuid.uuid4().hex[:8]}"
+        os.replace(path, old)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    os.replace(tmp, path)
+    if old:
+        shutil.rmtree(old, ignore_errors=True)
+
+
+def load_or_build_signatures(artifact, X, keys, vectors_dir, name, num_perm, seed):
+    """Firmas guardadas en vectors/minhash/<artefacto>/ si siguen vigentes; si no, se calculan y se guardan."""
+    path = minhash_path(vectors_dir, name)
+    params = {"num_perm": num_perm, "seed": seed}
+    signature = artifact_signature(artifact)
+    manifest_path = os.path.join(path, MANIFEST)
+    if os.path.isfile(manifest_path):
+        with open(manifest_path, encoding="utf-8") as f:
+            manifest = json.load(f)
+        if (manifest.get("format") == MINHASH_FORMAT and manifest.get("params") == params
+                and manifest.get("source", {}).get("signature") == signature):
+            return np.load(os.path.join(path, "signatures.npy"), mmap_mode="r")
+    sig = signatures(X, keys, num_perm, seed)
+    save_signatures(path, sig, params, {"artifact": os.path.basename(artifact), "signature": signature})
+    return sig
+
+
+# ---------------------- #
+#  Casi-duplicados       #
+# ---------------------- #
+class NearDuplicates:
+    """
+    Casi-duplicados por Jaccard sobre los conjuntos de n-gramas de la
+    representación binaria, en todos los corpus a la vez. Las filas de cada
+    corpus se llevan a un espacio común de claves de n-grama (crc32), de modo
+    que la similitud exacta de los candidatos LSH se calcula igual dentro de un
+    corpus y entre arXiv y PubMed.
+    """
+
+    def __init__(self, field, ngram_type, base_path=".", corpora=None, engine=None, options=None):
+        self.options = {**DEFAULTS, **(options or {})}
+        self.engine = engine or SimilarityEngine(base_path, corpora)
+        self.field = field
+        self.ngram_type = ngram_type
+        vectors_dir = os.path.join(self.engine.base_path, "data", "vectors")
+
+        self.corpora, self.metadata, offsets, row_keys, indptrs, sigs = [], [], [0], [], [np.zeros(1, dtype=np.int64)], []
+        for corpus_name in self.engine.corpora:
+            try:
+                vectorizer, X = self.engine.get_model(corpus_name, field, "binary", ngram_type)
+                corpus_df = self.engine.get_metadata(corpus_name)
+            except (FileNotFoundError, ValueError) as e:
+                print(f" {e}")
+                continue
+            X = sp.csr_matrix(X)
+            keys = term_keys(vectorizer.get_feature_names_out())
+            path = artifact_path(self.engine.base_path, corpus_name, field, "binary", ngram_type)
+            name = artifact_name(corpus_name, field, "binary", ngram_code(ngram_type))
+            sigs.append(load_or_build_signatures(path, X, keys, vectors_dir, name,
+                                                 self.options["num_perm"], self.options["seed"]))
+            row_keys.append(keys[X.indices])
+            indptrs.append(X.indptr[1:].astype(np.int64) + indptrs[-1][-1])
+            self.corpora.append(corpus_name)
+            self.metadata.append(corpus_df)
+            offsets.append(offsets[-1] + X.shape[0])
+        if not self.corpora:
+            raise FileNotFoundError("No se encontró ninguna representación binaria para los parámetros indicados.")
+        self.offsets = np.array(offsets)
+
+        # Matriz binaria global: columnas = claves de n-grama distintas de todos los corpus.
+        self.term_keys, columns = np.unique(np.concatenate(row_keys), return_inverse=True)
+        B = sp.csr_matrix((np.ones(columns.size), columns.ravel(), np.concatenate(indptrs)),
+                          shape=(self.n_docs, self.term_keys.size))
+        B.sum_duplicates()
+        B.data[:] = 1
+        self.B = B
+        self.sizes = np.diff(B.indptr)
+        self.signatures = np.vstack(sigs)
+        self.lsh = LshIndex(self.signatures, self.options["bands"], self.options["seed"])
+
+    @property
+    def n_docs(self):
+        return int(self.offsets[-1])
+
+    def locate(self, doc):
+        c = int(np.searchsorted(self.offsets, doc, "right") - 1)
+        return c, int(doc - self.offsets[c])
+
+    def jaccard_pairs(self, pairs, chunk=100_000):
+        """Jaccard exacto de cada par (i, j) de documentos globales."""
+        if pairs.size == 0:
+            return np.empty(0)
+        inter = np.concatenate([
+            np.asarray(self.B[p[:, 0]].multiply(self.B[p[:, 1]]).sum(axis=1)).ravel()
+            for p in (pairs[s:s + chunk] for s in range(0, len(pairs), chunk))
+        ])
+        union = self.sizes[pairs[:, 0]] + self.sizes[pairs[:, 1]] - inter
+        return np.divide(inter, union, out=np.zeros(inter.size), where=union > 0)
+
+    # ---- consulta ----
+    def query(self, text, threshold=0.5, topk=10, normalized=False):
+        """Documentos de todos los corpus con Jaccard >= `threshold` respecto a `text`, de mayor a menor."""
+        if not normalized:
+            text = normalize_single_text(text)
+        vectorizer, _ = self.engine.get_model(self.corpora[0], self.field, "binary", self.ngram_type)
+        keys = np.unique(term_keys(vectorizer.build_analyzer()(text)))
+        if keys.size == 0:
+            return []
+        sig = signatures(sp.csr_matrix((np.ones(keys.size), np.arange(keys.size), [0, keys.size])), keys,
+                         self.options["num_perm"], self.options["seed"])[0]
+        docs = self.lsh.candidates(sig)
+        if docs.size == 0:
+            return []
+
+        known = keys[np.isin(keys, self.term_keys, assume_unique=True)]
+        q = np.zeros(self.term_keys.size)
+        q[np.searchsorted(self.term_keys, known)] = 1
+        inter = self.B[docs] @ q
+        scores = inter / (keys.size + self.sizes[docs] - inter)
+        keep = scores >= threshold
+        docs, scores = docs[keep], scores[keep]
+        order = np.argsort(-scores, kind="stable")[:topk]
+        return [self._row(docs[i], Jaccard=float(scores[i])) for i in order]
+
+    # ---- deduplicación ----
+    def duplicates(self, threshold=0.8, max_bucket=1000):
+        """
+        Pares con Jaccard exacto >= `threshold` (solo entre candidatos LSH) y
+        grupos de casi-duplicados (componentes conexas). Devuelve
+        (pares [(i, j, jaccard)], grupos [[docs]], n.º de candidatos).
+        """
+        candidates = self.lsh.pairs(max_bucket)
+        scores = self.jaccard_pairs(candidates)
+        keep = scores >= threshold
+        pairs, scores = candidates[keep], scores[keep]
+        order = np.argsort(-scores, kind="stable")
+        pairs, scores = pairs[order], scores[order]
+
+        parent = list(range(self.n_docs))
+
+        def find(x):
+            while parent[x] != x:
+                parent[x] = parent[parent[x]]
+                x = parent[x]
+            return x
+
+        for i, j in pairs:
+            ri, rj = find(int(i)), find(int(j))
+            if ri != rj:
+                parent[max(ri, rj)] = min(ri, rj)
+        groups = {}
+        for doc in np.unique(pairs):
+            groups.setdefault(find(int(doc)), []).append(int(doc))
+        return [(int(i), int(j), float(s)) for (i, j), s in zip(pairs, scores)], list(groups.values()), len(candidates)
+
+    def report(self, threshold=0.8, max_bucket=1000):
+        """Tabla de pares casi-duplicados (una fila por par) con el grupo al que pertenecen."""
+        pairs, groups, n_candidates = self.duplicates(threshold, max_bucket)
+        group_of = {doc: g for g, docs in enumerate(groups, start=1) for doc in docs}
+        rows = []
+        for i, j, score in pairs:
+            a, b = self._row(i), self._row(j)
+            rows.append({
+                "Group": group_of[i],
+                "Jaccard": round(score, 4),
+                "Corpus1": a["Corpus"], "DOI1": a["DOI"], "Title1": a["Title"],
+                "Corpus2": b["Corpus"], "DOI2": b["DOI"], "Title2": b["Title"],
+            })
+        columns = ["Group", "Jaccard", "Corpus1", "DOI1", "Title1", "Corpus2", "DOI2", "Title2"]
+        summary = {"docs": self.n_docs, "candidates": n_candidates, "pairs": len(pairs), "groups": len(groups),
+                   "cross_corpus": sum(r["Corpus1"] != r["Corpus2"] for r in rows)}
+        import pandas as pd
+        return pd.DataFrame(rows, columns=columns), summary
+
+    def _row(self, doc, **extra):
+        c, r = self.locate(doc)
+        row = self.metadata[c].iloc[r]
+        return {"Corpus": self.corpora[c], "Title": row["Title"], "DOI": row["DOI"], "Date": row.get("Date", "N/A"), **extra}
+
+
+# ---------------------- #
+#       ARGPARSE         #
+# ---------------------- #
+def main():
+    parser = argparse.ArgumentParser(description="Casi-duplicados por MinHash + LSH sobre la representación binaria (Jaccard de n-gramas).")
+    mode = parser.add_mutually_exclusive_group(required=True)
+    mode.add_argument("--file", help="Archivo de consulta (.bib o .ris): documentos similares por Jaccard.")
+    mode.add_argument("--report", metavar="TSV", help="Reporte de casi-duplicados de todo el corpus (pares y grupos).")
+    parser.add_argument("--field", choices=["Title", "Abstract"], default="Abstract", help="Campo a comparar.")
+    parser.add_argument("--ngrams", choices=["unigram", "bigram", "both"], default="bigram",
+                        help="N-gramas de la representación binaria usados como shingles.")
+    parser.add_argument("--basepath", default=".", help="Ruta base con data/corpus/ y data/vectors/.")
+    parser.add_argument("--corpora", default=",".join(CORPORA), help="Corpus a incluir, separados por coma.")
+    parser.add_argument("--threshold", type=float, default=None, help="Jaccard mínimo (0.5 en consultas, 0.8 en el reporte).")
+    parser.add_argument("--topk", type=int, default=10, help="Con --file: número máximo de documentos.")
+    parser.add_argument("--num-perm", type=int, default=DEFAULTS["num_perm"], help="Funciones hash por firma.")
+    parser.add_argument("--bands", type=int, default=DEFAULTS["bands"], help="Bandas LSH (num_perm debe ser múltiplo).")
+    parser.add_argument("--max-bucket", type=int, default=1000, help="Con --report: omite buckets más grandes que esto.")
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    dedup = NearDuplicates(args.field, args.ngrams, args.basepath, args.corpora.split(","),
+                           options={"num_perm": args.num_perm, "bands": args.bands})
+    print(f" Firmas e índice LSH listos: {dedup.n_docs} documentos ({time.perf_counter() - t0:.2f}s)")
+
+    if args.file:
+        from similarities.retrieve_similar_articles import read_query
+        title, abstract = read_query(args.file)
+        text = title if args.field == "Title" else abstract
+        if not text:
+            print(" No se encontró texto en el campo seleccionado.")
+            return
+        threshold = 0.5 if args.threshold is None else args.threshold
+        results = dedup.query(text, threshold, args.topk)
+        if not results:
+            print(f" Ningún documento con Jaccard >= {threshold}.")
+        for i, r in enumerate(results, start=1):
+            print(f"{i}. [{r['Corpus'].upper()}] {r['Title']} (Jaccard: {r['Jaccard']:.3f})")
+            print(f"   DOI: {r['DOI']}")
+        return
+
+    threshold = 0.8 if args.threshold is None else args.threshold
+    t0 = time.perf_counter()
+    df, summary = dedup.report(threshold, args.max_bucket)
+    df.to_csv(args.report, sep="\t", index=False, encoding="utf-8")
+    all_pairs = dedup.n_docs * (dedup.n_docs - 1) // 2
+    print(f" Pares candidatos LSH: {summary['candidates']} de {all_pairs} posibles ({time.perf_counter() - t0:.2f}s)")
+    print(f" Casi-duplicados (Jaccard >= {threshold}): {summary['pairs']} pares en {summary['groups']} grupos"
+          f" ({summary['cross_corpus']} entre corpus distintos)")
+    print(f"✅ Reporte generado: {args.report}")
+
+
+if __name__ == "__main__":
+    main()
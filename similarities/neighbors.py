@@ -0,0 +1,265 @@
+import argparse
+import json
+import os
+import shutil
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import scipy.sparse as sp
+from representation.hashing import HASHED_REPS
+from representation.store import MANIFEST, artifact_name, artifact_signature
+from similarities.engine import CORPORA, artifact_path, load_metadata, load_vectors, ngram_code
+from similarities.topk import topk_indices
+
+NEIGHBORS_FORMAT = "simdoc-neighbors"
+NEIGHBORS_VERSION = 1
+DEFAULT_MAX_PRODUCTS = 20_000_000
+
+
+# ---------------------- #
+#  Bloques               #
+# ---------------------- #
+def product_costs(X):
+    """
+    Cota del trabajo (y de los no nulos de la salida) que genera cada fila en
+    X · Xᵀ: la suma, sobre sus términos, del número de documentos que los contienen.
+    """
+    X = sp.csr_matrix(X)
+    pattern = sp.csr_matrix((np.ones(X.nnz), X.indices, X.indptr), shape=X.shape)
+    df = np.bincount(X.indices, minlength=X.shape[1])
+    return pattern @ df
+
+
+def row_blocks(costs, max_products):
+    """Rangos [inicio, fin) de filas consecutivas cuyo costo acumulado no supera `max_products` (mínimo una fila)."""
+    cumulative = np.concatenate([[0], np.cumsum(costs)])
+    blocks, start, n = [], 0, len(costs)
+    while start < n:
+        end = int(np.searchsorted(cumulative, cumulative[start] + max_products, "right")) - 1
+        end = min(max(end, start + 1), n)
+        blocks.append((start, end))
+        start = end
+    return blocks
+
+
+def block_topk(Xn, XnT, start, end, k, threshold=0.0, include_self=False):
+    """
+    Top-k vecinos de las filas [start, end) con un único producto disperso
+    Xn[start:end] · Xnᵀ. Solo se conservan similitudes > `threshold`.
+    Devuelve (filas, columnas, similitudes) en coordenadas globales.
+    """
+    S = (Xn[start:end] @ XnT).tocsr()
+    drop = S.data <= threshold
+    if not include_self:
+        own = np.repeat(np.arange(start, end), np.diff(S.indptr))
+        drop |= S.indices == own
+    S.data[drop] = 0
+    S.eliminate_zeros()
+
+    rows, cols, vals = [], [], []
+    for i in range(S.shape[0]):
+        lo, hi = S.indptr[i], S.indptr[i + 1]
+        if lo == hi:
+            continue
+        top = topk_indices(S.data[lo:hi], k)
+        rows.append(np.full(top.size, start + i, dtype=np.int64))
+        cols.append(S.indices[lo:hi][top])
+        vals.append(S.data[lo:hi][top])
+    if not rows:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+    return np.concatenate(rows), np.concatenate(cols).astype(np.int64), np.concatenate(vals).astype(np.float32)
+
+
+def l2_rows(X):
+    """Filas de X con norma L2 unitaria (sklearn se importa solo al usarse)."""
+    from sklearn.preprocessing import normalize
+    return normalize(sp.csr_matrix(X), norm="l2")
+
+
+# Estado por proceso: cada trabajador carga (o mapea) la matriz una sola vez.
+_WORKER = {}
+
+
+def _init_worker(base_path, corpus_name, field, vector_type, ngram_type):
+    _, X = load_vectors(base_path, corpus_name, field, vector_type, ngram_type)
+    Xn = l2_rows(X)
+    _WORKER.update(Xn=Xn, XnT=Xn.T.tocsr())
+
+
+def _worker_block(args):
+    start, end, k, threshold, include_self = args
+    return block_topk(_WORKER["Xn"], _WORKER["XnT"], start, end, k, threshold, include_self)
+
+
+def all_pairs_topk(X, k=10, threshold=0.0, max_products=DEFAULT_MAX_PRODUCTS, include_self=False,
+                   workers=1, loader=None, progress=None):
+    """
+    Matriz dispersa n × n (float32, CSR) con, en cada fila, los `k` documentos
+    más similares (coseno > `threshold`). Las filas se procesan por bloques
+    cuyo producto no supera `max_products` multiplicaciones, así que la memoria
+    por bloque está acotada sin importar el tamaño del corpus.
+
+    Con `workers` > 1 los bloques se reparten en un ProcessPoolExecutor; cada
+    proceso vuelve a cargar la matriz con `loader` (tupla de argumentos de
+    `load_vectors`), en vez de recibirla serializada en cada tarea.
+    """
+    X = sp.csr_matrix(X)
+    n = X.shape[0]
+    blocks = row_blocks(product_costs(X), max_products)
+    tasks = [(start, end, k, threshold, include_self) for start, end in blocks]
+
+    parts = []
+    if workers > 1 and loader is not None and len(blocks) > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=loader) as pool:
+            for i, part in enumerate(pool.map(_worker_block, tasks)):
+                parts.append(part)
+                if progress:
+                    progress(i + 1, len(blocks))
+    else:
+        Xn = l2_rows(X)
+        XnT = Xn.T.tocsr()
+        for i, task in enumerate(tasks):
+            parts.append(block_topk(Xn, XnT, *task))
+            if progress:
+                progress(i + 1, len(blocks))
+
+    rows = np.concatenate([p[0] for p in parts]) if parts else np.empty(0, dtype=np.int64)
+    cols = np.concatenate([p[1] for p in parts]) if parts else np.empty(0, dtype=np.int64)
+    vals = np.concatenate([p[2] for p in parts]) if parts else np.empty(0, dtype=np.float32)
+    # Las filas llegan en orden y cada una ya ordenada de mayor a menor similitud.
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=n), out=indptr[1:])
+    return sp.csr_matrix((vals, cols, indptr), shape=(n, n)), len(blocks)
+
+
+# ---------------------- #
+#  Persistencia          #
+# ---------------------- #
+def neighbors_path(vectors_dir, name, k):
+    return os.path.join(vectors_dir, "neighbors", f"{name}_k{k}")
+
+
+def save_neighbors(path, N, params, source):
+    """
+    Escribe la matriz de vecinos como data.npy / indices.npy / indptr.npy +
+    manifest.json. Las columnas de cada fila NO están ordenadas por id sino
+    por similitud decreciente.
+    """
+    tmp = f"{path}.tmp-{uuid.uuid4().hex[:8]}"
+    os.makedirs(tmp)
+    for name in ("data", "indices", "indptr"):
+        np.save(os.path.join(tmp, f"{name}.npy"), np.ascontiguousarray(getattr(N, name)))
+    manifest = {
+        "format": NEIGHBORS_FORMAT,
+        "version": NEIGHBORS_VERSION,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "shape": list(N.shape),
+        "nnz": int(N.nnz),
+        "params": params,
+        "source": source,
+    }
+    with open(os.path.join(tmp, MANIFEST), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    old = None
+    if os.path.exists(path):
+        old = f"{path}.old-{uuid.uuid4().hex[:8]}"
+        os.replace(path, old)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    os.replace(tmp, path)
+    if old:
+        shutil.rmtree(old, ignore_errors=True)
+    return manifest
+
+
+def load_neighbors(path, mmap=True):
+    """(matriz de vecinos CSR, manifiesto). Con `mmap=True` los arreglos se mapean sin copiarlos a RAM."""
+    with open(os.path.join(path, MANIFEST), encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("format") != NEIGHBORS_FORMAT or manifest.get("version", 0) > NEIGHBORS_VERSION:
+        raise ValueError(f"El directorio {path} no contiene una matriz '{NEIGHBORS_FORMAT}' compatible.")
+    mode = "r" if mmap else None
+
+    def load(name):
+        return np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mode)
+
+    N = sp.csr_matrix((load("data"), load("indices"), load("indptr")), shape=tuple(manifest["shape"]), copy=False)
+    return N, manifest
+
+
+def neighbors_of(N, row):
+    """(ids, similitudes) de los vecinos de `row`, de mayor a menor."""
+    lo, hi = N.indptr[row], N.indptr[row + 1]
+    return np.asarray(N.indices[lo:hi]), np.asarray(N.data[lo:hi])
+
+
+def verify_rows(X, N, rows, k, threshold=0.0, include_self=False):
+    """Compara las filas `rows` de N con el top-k exhaustivo; devuelve cuántas difieren en las similitudes."""
+    Xn = l2_rows(X)
+    mismatches = 0
+    for r in rows:
+        s = (Xn @ Xn[r].T).toarray().ravel()
+        if not include_self:
+            s[r] = 0
+        s[s <= threshold] = 0
+        top = topk_indices(s, k)
+        expected = s[top][s[top] > 0]
+        _, got = neighbors_of(N, r)
+        if expected.shape != got.shape or not np.allclose(expected, got, atol=1e-5):
+            mismatches += 1
+    return mismatches
+
+
+# ---------------------- #
+#       ARGPARSE         #
+# ---------------------- #
+def main():
+    parser = argparse.ArgumentParser(description="Grafo de similitud documento-documento: top-k vecinos de cada fila con productos dispersos por bloques.")
+    parser.add_argument("--corpus", choices=CORPORA, required=True)
+    parser.add_argument("--field", choices=["Title", "Abstract"], default="Abstract")
+    parser.add_argument("--vector", choices=["tfidf", "frequency", "binary"] + HASHED_REPS, default="tfidf")
+    parser.add_argument("--ngrams", choices=["unigram", "bigram", "both"], default="unigram")
+    parser.add_argument("--basepath", default=".", help="Ruta base con data/vectors/.")
+    parser.add_argument("--topk", type=int, default=10, help="Vecinos por documento.")
+    parser.add_argument("--threshold", type=float, default=0.0, help="Similitud mínima (estrictamente mayor) para guardar un vecino.")
+    parser.add_argument("--max-products", type=float, default=DEFAULT_MAX_PRODUCTS,
+                        help="Multiplicaciones máximas por bloque (acota la memoria de cada producto).")
+    parser.add_argument("--workers", type=int, default=1, help="Procesos para repartir los bloques (1 = sin pool).")
+    parser.add_argument("--include-self", action="store_true", help="Incluye a cada documento como su propio vecino.")
+    parser.add_argument("--output", default=None, help="Directorio de salida (por defecto data/vectors/neighbors/<artefacto>_k<k>).")
+    parser.add_argument("--tsv", default=None, help="Exporta además las aristas (DOI, DOI vecino, similitud) a un TSV.")
+    parser.add_argument("--verify", type=int, default=0, metavar="N", help="Compara N filas al azar contra la búsqueda exhaustiva.")
+    args = parser.parse_args()
+
+    loader = (args.basepath, args.corpus, args.field, args.vector, args.ngrams)
+    _, X = load_vectors(*loader)
+    name = artifact_name(args.corpus, args.field, args.vector, ngram_code(args.ngrams))
+    output = args.output or neighbors_path(os.path.join(args.basepath, "data", "vectors"), name, args.topk)
+
+    t0 = time.perf_counter()
+    N, n_blocks = all_pairs_topk(X, args.topk, args.threshold, int(args.max_products), args.include_self,
+                                 args.workers, loader)
+    elapsed = time.perf_counter() - t0
+
+    source_path = artifact_path(*loader)
+    save_neighbors(output, N, {"k": args.topk, "threshold": args.threshold, "include_self": args.include_self},
+                   {"artifact": os.path.basename(source_path), "signature": artifact_signature(source_path)})
+    print(f"✅ {name}: {N.shape[0]} documentos, {N.nnz} aristas, {n_blocks} bloques en {elapsed:.2f}s → {output}")
+
+    if args.tsv:
+        import pandas as pd
+        corpus_df = load_metadata(args.basepath, args.corpus)
+        coo = N.tocoo()
+        dois = corpus_df["DOI"].to_numpy()
+        pd.DataFrame({"DOI": dois[coo.row], "NeighborDOI": dois[coo.col], "Similarity": np.round(coo.data, 4)}) \
+            .to_csv(args.tsv, sep="\t", index=False, encoding="utf-8")
+        print(f" Archivo TSV generado: {args.tsv}")
+
+    if args.verify:
+        rows = np.random.default_rng(0).choice(X.shape[0], size=min(args.verify, X.shape[0]), replace=False)
+        mismatches = verify_rows(X, N, rows, args.topk, args.threshold, args.include_self)
+        print(f" Verificación contra búsqueda exhaustiva: {len(rows) - mismatches}/{len(rows)} filas idénticas")
+
+
+if __name__ == "__main__":
+    main()
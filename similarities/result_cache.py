@@ -0,0 +1,142 @@
+import hashlib
+import json
+import os
+import uuid
+from collections import OrderedDict
+
+CACHE_VERSION = 1
+
+
+def text_key(text: str) -> str:
+    """Hash estable de un texto (la consulta ya normalizada, o la cruda para la caché de normalización)."""
+    return hashlib.sha256(str(text).encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """
+    Caché LRU de resultados de consultas del motor, indexada por tuplas
+    (hash del texto normalizado, campo, vectorización, n-gramas, top-k,
+    método, versiones de los artefactos). Como la versión del artefacto
+    (artifact_signature) forma parte de la clave, al reescribir un artefacto
+    las entradas anteriores dejan de coincidir y se desalojan solas.
+
+    Con `directory` se agrega un nivel en disco: un JSON por clave (sha256 de
+    la clave), escrito de forma atómica; lo que se encuentra en disco se
+    promueve a memoria. Si hay más de `max_files` archivos se eliminan los
+    usados hace más tiempo (la fecha de uso es el mtime).
+    """
+
+    def __init__(self, maxsize: int = 4096, directory: str = None, max_files: int = 100_000):
+        self.maxsize = maxsize
+        self.directory = directory
+        self.max_files = max_files
+        self._data = OrderedDict()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._n_files = 0
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            self._n_files = sum(name.endswith(".json") for name in os.listdir(directory))
+
+    def __len__(self):
+        return len(self._data)
+
+    def _path(self, key) -> str:
+        return os.path.join(self.directory, text_key(json.dumps(list(key), ensure_ascii=False)) + ".json")
+
+    # ---- lectura ----
+    def get(self, key):
+        value = self._data.get(key)
+        if value is not None:
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+        if self.directory:
+            value = self._read(key)
+            if value is not None:
+                self.disk_hits += 1
+                self._put(key, value)
+                return value
+        self.misses += 1
+        return None
+
+    def _read(self, key):
+        path = self._path(key)
+        try:
+            with open(path, encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if entry.get("version") != CACHE_VERSION or entry.get("key") != json.loads(json.dumps(list(key))):
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return entry["value"]
+
+    # ---- escritura ----
+    def put(self, key, value):
+        self._put(key, value)
+        if self.directory:
+            self._write(key, value)
+
+    def _put(self, key, value):
+        self._data[key] = value
+        self._data.move_to_end(key)
+        if len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def _write(self, key, value):
+        path = self._path(key)
+        existed = os.path.exists(path)
+        tmp = f"{path}.tmp-{uuid.uuid4().hex[:8]}"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"version": CACHE_VERSION, "key": list(key), "value": value}, f, ensure_ascii=False, default=str)
+        os.replace(tmp, path)
+        if not existed:
+            self._n_files += 1
+            if self.max_files and self._n_files > self.max_files:
+                self._evict()
+
+    def _evict(self):
+        """Deja el directorio en el 90% de `max_files`, borrando los archivos usados hace más tiempo."""
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith(".json"):
+                path = os.path.join(self.directory, name)
+                try:
+                    entries.append((os.path.getmtime(path), path))
+                except OSError:
+                    pass
+        entries.sort()
+        excess = len(entries) - int(self.max_files * 0.9)
+        for _, path in entries[:max(excess, 0)]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        self._n_files = len(entries) - max(excess, 0)
+
+    def clear(self):
+        self._data.clear()
+        if self.directory:
+            for name in os.listdir(self.directory):
+                if name.endswith(".json"):
+                    try:
+                        os.remove(os.path.join(self.directory, name))
+                    except OSError:
+                        pass
+            self._n_files = 0
+
+    def stats(self) -> dict:
+        total = self.hits + self.disk_hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits + self.disk_hits) / total if total else 0.0,
+        }
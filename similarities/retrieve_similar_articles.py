@@ -1,10 +1,11 @@
 import argparse
 import re
-import pandas as pd
-import pickle
 import os
-from sklearn.metrics.pairwise import cosine_similarity
-from normalization.normalization import normalize_single_text  # usa la misma normalización NLTK
+from similarities.engine import SimilarityEngine, CORPORA, METHODS, ngram_code, load_pkl  # noqa: F401 (compatibilidad)
+from similarities.result_cache import ResultCache
+from similarities.scatter import EXECUTORS
+from representation.hashing import HASHED_REPS
+from representation.shards import SCHEMES
 
 # ---------------------- #
 #  Lectura de consulta   #
@@ -30,89 +31,122 @@ def read_ris(file_path):
     return title, abstract
 
 
-# ---------------------- #
-#  Carga de archivos PKL #
-# ---------------------- #
-def ngram_code(ngram_type: str) -> str:
-    if ngram_type == "unigram":
-        return "n1-1"
-    elif ngram_type == "bigram":
-        return "n2-2"
-    elif ngram_type == "both":
-        return "n1-2"
-    else:
-        raise ValueError("Tipo de n-grama no reconocido.")
+_BIB_ENTRY = re.compile(r"@\w+\s*\{\s*([^,\s]*)\s*,")
 
 
-def load_pkl(base_path, corpus_name, field, vector_type, ngram_type):
-    field = field.lower()
-    ntag = ngram_code(ngram_type)
-    vectors_dir = os.path.join(base_path, "data\\vectors")
-    fname = f"{corpus_name}_{field}_{vector_type}_{ntag}.pkl"
-    path = os.path.join(vectors_dir, fname)
+def read_bibtex_entries(file_path):
+    """Devuelve [(clave, título, resumen), ...] para cada entrada de un .bib."""
+    with open(file_path, encoding="utf-8") as f:
+        content = f.read()
+    starts = list(_BIB_ENTRY.finditer(content))
+    entries = []
+    for i, m in enumerate(starts):
+        end = starts[i + 1].start() if i + 1 < len(starts) else len(content)
+        chunk = content[m.end():end]
+        title_match = re.search(r'title\s*=\s*[{"](.+?)[}"]', chunk, re.IGNORECASE)
+        abstract_match = re.search(r'abstract\s*=\s*[{"](.+?)[}"]', chunk, re.IGNORECASE)
+        title = title_match.group(1).strip() if title_match else ""
+        abstract = abstract_match.group(1).strip() if abstract_match else ""
+        entries.append((m.group(1) or str(i + 1), title, abstract))
+    return entries
+
+
+def read_ris_entries(file_path):
+    """Devuelve [(clave, título, resumen), ...] para cada registro (TY ... ER) de un .ris."""
+    entries = []
+    key, title, abstract, open_record = "", "", "", False
+    with open(file_path, encoding="utf-8") as f:
+        for line in f:
+            if line.startswith("TY  -"):
+                key, title, abstract, open_record = "", "", "", True
+            elif line.startswith("ID  -"):
+                key = line.replace("ID  -", "").strip()
+            elif line.startswith("TI  -"):
+                title = line.replace("TI  -", "").strip()
+            elif line.startswith("AB  -"):
+                abstract = line.replace("AB  -", "").strip()
+            elif line.startswith("ER  -"):
+                entries.append((key or str(len(entries) + 1), title, abstract))
+                open_record = False
+    if open_record or (not entries and (title or abstract)):
+        entries.append((key or str(len(entries) + 1), title, abstract))
+    return entries
 
-    if not os.path.exists(path):
-        raise FileNotFoundError(f"No se encontró el archivo {path}")
 
-    with open(path, "rb") as f:
-        data = pickle.load(f)
+def collect_queries(path):
+    """
+    Reúne las consultas de un archivo (.bib/.ris, con una o varias entradas) o de
+    todos los .bib/.ris de un directorio. Devuelve [(id_consulta, título, resumen), ...].
+    """
+    if os.path.isdir(path):
+        files = sorted(
+            os.path.join(path, f) for f in os.listdir(path)
+            if f.lower().endswith((".bib", ".ris"))
+        )
+    else:
+        files = [path]
 
-    if not isinstance(data, dict) or "vectorizer" not in data or "X" not in data:
-        raise ValueError(f"El archivo {path} no contiene las claves esperadas ('vectorizer', 'X').")
+    queries = []
+    for file_path in files:
+        if file_path.lower().endswith(".bib"):
+            entries = read_bibtex_entries(file_path)
+        elif file_path.lower().endswith(".ris"):
+            entries = read_ris_entries(file_path)
+        else:
+            raise ValueError("Formato no soportado. Usa .bib o .ris")
 
-    return data["vectorizer"], data["X"]
+        name = os.path.basename(file_path)
+        for key, title, abstract in entries:
+            query_id = name if len(entries) == 1 else f"{name}:{key}"
+            queries.append((query_id, title, abstract))
+    return queries
 
 
 # ---------------------- #
 #  Procesamiento general #
 # ---------------------- #
-def retrieve_similar_articles(query_file, field, vector_type, ngram_type, base_path, output_prefix):
+def read_query(query_file):
     if query_file.endswith(".bib"):
-        title, abstract = read_bibtex(query_file)
+        return read_bibtex(query_file)
     elif query_file.endswith(".ris"):
-        title, abstract = read_ris(query_file)
+        return read_ris(query_file)
     else:
         raise ValueError("Formato no soportado. Usa .bib o .ris")
 
+
+def retrieve_similar_articles(query_file, field, vector_type, ngram_type, base_path, output_prefix, engine=None, topk=10,
+                              method="brute", verify=False):
+    title, abstract = read_query(query_file)
+
     query_text = title if field.lower() == "title" else abstract
     if not query_text:
         print(" No se encontró texto en el campo seleccionado.")
         return
 
-    query_text = normalize_single_text(query_text)
-    results = []
+    # El motor conserva modelos y metadatos entre llamadas; si no se recibe uno
+    # (uso desde la CLI) se crea para esta única consulta.
+    if engine is None:
+        engine = SimilarityEngine(base_path, method=method)
+    results = engine.query(query_text, field, vector_type, ngram_type, topk=topk)
 
-    for corpus_name in ["arxiv", "pubmed"]:
-        try:
-            vectorizer, X_corpus = load_pkl(base_path, corpus_name, field, vector_type, ngram_type)
-        except (FileNotFoundError, ValueError) as e:
-            print(f" {e}")
-            continue
+    write_results(results, query_file, field, vector_type, ngram_type, output_prefix, topk)
+    if verify:
+        print_verification(engine.verify([query_text], field, vector_type, ngram_type, topk))
 
-        csv_name = f"./data/corpus/{corpus_name}_raw_corpus.csv"
-        csv_path = os.path.join(base_path, csv_name)
-        if not os.path.exists(csv_path):
-            print(f" No se encontró el archivo {csv_path}")
-            continue
 
-        corpus_df = pd.read_csv(csv_path, sep="\t")
+def print_verification(report):
+    print(f" Verificación contra búsqueda exhaustiva: {report['queries'] - report['mismatches']}/{report['queries']} consultas idénticas")
+    print(f" Recall@k respecto a la búsqueda exhaustiva: {report['recall']:.3f}")
+    if report.get("ann_docs"):
+        print(f" Candidatos ANN puntuados: {report['ann_candidates']}/{report['ann_docs']}"
+              f" ({100.0 * report['ann_candidates'] / report['ann_docs']:.1f}%)")
+    total = report.get("postings_total", 0)
+    if total:
+        skipped = report.get("postings_skipped", 0)
+        print(f" Postings omitidos por la poda: {skipped}/{total} ({100.0 * skipped / total:.1f}%)")
 
-        X_query = vectorizer.transform([query_text])
-        similarities = cosine_similarity(X_query, X_corpus).flatten()
-
-        top_indices = similarities.argsort()[::-1][:10]
-        for idx in top_indices:
-            row = corpus_df.iloc[idx]
-            results.append({
-                "Corpus": corpus_name,
-                "Title": row["Title"],
-                "DOI": row["DOI"],
-                "Date": row.get("Date", "N/A"),
-                "Similarity": similarities[idx]
-            })
-
-    results = sorted(results, key=lambda x: x["Similarity"], reverse=True)[:10]
 
+def write_results(results, query_file, field, vector_type, ngram_type, output_prefix, topk=10):
     # ---------------------- #
     #  1) Salida de texto
     # ---------------------- #
@@ -120,7 +154,7 @@ def retrieve_similar_articles(query_file, field, vector_type, ngram_type, base_p
     with open(txt_path, "w", encoding="utf-8") as f:
         f.write(f"Archivo de consulta: {os.path.basename(query_file)}\n")
         f.write(f"Campo: {field} | Vectorización: {vector_type.upper()} | N-gramas: {ngram_type}\n\n")
-        f.write("10 artículos más similares (ArXiv + PubMed):\n\n")
+        f.write(f"{topk} artículos más similares (ArXiv + PubMed):\n\n")
         for i, r in enumerate(results, start=1):
             f.write(f"{i}. [{r['Corpus'].upper()}] {r['Title']} (Similitud: {r['Similarity']:.3f})\n")
             f.write(f"   DOI: {r['DOI']}\n")
@@ -144,32 +178,134 @@ def retrieve_similar_articles(query_file, field, vector_type, ngram_type, base_p
             "Date": r["Date"],
         })
 
+    import pandas as pd
     df_tsv = pd.DataFrame(tsv_data)
     df_tsv.to_csv(tsv_path, sep="\t", index=False, encoding="utf-8")
     print(f" Archivo TSV generado: {tsv_path}")
 
 
+def retrieve_batch(query_path, field, vector_type, ngram_type, base_path, output_prefix, engine=None, topk=10,
+                   method="brute", verify=False):
+    """
+    Modo por lotes: normaliza todas las consultas de `query_path` de una vez,
+    las puntúa con un único producto matricial por corpus y escribe un solo TSV
+    con la columna QueryId.
+    """
+    queries = collect_queries(query_path)
+    use_title = field.lower() == "title"
+
+    ids, texts = [], []
+    for query_id, title, abstract in queries:
+        text = title if use_title else abstract
+        if not text:
+            print(f" {query_id}: no se encontró texto en el campo seleccionado. Se omite.")
+            continue
+        ids.append(query_id)
+        texts.append(text)
+
+    if not texts:
+        print(" No se encontraron consultas válidas.")
+        return
+
+    if engine is None:
+        engine = SimilarityEngine(base_path, method=method)
+    all_results = engine.query_batch(texts, field, vector_type, ngram_type, topk=topk)
+
+    tsv_data = []
+    for query_id, results in zip(ids, all_results):
+        for rank, r in enumerate(results, start=1):
+            tsv_data.append({
+                "QueryId": query_id,
+                "Rank": rank,
+                "CorpusDocument": r["Title"],
+                "VectorRepresentation": vector_type,
+                "ExtractedFeatures": ngram_type,
+                "ComparisonContent": field,
+                "SimilarityValue": round(r["Similarity"], 3),
+                "Corpus": r["Corpus"],
+                "DOI": r["DOI"],
+                "Date": r["Date"],
+            })
+
+    import pandas as pd
+    tsv_path = f"{output_prefix}.tsv"
+    pd.DataFrame(tsv_data).to_csv(tsv_path, sep="\t", index=False, encoding="utf-8")
+    print(f" Consultas procesadas: {len(ids)}")
+    print(f" Archivo TSV generado: {tsv_path}")
+    if verify:
+        print_verification(engine.verify(texts, field, vector_type, ngram_type, topk))
+
+
 # ---------------------- #
 #       ARGPARSE         #
 # ---------------------- #
 def main():
     parser = argparse.ArgumentParser(description="Recupera artículos similares y genera TXT + TSV (para interfaz gráfica).")
-    parser.add_argument("--file", required=True, help="Archivo de consulta (.bib o .ris).")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--file", help="Archivo de consulta (.bib o .ris).")
+    source.add_argument("--batch", help="Directorio o archivo .bib/.ris con varias entradas (modo por lotes, un solo TSV).")
     parser.add_argument("--field", choices=["Title", "Abstract"], default="Abstract", help="Campo a comparar (Title o Abstract).")
-    parser.add_argument("--vector", choices=["tfidf", "frequency", "binary"], default="tfidf", help="Tipo de vectorización.")
+    parser.add_argument("--vector", choices=["tfidf", "frequency", "binary"] + HASHED_REPS, default="tfidf",
+                        help="Tipo de vectorización (hashed-*: artefactos sin vocabulario de --rep hashing).")
     parser.add_argument("--ngrams", choices=["unigram", "bigram", "both"], default="unigram", help="Tipo de n-gramas (n1-1 / n2-2).")
     parser.add_argument("--basepath", default=".", help="Ruta base donde están los CSV crudos y la carpeta vectors/.")
     parser.add_argument("--output", default="similar_articles", help="Prefijo de los archivos de salida (sin extensión).")
+    parser.add_argument("--topk", type=int, default=10, help="Número de artículos similares a devolver.")
+    parser.add_argument("--method", choices=METHODS, default="brute",
+                        help="brute: coseno contra todo el corpus | index: índice invertido (solo documentos con términos en común)"
+                             " | maxscore: índice invertido con poda MaxScore"
+                             " | ann: aproximado (proyección densa + IVF, re-ranking exacto).")
+    parser.add_argument("--nprobe", type=int, default=8, help="Con --method ann: listas IVF visitadas por consulta.")
+    parser.add_argument("--ann-projection", choices=["svd", "rp"], default="svd",
+                        help="Con --method ann: TruncatedSVD o proyección aleatoria (al construir el índice).")
+    parser.add_argument("--ann-dim", type=int, default=128, help="Con --method ann: dimensiones de la proyección.")
+    parser.add_argument("--corpora", default=",".join(CORPORA), help="Corpus en los que buscar, separados por coma.")
+    parser.add_argument("--shards", type=int, default=1, help="Fragmentos por corpus (usa los de data/vectors/shards/ si existen).")
+    parser.add_argument("--shard-by", choices=SCHEMES, default="range", help="Partición de los fragmentos: rango de filas o hash del DOI.")
+    parser.add_argument("--workers", type=int, default=1, help="Trabajadores que puntúan los fragmentos en paralelo.")
+    parser.add_argument("--executor", choices=EXECUTORS, default="thread",
+                        help="Pool de hilos o de procesos (los procesos necesitan python -m representation.shards).")
+    parser.add_argument("--cache-dir", default=None,
+                        help="Directorio de la caché de resultados en disco (se reutiliza entre ejecuciones).")
+    parser.add_argument("--verify", action="store_true",
+                        help="Compara el método elegido contra la búsqueda exhaustiva y reporta postings omitidos.")
     args = parser.parse_args()
 
-    retrieve_similar_articles(
-        query_file=args.file,
-        field=args.field,
-        vector_type=args.vector,
-        ngram_type=args.ngrams,
-        base_path=args.basepath,
-        output_prefix=args.output
-    )
+    engine = SimilarityEngine(args.basepath, corpora=args.corpora.split(","), method=args.method,
+                              ann_options={"nprobe": args.nprobe, "projection": args.ann_projection, "dim": args.ann_dim},
+                              shards=args.shards, shard_by=args.shard_by, workers=args.workers, executor=args.executor,
+                              cache=ResultCache(directory=args.cache_dir) if args.cache_dir else None)
+
+    try:
+        if args.batch:
+            retrieve_batch(
+                query_path=args.batch,
+                field=args.field,
+                vector_type=args.vector,
+                ngram_type=args.ngrams,
+                base_path=args.basepath,
+                output_prefix=args.output,
+                engine=engine,
+                topk=args.topk,
+                method=args.method,
+                verify=args.verify
+            )
+            return
+
+        retrieve_similar_articles(
+            query_file=args.file,
+            field=args.field,
+            vector_type=args.vector,
+            ngram_type=args.ngrams,
+            base_path=args.basepath,
+            output_prefix=args.output,
+            engine=engine,
+            topk=args.topk,
+            method=args.method,
+            verify=args.verify
+        )
+    finally:
+        engine.close()
 
 
 if __name__ == "__main__":
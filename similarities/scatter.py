@@ -0,0 +1,130 @@
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+import numpy as np
+import scipy.sparse as sp
+from representation.shards import manifest_signature, open_shards
+from representation.store import row_norms
+from similarities.inverted_index import InvertedIndex
+from similarities.topk import topk_indices
+
+EXECUTORS = ["thread", "process"]
+
+
+# ---------------------- #
+#  Puntaje por fragmento #
+# ---------------------- #
+def cosine_scores(X, X_query, inverse_norms, max_cells=1 << 23):
+    """
+    Similitud coseno de cada consulta contra todas las filas de X, sin recalcular
+    las normas de X: producto directo X · q̂ con la consulta normalizada,
+    escalado por las normas inversas ya calculadas. Las consultas se procesan
+    en grupos para no crear más de `max_cells` puntajes densos a la vez.
+    Genera un arreglo de similitudes por consulta, en orden.
+    """
+    Q = sp.csr_matrix(X_query, dtype=np.float64)
+    Q = sp.diags(inverse_norms_of(row_norms(Q))) @ Q
+    chunk = max(1, max_cells // max(X.shape[0], 1))
+    for start in range(0, Q.shape[0], chunk):
+        S = (X @ Q[start:start + chunk].T).toarray()
+        S *= inverse_norms[:, None]
+        yield from S.T
+
+
+def inverse_norms_of(norms):
+    """1 / norma (0 para filas vacías)."""
+    norms = np.asarray(norms)
+    return np.divide(1.0, norms, out=np.zeros(len(norms)), where=norms > 0)
+
+
+def search_shard(shard, X_query, k, method="brute", index=None):
+    """
+    Top-k de cada consulta dentro de un fragmento, con ids globales (filas del
+    artefacto completo). Devuelve ([(filas, similitudes) por consulta], stats).
+    """
+    stats = {}
+    results = []
+    if method == "brute":
+        for similarities in cosine_scores(shard.X, X_query, inverse_norms_of(shard.norms)):
+            top = topk_indices(similarities, k)
+            results.append((np.asarray(shard.rows)[top], similarities[top]))
+        return results, stats
+
+    index = index or InvertedIndex.from_matrix(shard.X)
+    for q in range(X_query.shape[0]):
+        if method == "maxscore":
+            top, scores = index.search_maxscore(X_query[q], k, stats)
+        else:
+            top, scores = index.search(X_query[q], k)
+        results.append((np.asarray(shard.rows)[top], scores))
+    return results, stats
+
+
+# Estado por proceso: fragmentos (mapeados) e índices ya abiertos por este trabajador,
+# con la versión de los fragmentos (shards_id) con la que se abrieron.
+_WORKER = {}
+
+
+def _search_stored_shard(path, signature, i, X_query, k, method):
+    state = _WORKER.get(path)
+    if state is None or state["signature"] != signature:
+        # Los fragmentos se reescribieron (o es la primera vez): se vuelven a abrir.
+        shards, manifest = open_shards(path)
+        if manifest_signature(manifest) != signature:
+            raise ValueError(f"Los fragmentos de {path} cambiaron durante la búsqueda; repita la consulta.")
+        _WORKER[path] = state = {"signature": signature, "shards": shards, "indexes": {}}
+    index = None
+    if method != "brute":
+        if i not in state["indexes"]:
+            state["indexes"][i] = InvertedIndex.from_matrix(state["shards"][i].X)
+        index = state["indexes"][i]
+    return search_shard(state["shards"][i], X_query, k, method, index)
+
+
+# ---------------------- #
+#  Ejecutor              #
+# ---------------------- #
+class ScatterGather:
+    """
+    Reparte la búsqueda de cada (corpus, fragmento) en un pool de hilos o de
+    procesos y devuelve futuros; el motor fusiona los top-k con un heap.
+
+    Con hilos, los fragmentos se comparten en memoria (los productos dispersos
+    de scipy liberan el GIL). Con procesos, cada trabajador abre los
+    fragmentos guardados en disco (mapeados, compartidos vía caché del SO) y
+    solo viajan las consultas y los top-k. Con `workers` <= 1 todo se ejecuta
+    en el hilo que llama.
+    """
+
+    def __init__(self, workers=1, executor="thread"):
+        if executor not in EXECUTORS:
+            raise ValueError(f"Ejecutor no reconocido: {executor}")
+        self.workers = workers
+        self.executor = executor
+        self._pool = None
+
+    @property
+    def uses_processes(self):
+        return self.workers > 1 and self.executor == "process"
+
+    def _get_pool(self):
+        if self._pool is None:
+            pool_cls = ProcessPoolExecutor if self.executor == "process" else ThreadPoolExecutor
+            self._pool = pool_cls(max_workers=self.workers)
+        return self._pool
+
+    def submit(self, shard, X_query, k, method, index=None, path=None, i=None, signature=None):
+        """
+        Búsqueda de un fragmento; con procesos se identifica por (ruta del
+        artefacto fragmentado, versión de los fragmentos, número).
+        """
+        if self.workers <= 1:
+            future = Future()
+            future.set_result(search_shard(shard, X_query, k, method, index))
+            return future
+        if self.uses_processes:
+            return self._get_pool().submit(_search_stored_shard, path, signature, i, X_query, k, method)
+        return self._get_pool().submit(search_shard, shard, X_query, k, method, index)
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
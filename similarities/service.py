@@ -0,0 +1,322 @@
+import argparse
+import json
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+from similarities.engine import SimilarityEngine, CORPORA, METHODS
+from similarities.result_cache import ResultCache
+from representation.hashing import HASHED_REPS
+from representation.store import artifact_name
+
+FIELDS = ["Title", "Abstract"]
+VECTOR_TYPES = ["tfidf", "frequency", "binary"] + HASHED_REPS
+NGRAM_TYPES = ["unigram", "bigram", "both"]
+
+
+# ---------------------- #
+#  Latencias             #
+# ---------------------- #
+class LatencyStats:
+    """Contadores y ventana de las últimas `window` latencias (segundos) por nombre."""
+
+    def __init__(self, window=10_000):
+        self.window = window
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self._samples = {}
+        self._counters = {}
+
+    def add(self, name, seconds):
+        with self._lock:
+            if name not in self._samples:
+                self._samples[name] = deque(maxlen=self.window)
+            self._samples[name].append(seconds)
+
+    def count(self, name, value=1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    @staticmethod
+    def summary(samples):
+        if not samples:
+            return {"n": 0}
+        ms = np.asarray(samples) * 1e3
+        p50, p90, p99 = np.percentile(ms, [50, 90, 99])
+        return {"n": len(ms), "mean": round(float(ms.mean()), 3), "p50": round(float(p50), 3),
+                "p90": round(float(p90), 3), "p99": round(float(p99), 3), "max": round(float(ms.max()), 3)}
+
+    def snapshot(self):
+        with self._lock:
+            samples = {name: list(values) for name, values in self._samples.items()}
+            counters = dict(self._counters)
+        return {"uptime_s": round(time.time() - self.started, 1), **counters,
+                "latency_ms": {name: self.summary(values) for name, values in samples.items()}}
+
+
+# ---------------------- #
+#  Micro-lotes           #
+# ---------------------- #
+class MicroBatcher:
+    """
+    Un solo hilo atiende el motor: toma la primera consulta en cola, espera a
+    lo sumo `max_wait` segundos (o hasta juntar `max_batch` textos) a que
+    lleguen otras, y resuelve cada grupo con la misma configuración (campo,
+    vectorización, n-gramas, top-k, método) con un único `query_batch`, es
+    decir, un solo producto disperso por corpus. Como solo este hilo toca el
+    motor, la carga perezosa de modelos e índices no necesita candados; por
+    lo mismo, los textos sin normalizar se normalizan aquí con
+    `engine.normalize` (usa su caché y la caché de lemas, que no son seguras
+    entre hilos).
+    """
+
+    def __init__(self, engine, stats, max_batch=64, max_wait=0.005):
+        self.engine = engine
+        self.stats = stats
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.engine_stats = {}
+        self.cache_stats = {}
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, texts, field, vector_type, ngram_type, topk, method, normalized=False):
+        """Encola textos (normalizados o no); el futuro devuelve una lista de resultados por texto."""
+        future = Future()
+        self._queue.put(((field, vector_type, ngram_type, topk, method), texts, time.perf_counter(), future,
+                         normalized))
+        return future
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+
+    def _collect(self, first):
+        items, n_texts = [first], len(first[1])
+        deadline = time.perf_counter() + self.max_wait
+        while n_texts < self.max_batch:
+            timeout = deadline - time.perf_counter()
+            if timeout <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if item is None:
+                self._queue.put(None)
+                break
+            items.append(item)
+            n_texts += len(item[1])
+        return items
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            groups = {}
+            for item in self._collect(first):
+                groups.setdefault(item[0], []).append(item)
+            for key, items in groups.items():
+                self._run_group(key, items)
+            self.engine_stats = dict(self.engine.stats)
+            if self.engine.cache is not None:
+                self.cache_stats = self.engine.cache.stats()
+
+    def _normalize(self, items):
+        """[(textos normalizados, futuro)]; si falla la normalización de una petición, solo esa recibe el error."""
+        start = time.perf_counter()
+        ready = []
+        for _, texts, queued, future, normalized in items:
+            self.stats.add("queue", start - queued)
+            if not normalized:
+                try:
+                    texts = [self.engine.normalize(t) for t in texts]
+                except Exception as e:
+                    future.set_exception(e)
+                    continue
+            ready.append((texts, future))
+        self.stats.add("normalize", time.perf_counter() - start)
+        return ready
+
+    def _run_group(self, key, items):
+        field, vector_type, ngram_type, topk, method = key
+        items = self._normalize(items)
+        if not items:
+            return
+        texts = [text for item_texts, _ in items for text in item_texts]
+        start = time.perf_counter()
+        try:
+            results = self.engine.query_batch(texts, field, vector_type, ngram_type, topk, normalized=True, method=method)
+        except Exception as e:
+            for _, future in items:
+                future.set_exception(e)
+            return
+        self.stats.add("batch", time.perf_counter() - start)
+        self.stats.count("batches")
+        self.stats.count("batched_queries", len(texts))
+        offset = 0
+        for item_texts, future in items:
+            future.set_result(results[offset:offset + len(item_texts)])
+            offset += len(item_texts)
+
+
+# ---------------------- #
+#  Servicio              #
+# ---------------------- #
+class SimilarityService:
+    """
+    Motor residente + micro-lotes + estadísticas. `query` valida la petición
+    JSON y espera el resultado del lote en el que cayó (la normalización
+    también ocurre en el hilo del lote).
+    """
+
+    def __init__(self, engine, max_batch=64, max_wait=0.005, timeout=30.0):
+        self.engine = engine
+        self.timeout = timeout
+        self.stats = LatencyStats()
+        self.batcher = MicroBatcher(engine, self.stats, max_batch, max_wait)
+
+    def query(self, payload):
+        if not isinstance(payload, dict):
+            raise ValueError("Se esperaba un objeto JSON.")
+        single = "text" in payload
+        texts = [payload["text"]] if single else payload.get("texts")
+        if not isinstance(texts, list) or not texts or not all(isinstance(t, str) for t in texts):
+            raise ValueError("Falta 'text' (cadena) o 'texts' (lista de cadenas).")
+        field = payload.get("field", "Abstract")
+        vector_type = payload.get("vector", "tfidf")
+        ngram_type = payload.get("ngrams", "unigram")
+        method = payload.get("method") or self.engine.method
+        topk = payload.get("topk", 10)
+        for name, value, choices in (("field", field, FIELDS), ("vector", vector_type, VECTOR_TYPES),
+                                     ("ngrams", ngram_type, NGRAM_TYPES), ("method", method, METHODS)):
+            if value not in choices:
+                raise ValueError(f"'{name}' debe ser uno de {choices}")
+        if not isinstance(topk, int) or topk < 1:
+            raise ValueError("'topk' debe ser un entero positivo.")
+
+        future = self.batcher.submit(texts, field, vector_type, ngram_type, topk, method,
+                                     bool(payload.get("normalized", False)))
+        results = future.result(timeout=self.timeout)
+        self.stats.count("queries", len(texts))
+        return {"results": results[0]} if single else {"results": results}
+
+    def snapshot(self):
+        stats = self.stats.snapshot()
+        batches = stats.get("batches", 0)
+        stats["mean_batch"] = round(stats.get("batched_queries", 0) / batches, 2) if batches else 0.0
+        stats["models"] = [artifact_name(*key) for key in self.engine._models]
+        stats["engine"] = self.batcher.engine_stats
+        if self.engine.cache is not None:
+            stats["cache"] = self.batcher.cache_stats
+        return stats
+
+    def close(self):
+        self.batcher.close()
+        self.engine.close()
+
+
+class Handler(BaseHTTPRequestHandler):
+    """GET /health, GET /stats, POST /query (JSON)."""
+
+    server_version = "SimilarityService/1.0"
+    quiet = True
+
+    def do_GET(self):
+        service = self.server.service
+        if self.path == "/health":
+            self.send_json(200, {"status": "ok"})
+        elif self.path == "/stats":
+            self.send_json(200, service.snapshot())
+        else:
+            self.send_json(404, {"error": f"Ruta no encontrada: {self.path}"})
+
+    def do_POST(self):
+        service = self.server.service
+        if self.path != "/query":
+            self.send_json(404, {"error": f"Ruta no encontrada: {self.path}"})
+            return
+        start = time.perf_counter()
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            payload = json.loads(self.rfile.read(length) or b"null")
+            status, body = 200, service.query(payload)
+        except (ValueError, KeyError) as e:
+            status, body = 400, {"error": str(e)}
+        except FileNotFoundError as e:
+            status, body = 404, {"error": str(e)}
+        except Exception as e:
+            status, body = 500, {"error": f"{type(e).__name__}: {e}"}
+        self.send_json(status, body)
+        service.stats.add("request", time.perf_counter() - start)
+        service.stats.count("requests")
+        if status != 200:
+            service.stats.count("errors")
+
+    def send_json(self, status, body):
+        data = json.dumps(body, ensure_ascii=False, default=str).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        if not self.quiet:
+            super().log_message(format, *args)
+
+
+def make_server(service, host="127.0.0.1", port=8765, verbose=False):
+    handler = type("ServiceHandler", (Handler,), {"quiet": not verbose})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    server.service = service
+    return server
+
+
+# ---------------------- #
+#       ARGPARSE         #
+# ---------------------- #
+def main():
+    parser = argparse.ArgumentParser(description="Servicio HTTP local (JSON) de recuperación de artículos similares, con modelos residentes y micro-lotes.")
+    parser.add_argument("--basepath", default=".", help="Ruta base con data/corpus/ y data/vectors/.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--corpora", default=",".join(CORPORA), help="Corpus en los que buscar, separados por coma.")
+    parser.add_argument("--method", choices=METHODS, default="brute", help="Método por defecto (cada petición puede pedir otro).")
+    parser.add_argument("--fields", nargs="*", choices=FIELDS, default=["Abstract"], help="Campos a precargar.")
+    parser.add_argument("--vectors", nargs="*", choices=VECTOR_TYPES, default=["tfidf"], help="Vectorizaciones a precargar.")
+    parser.add_argument("--ngrams", nargs="*", choices=NGRAM_TYPES, default=["unigram"], help="N-gramas a precargar.")
+    parser.add_argument("--max-batch", type=int, default=64, help="Máximo de textos por micro-lote.")
+    parser.add_argument("--max-wait", type=float, default=5.0, help="Espera máxima (ms) para completar un micro-lote.")
+    parser.add_argument("--cache-size", type=int, default=10_000, help="Resultados guardados en memoria (0 = sin caché).")
+    parser.add_argument("--cache-dir", default=None, help="Directorio de la caché de resultados en disco.")
+    parser.add_argument("--verbose", action="store_true", help="Registra cada petición HTTP.")
+    args = parser.parse_args()
+
+    cache = ResultCache(args.cache_size, args.cache_dir) if args.cache_size > 0 else None
+    engine = SimilarityEngine(args.basepath, corpora=args.corpora.split(","), method=args.method, cache=cache)
+    start = time.perf_counter()
+    engine.preload(args.fields, args.vectors, args.ngrams)
+    print(f"✅ Modelos precargados en {time.perf_counter() - start:.2f}s: "
+          f"{', '.join(artifact_name(*key) for key in engine._models) or 'ninguno'}")
+
+    service = SimilarityService(engine, args.max_batch, args.max_wait / 1e3)
+    server = make_server(service, args.host, args.port, args.verbose)
+    print(f"✅ Escuchando en http://{args.host}:{args.port}  (POST /query, GET /stats, GET /health)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+import heapq
+from itertools import islice
+import numpy as np
+
+
+# ---------------------- #
+#  Selección top-k       #
+# ---------------------- #
+def topk_indices(scores, k):
+    """
+    Índices de los `k` valores más altos de `scores`, en orden descendente.
+    Usa argpartition (O(n)) y solo ordena los k candidatos, en lugar de
+    ordenar el vector completo.
+    """
+    scores = np.asarray(scores).ravel()
+    n = scores.shape[0]
+    if k <= 0 or n == 0:
+        return np.empty(0, dtype=np.intp)
+    if k >= n:
+        return np.argsort(-scores, kind="stable")
+    candidates = np.argpartition(-scores, k - 1)[:k]
+    return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+
+def pad_topk(docs, scores, k, n_docs):
+    """
+    Completa un top-k con documentos de similitud 0 (los de menor id que no
+    estén ya) cuando menos de `k` documentos tienen puntaje, como la búsqueda exhaustiva.
+    """
+    missing = min(k, n_docs) - docs.size
+    if missing > 0:
+        # Entre los primeros docs.size + missing ids siempre hay `missing` libres.
+        filler = np.setdiff1d(np.arange(docs.size + missing), docs)[:missing]
+        docs = np.concatenate([docs, filler])
+        scores = np.concatenate([scores, np.zeros(filler.size)])
+    return docs, scores
+
+
+def merge_topk(ranked_lists, k, key=lambda r: r["Similarity"]):
+    """
+    Fusiona listas ya ordenadas de mayor a menor (una por corpus o fragmento)
+    con un heap y devuelve solo los `k` primeros, sin reordenar todo.
+    """
+    merged = heapq.merge(*ranked_lists, key=key, reverse=True)
+    return list(islice(merged, k))
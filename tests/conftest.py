@@ -0,0 +1,134 @@
+import os
+import sys
+import time
+import pytest
+
+# Los módulos del proyecto se importan desde la raíz del repositorio (python -m pytest o pytest).
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+WORDS = ["graph", "neural", "network", "protein", "cell", "quantum", "spin", "market", "price", "galaxy"]
+
+
+def make_rows(start, n, prefix="10.1000"):
+    """Filas sintéticas (textos ya normalizados): cada documento tiene un término propio `docN`."""
+    import pandas as pd
+    return pd.DataFrame({
+        "Title": [f"title {i}" for i in range(start, start + n)],
+        "Abstract": [f"{WORDS[i % len(WORDS)]} {WORDS[(i * 3) % len(WORDS)]} doc{i}" for i in range(start, start + n)],
+        "DOI": [f"{prefix}/{i}" for i in range(start, start + n)],
+        "Date": ["2024-01-01"] * n,
+    })
+
+
+def topic_matrix(seed, n_docs=1000, n_terms=500, n_topics=20):
+    """Conteos dispersos agrupados por tema: cada documento toma la mayoría de sus términos de un tema."""
+    import numpy as np
+    import scipy.sparse as sp
+    rng = np.random.default_rng(seed)
+    topics = [rng.choice(n_terms, size=30, replace=False) for _ in range(n_topics)]
+    rows, cols = [], []
+    for i in range(n_docs):
+        terms = np.concatenate([rng.choice(topics[rng.integers(n_topics)], size=rng.integers(5, 20)),
+                                rng.integers(0, n_terms, size=rng.integers(0, 4))])
+        rows.extend([i] * terms.size)
+        cols.extend(terms.tolist())
+    X = sp.csr_matrix((np.ones(len(cols)), (rows, cols)), shape=(n_docs, n_terms))
+    X.sum_duplicates()
+    return X
+
+
+class SyntheticCorpus:
+    """Proyecto mínimo en un directorio temporal: data/corpus/arxiv_raw_corpus.csv + artefacto tfidf unigrama."""
+
+    def __init__(self, base):
+        self.base = base
+        self.csv_path = os.path.join(base, "data", "corpus", "arxiv_raw_corpus.csv")
+        self.store_path = os.path.join(base, "data", "vectors", "arxiv_abstract_tfidf_n1-1")
+
+    def build(self, df):
+        from representation.vectorize import vectorize_field
+        os.makedirs(os.path.dirname(self.csv_path), exist_ok=True)
+        df.to_csv(self.csv_path, sep="\t", index=False)
+        vectorize_field(df, "arxiv", "Abstract", ["tfidf"], (1, 1), os.path.join(self.base, "data", "vectors"), "store")
+        return self
+
+    def append_csv(self, df):
+        df.to_csv(self.csv_path, sep="\t", index=False, header=False, mode="a")
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    return SyntheticCorpus(str(tmp_path))
+
+
+class StubServer:
+    """
+    Servidor HTTP local para los scrapers: `routes` asocia una ruta a una
+    función (parámetros de la URL) -> (status, content-type, cuerpo). Registra
+    cada solicitud y el máximo de solicitudes atendidas a la vez; `delay`
+    simula la latencia del servidor.
+    """
+
+    def __init__(self, routes, delay=0.0):
+        import threading
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        from urllib.parse import parse_qs, urlsplit
+
+        self.routes = routes
+        self.delay = delay
+        self.requests = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlsplit(self.path)
+                params = {k: v[0] for k, v in parse_qs(url.query).items()}
+                with stub._lock:
+                    stub.requests.append((url.path, params, time.monotonic()))
+                    stub.in_flight += 1
+                    stub.max_in_flight = max(stub.max_in_flight, stub.in_flight)
+                try:
+                    time.sleep(stub.delay)
+                    route = stub.routes.get(url.path)
+                    status, content_type, body = route(params) if route else (404, "text/plain", b"not found")
+                    self.send_response(status)
+                    self.send_header("Content-Type", content_type)
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                    self.wfile.flush()
+                finally:
+                    with stub._lock:
+                        stub.in_flight -= 1
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def paths(self):
+        return [path for path, _, _ in self.requests]
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stub_server():
+    servers = []
+
+    def start(routes, delay=0.0):
+        servers.append(StubServer(routes, delay))
+        return servers[-1]
+
+    yield start
+    for server in servers:
+        server.close()
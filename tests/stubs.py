@@ -0,0 +1,45 @@
+"""Respuestas sintéticas de arXiv (Atom) y PubMed Trending (HTML con MEDLINE) para StubServer."""
+import html
+from scraper.arxiv import ARXIV_SECTIONS
+
+ARXIV_PER_SECTION = 20
+PUBMED_RECORDS = 30
+
+
+def arxiv_entries(section):
+    """Entradas de una sección: algunas sin abstract y otras repetidas en páginas posteriores."""
+    entries = []
+    for i in range(ARXIV_PER_SECTION):
+        code = 1000 * (ARXIV_SECTIONS.index(section) + 1) + i
+        summary = "" if i % 7 == 3 else f"Abstract {section} {i} &amp; more."
+        entries.append(f"<entry><id>http://arxiv.org/abs/2401.{code:05d}v1</id><title>{section} paper {i}</title>"
+                       f"<summary>{summary}</summary><published>2024-01-05T00:00:00Z</published>"
+                       f"<author><name>Author {i}</name></author></entry>")
+        if i % 5 == 4:
+            entries.append(entries[i - 2])
+    return entries
+
+
+def arxiv_feed(params):
+    entries = arxiv_entries(params["search_query"].split(":", 1)[1])
+    start, n = int(params["start"]), int(params["max_results"])
+    body = ('<?xml version="1.0" encoding="UTF-8"?>'
+            '<feed xmlns="http://www.w3.org/2005/Atom" xmlns:arxiv="http://arxiv.org/schemas/atom">'
+            + "".join(entries[start:start + n]) + "</feed>")
+    return 200, "application/atom+xml", body.encode("utf-8")
+
+
+def medline_record(i):
+    abstract = "" if i % 6 == 5 else f"AB  - Result {i} of the study.\n      Second line."
+    return (f"PMID- {38200000 + i}\nDP  - 2024 Jan {1 + i % 28:02d}\nTI  - Study {i}\n{abstract}\n"
+            f"AU  - Author {i}\nJT  - Journal {i % 3}\nLID - 10.5555/study.{i % 25} [doi]\n")
+
+
+def trending_page(params):
+    page, size = int(params["page"]), int(params["size"])
+    records = [medline_record(i) for i in range((page - 1) * size, min(page * size, PUBMED_RECORDS))]
+    if not records:
+        return 200, "text/html", b"<html><body>No results</body></html>"
+    pre = html.escape("\n".join(records))
+    body = f'<html><body><pre class="search-results-chunk">{pre}</pre></body></html>'
+    return 200, "text/html; charset=utf-8", body.encode("utf-8")
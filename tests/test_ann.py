@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+from conftest import topic_matrix
+from similarities.ann import AnnIndex
+from similarities.neighbors import l2_rows
+from similarities.topk import topk_indices
+
+
+def exact_topk(Xn, q, k):
+    scores = (Xn @ Xn[q].T).toarray().ravel()
+    return scores, topk_indices(scores, k)
+
+
+@pytest.mark.parametrize("projection, min_recall", [("svd", 0.9), ("rp", 0.8)])
+def test_recall_against_exhaustive_search(projection, min_recall):
+    X = topic_matrix(0)
+    Xn = l2_rows(X)
+    index = AnnIndex.build(X, projection=projection, dim=64, seed=0).attach(X)
+    k, hits = 10, 0
+    queries = np.random.default_rng(1).choice(X.shape[0], 60, replace=False)
+    for q in queries:
+        scores, top = exact_topk(Xn, q, k)
+        docs, sims = index.search(X[q], k, nprobe=8, rerank=10)
+        # Re-ranking exacto: las similitudes devueltas son las reales.
+        np.testing.assert_allclose(sims, scores[docs], atol=1e-9)
+        # Los empates en el k-ésimo puntaje cuentan como acierto.
+        hits += int(np.sum(sims >= scores[top[-1]] - 1e-9))
+    assert hits / (k * len(queries)) >= min_recall
+
+
+def test_probing_every_list_is_exact():
+    X = topic_matrix(2, n_docs=400)
+    Xn = l2_rows(X)
+    index = AnnIndex.build(X, dim=32, seed=0).attach(X)
+    for q in range(0, 400, 37):
+        scores, top = exact_topk(Xn, q, 5)
+        _, sims = index.search(X[q], 5, nprobe=index.params["nlist"], rerank=index.n_docs)
+        np.testing.assert_allclose(sims, scores[top], atol=1e-9)
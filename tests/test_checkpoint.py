@@ -0,0 +1,95 @@
+import csv
+import pytest
+import requests
+from scraper.arxiv import collect_arxiv_checkpointed
+from scraper.checkpoint import Checkpoint
+from scraper.http import HttpClient
+from scraper.pubmed import collect_pubmed_checkpointed
+from stubs import arxiv_feed, trending_page
+
+
+def failing_after(route, n_ok):
+    """La ruta responde bien `n_ok` veces y luego con HTTP 503 (corte a mitad de la recolección)."""
+    state = {"calls": 0, "fail": True}
+
+    def handler(params):
+        state["calls"] += 1
+        if state["fail"] and state["calls"] > n_ok:
+            return 503, "text/plain", b"unavailable"
+        return route(params)
+
+    return handler, state
+
+
+def read_dois(path):
+    with open(path, encoding="utf-8", newline="") as f:
+        return [row["DOI"] for row in csv.DictReader(f, delimiter="\t")]
+
+
+def arxiv_run(server, tmp_path, name, resume=False, per_section=7, db=None):
+    with Checkpoint(str(db or tmp_path / f"{name}.sqlite")) as checkpoint:
+        return collect_arxiv_checkpointed(HttpClient(sleep=0, tries=1), checkpoint, str(tmp_path / f"{name}.tsv"),
+                                          per_section, page_size=3, resume=resume, api_url=f"{server.url}/api/query")
+
+
+def test_arxiv_resume_after_interruption(stub_server, tmp_path):
+    server = stub_server({"/api/query": arxiv_feed})
+    assert arxiv_run(server, tmp_path, "reference") == 21
+    expected = read_dois(tmp_path / "reference.tsv")
+
+    handler, state = failing_after(arxiv_feed, 4)
+    server.routes["/api/query"] = handler
+    with pytest.raises(requests.HTTPError):
+        arxiv_run(server, tmp_path, "run")
+    partial = read_dois(tmp_path / "run.tsv")
+    assert 0 < len(partial) < len(expected)
+
+    state["fail"] = False
+    assert arxiv_run(server, tmp_path, "run", resume=True) == len(expected) - len(partial)
+    assert read_dois(tmp_path / "run.tsv") == expected
+
+
+def test_arxiv_new_run_skips_seen_articles(stub_server, tmp_path):
+    server = stub_server({"/api/query": arxiv_feed})
+    arxiv_run(server, tmp_path, "run")
+    first = read_dois(tmp_path / "run.tsv")
+    # Ejecución nueva (sin --resume): vuelve a paginar desde el principio pero solo agrega artículos no vistos.
+    assert arxiv_run(server, tmp_path, "run", per_section=50) == 3 * 17 - len(first)
+    dois = read_dois(tmp_path / "run.tsv")
+    assert dois[:len(first)] == first
+    assert len(dois) == len(set(dois)) == 3 * 17
+
+
+def test_sync_tsv_repairs_lost_checkpoint(stub_server, tmp_path):
+    server = stub_server({"/api/query": arxiv_feed})
+    arxiv_run(server, tmp_path, "run")
+    first = read_dois(tmp_path / "run.tsv")
+    # Corte entre la escritura del TSV y la confirmación de la página: el TSV tiene filas que la base no conoce.
+    with Checkpoint(str(tmp_path / "run.sqlite")) as checkpoint:
+        with checkpoint.conn:
+            checkpoint.conn.execute("DELETE FROM seen")
+    assert arxiv_run(server, tmp_path, "run", resume=True, per_section=10) == 3 * 10 - len(first)
+    dois = read_dois(tmp_path / "run.tsv")
+    assert len(dois) == len(set(dois)) == 30
+
+
+def pubmed_run(server, tmp_path, name, resume=False, total=12):
+    with Checkpoint(str(tmp_path / f"{name}.sqlite")) as checkpoint:
+        return collect_pubmed_checkpointed(HttpClient(sleep=0, tries=1), checkpoint, str(tmp_path / f"{name}.tsv"),
+                                           total, page_size=4, resume=resume, base_url=server.url)
+
+
+def test_pubmed_resume_and_dedup(stub_server, tmp_path):
+    server = stub_server({"/trending/": trending_page})
+    pubmed_run(server, tmp_path, "reference", total=100)
+    expected = read_dois(tmp_path / "reference.tsv")
+    # 25 DOIs distintos, 4 de ellos sin abstract; los registros 25-29 repiten DOIs ya vistos.
+    assert len(expected) == len(set(expected)) == 21
+
+    handler, state = failing_after(trending_page, 3)
+    server.routes["/trending/"] = handler
+    with pytest.raises(requests.HTTPError):
+        pubmed_run(server, tmp_path, "run", total=100)
+    state["fail"] = False
+    pubmed_run(server, tmp_path, "run", resume=True, total=100)
+    assert read_dois(tmp_path / "run.tsv") == expected
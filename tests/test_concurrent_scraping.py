@@ -0,0 +1,43 @@
+import time
+from scraper.arxiv import ARXIV_SECTIONS, collect_arxiv, collect_arxiv_concurrent
+from scraper.concurrency import HostLimiter
+from scraper.http import HttpClient
+from scraper.pubmed import collect_pubmed_concurrent, collect_pubmed_html
+from stubs import arxiv_feed, trending_page
+
+
+def test_arxiv_concurrent_matches_sequential(stub_server):
+    server = stub_server({"/api/query": arxiv_feed})
+    api = f"{server.url}/api/query"
+    for per_section in (7, 50):  # cuota alcanzada / sección agotada
+        sequential = collect_arxiv(HttpClient(sleep=0), per_section, page_size=4, api_url=api)
+        concurrent = collect_arxiv_concurrent(HttpClient(sleep=0, limiter=HostLimiter(3)), per_section, page_size=4,
+                                              workers=4, prefetch=3, api_url=api)
+        assert concurrent == sequential
+        assert len(sequential) == len(ARXIV_SECTIONS) * min(per_section, 17)
+
+
+def test_pubmed_concurrent_matches_sequential(stub_server):
+    server = stub_server({"/trending/": trending_page})
+    for total in (11, 100):
+        sequential = collect_pubmed_html(HttpClient(sleep=0), total, page_size=4, base_url=server.url)
+        concurrent = collect_pubmed_concurrent(HttpClient(sleep=0, limiter=HostLimiter(3)), total, page_size=4,
+                                               workers=4, prefetch=3, base_url=server.url)
+        assert concurrent == sequential
+        assert len(sequential) == min(total, 25)
+
+
+def test_per_host_limit_and_rate(stub_server):
+    server = stub_server({"/api/query": arxiv_feed}, delay=0.05)
+    rate, burst = 20.0, 2
+    http = HttpClient(sleep=0, limiter=HostLimiter(max_per_host=2, rate=rate, burst=burst))
+    start = time.monotonic()
+    collect_arxiv_concurrent(http, 15, page_size=2, workers=6, prefetch=6, api_url=f"{server.url}/api/query")
+    n = len(server.requests)
+    assert server.max_in_flight <= 2
+    # El token-bucket no deja pasar más de `burst` solicitudes más `rate` por segundo transcurrido.
+    assert time.monotonic() - start >= (n - burst) / rate - 0.05
+    times = [t for _, _, t in server.requests]
+    for i in range(n):
+        window = [t for t in times if times[i] <= t < times[i] + 0.5]
+        assert len(window) <= burst + rate * 0.5 + 1
@@ -0,0 +1,46 @@
+from conftest import make_rows
+from representation.incremental import append_to_store
+from similarities.engine import SimilarityEngine
+from similarities.result_cache import ResultCache
+
+
+def test_query_after_append_uses_new_rows(corpus):
+    corpus.build(make_rows(0, 250))
+    engine = SimilarityEngine(corpus.base, corpora=["arxiv"], cache=ResultCache())
+    assert engine.query("doc7", "Abstract", "tfidf", "unigram", 1, normalized=True)[0]["DOI"] == "10.1000/7"
+
+    added = make_rows(250, 50)
+    corpus.append_csv(added)
+    append_to_store(corpus.store_path, added["Abstract"].tolist())
+
+    rows = engine.query("doc280", "Abstract", "tfidf", "unigram", 1, normalized=True)
+    assert rows[0]["DOI"] == "10.1000/280"
+    assert rows[0]["Title"] == "title 280"
+
+
+def test_rewritten_corpus_of_same_size_is_reloaded(corpus):
+    corpus.build(make_rows(0, 100))
+    engine = SimilarityEngine(corpus.base, corpora=["arxiv"], cache=ResultCache())
+    assert engine.query("doc5", "Abstract", "tfidf", "unigram", 1, normalized=True)[0]["DOI"] == "10.1000/5"
+
+    corpus.build(make_rows(0, 100, prefix="10.2000.55"))
+    assert engine.query("doc5", "Abstract", "tfidf", "unigram", 1, normalized=True)[0]["DOI"] == "10.2000.55/5"
+
+
+def test_csv_out_of_sync_with_matrix_is_skipped(corpus):
+    corpus.build(make_rows(0, 100))
+    engine = SimilarityEngine(corpus.base, corpora=["arxiv"])
+    corpus.append_csv(make_rows(100, 10))
+    # Filas nuevas aún sin vectorizar: el corpus se omite en vez de mezclar filas.
+    assert engine.query("doc5", "Abstract", "tfidf", "unigram", 1, normalized=True) == []
+
+
+def test_rewritten_corpus_is_reloaded_without_cache(corpus):
+    corpus.build(make_rows(0, 100))
+    engine = SimilarityEngine(corpus.base, corpora=["arxiv"])
+    assert engine.query("doc5", "Abstract", "tfidf", "unigram", 1, normalized=True)[0]["DOI"] == "10.1000/5"
+
+    # Mismo tamaño, filas en otro orden: la matriz y los metadatos tienen que recargarse juntos.
+    corpus.build(make_rows(0, 100, prefix="10.2000").iloc[::-1].reset_index(drop=True))
+    rows = engine.query("doc5", "Abstract", "tfidf", "unigram", 1, normalized=True)
+    assert (rows[0]["DOI"], rows[0]["Title"]) == ("10.2000/5", "title 5")
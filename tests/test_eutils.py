@@ -0,0 +1,52 @@
+import os
+from scraper.cache import ResponseCache
+from scraper.eutils import collect_pubmed_eutils
+from scraper.http import HttpClient
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures", "eutils")
+# Filas válidas de efetch.medline (los demás registros no tienen abstract, DOI o fecha).
+EXPECTED_DOIS = ["10.1038/s41586-023-00001-1", "10.1016/j.watres.2023.00005", "10.1001/jamaneurol.2023.00006"]
+
+
+def eutils_routes():
+    with open(os.path.join(FIXTURES, "esearch.json"), "rb") as f:
+        esearch = f.read()
+    with open(os.path.join(FIXTURES, "efetch.medline"), encoding="utf-8") as f:
+        records = ["PMID- " + r for r in f.read().split("\nPMID- ")[1:]]
+
+    def efetch(params):
+        assert params["WebEnv"] == "MCID_6650f2a1b2c3d4e5f6a7b8c9" and params["query_key"] == "1"
+        start, n = int(params["retstart"]), int(params["retmax"])
+        body = "\n" + "\n".join(records[start:start + n])
+        return 200, "text/plain; charset=UTF-8", body.encode("utf-8")
+
+    return {
+        "/esearch.fcgi": lambda params: (200, "application/json; charset=UTF-8", esearch),
+        "/efetch.fcgi": efetch,
+    }
+
+
+def test_history_batches_round_trip(stub_server):
+    server = stub_server(eutils_routes())
+    rows = collect_pubmed_eutils(HttpClient(sleep=0), required_total=10, batch_size=2, base_url=server.url)
+    assert [row[0] for row in rows] == EXPECTED_DOIS
+    assert rows[0][5] == "05/01/2024"
+    assert server.paths() == ["/esearch.fcgi"] + ["/efetch.fcgi"] * 3
+    assert [(p["retstart"], p["retmax"]) for path, p, _ in server.requests[1:]] == [("0", "2"), ("2", "2"), ("4", "2")]
+
+
+def test_stops_at_required_total(stub_server):
+    server = stub_server(eutils_routes())
+    rows = collect_pubmed_eutils(HttpClient(sleep=0), required_total=1, batch_size=2, base_url=server.url)
+    assert [row[0] for row in rows] == EXPECTED_DOIS[:1]
+    assert server.paths() == ["/esearch.fcgi", "/efetch.fcgi"]
+
+
+def test_esearch_bypasses_response_cache(stub_server, tmp_path):
+    server = stub_server(eutils_routes())
+    http = HttpClient(sleep=0, cache=ResponseCache(str(tmp_path)))
+    first = collect_pubmed_eutils(http, required_total=10, batch_size=2, base_url=server.url)
+    second = collect_pubmed_eutils(http, required_total=10, batch_size=2, base_url=server.url)
+    assert first == second
+    # ESearch va siempre al servidor; los lotes de EFetch (mismo WebEnv) salen de la caché.
+    assert server.paths() == ["/esearch.fcgi"] + ["/efetch.fcgi"] * 3 + ["/esearch.fcgi"]
@@ -0,0 +1,98 @@
+import os
+import pickle
+import subprocess
+import sys
+import zlib
+import numpy as np
+import pandas as pd
+import pytest
+from representation.hashing import HashedVectorizer, hash_corpus
+from representation.incremental import append_to_store
+from representation.store import open_store
+from representation.vectorize import vectorize_field, vectorize_field_hashed
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TEXTS = ["graph neural network", "protein cell cell", "quantum spin graph", "market price price price", "galaxy"]
+
+
+def test_columns_do_not_depend_on_the_process():
+    # crc32 no depende de PYTHONHASHSEED (hash() de str sí): mismas columnas en cualquier proceso.
+    code = ("from representation.hashing import HashedVectorizer; "
+            "print(HashedVectorizer('frequency', (1, 2), 12).counts(['graph neural network']).indices.tolist())")
+    outputs = set()
+    for seed in ("0", "1", "12345"):
+        env = dict(os.environ, PYTHONHASHSEED=seed)
+        outputs.add(subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env, capture_output=True,
+                                   text=True, check=True).stdout)
+    expected = HashedVectorizer("frequency", (1, 2), 12).counts(["graph neural network"]).indices.tolist()
+    assert outputs == {f"{expected}\n"}
+    terms = ["graph", "neural", "network", "graph neural", "neural network"]
+    assert sorted(expected) == sorted(zlib.crc32(t.encode("utf-8")) & 4095 for t in terms)
+
+
+def test_saved_vectorizer_transforms_like_the_original():
+    vec = HashedVectorizer("tfidf", (1, 2), 10).fit(TEXTS)
+    clone = pickle.loads(pickle.dumps(vec))
+    restored = HashedVectorizer.from_params(vec.params(), vec.doc_freq, vec.n_docs)
+    query = ["graph price unseen"]
+    for other in (clone, restored):
+        assert (other.transform(query) != vec.transform(query)).nnz == 0
+
+
+def test_streaming_fit_matches_one_pass():
+    texts = TEXTS * 7
+    counts, hasher = hash_corpus(texts, (1, 2), bits=10, chunksize=3)
+    one_pass = HashedVectorizer("tfidf", (1, 2), 10)
+    X = one_pass.fit_transform(texts)
+    assert (counts != one_pass.counts(texts)).nnz == 0
+    np.testing.assert_array_equal(hasher.doc_freq, one_pass.doc_freq)
+    np.testing.assert_allclose(hasher.weigh(counts).toarray(), X.toarray())
+
+
+def colliding_terms(bits):
+    """Dos términos distintos que caen en la misma columna con 2^bits columnas."""
+    seen = {}
+    for i in range(10_000):
+        term = f"t{i}"
+        col = zlib.crc32(term.encode("utf-8")) & ((1 << bits) - 1)
+        if col in seen:
+            return seen[col], term, col
+        seen[col] = term
+    raise AssertionError("sin colisiones")
+
+
+def test_colliding_terms_share_a_column():
+    a, b, col = colliding_terms(8)
+    vec = HashedVectorizer("frequency", (1, 1), 8)
+    X = vec.counts([f"{a} {b} {b}", a, "otro"])
+    assert X[0, col] == 3 and X[1, col] == 1
+    assert X[0].nnz == 1  # los dos términos son indistinguibles
+    tfidf = HashedVectorizer("tfidf", (1, 1), 8).fit([f"{a} {b}", a, b, "otro"])
+    assert tfidf.doc_freq[col] == 3  # frecuencia de documento de la columna, no de cada término
+
+
+@pytest.mark.parametrize("rep", ["tfidf", "frequency", "binary"])
+def test_matches_vocabulary_vectorizer_without_collisions(tmp_path, rep):
+    # Con 2^20 columnas estos términos no colisionan: igual a sklearn salvo por el orden de columnas.
+    df = pd.DataFrame({"Abstract": TEXTS * 3})
+    vectorize_field(df, "arxiv", "Abstract", [rep], (1, 2), str(tmp_path))
+    vectorize_field_hashed(df, "arxiv", "Abstract", [f"hashed-{rep}"], (1, 2), str(tmp_path), bits=20)
+    exact = open_store(str(tmp_path / f"arxiv_abstract_{rep}_n1-2"))
+    hashed = open_store(str(tmp_path / f"arxiv_abstract_hashed-{rep}_n1-2"))
+    cols = [zlib.crc32(t.encode("utf-8")) & ((1 << 20) - 1) for t in exact.vectorizer.vocab.terms_by_column()]
+    assert len(set(cols)) == len(cols)
+    np.testing.assert_allclose(hashed.X.toarray()[:, cols], exact.X.toarray(), rtol=1e-12)
+    assert hashed.X.nnz == exact.X.nnz
+
+
+def test_append_to_hashed_store_matches_refit(tmp_path):
+    old, new = TEXTS * 4, ["graph galaxy", "nuevo termino", "price"]
+    vectorize_field_hashed(pd.DataFrame({"Abstract": old}), "arxiv", "Abstract", ["hashed-tfidf"], (1, 1),
+                           str(tmp_path / "a"), bits=12)
+    vectorize_field_hashed(pd.DataFrame({"Abstract": old + new}), "arxiv", "Abstract", ["hashed-tfidf"], (1, 1),
+                           str(tmp_path / "b"), bits=12)
+    path = str(tmp_path / "a" / "arxiv_abstract_hashed-tfidf_n1-1")
+    shape, n_terms = append_to_store(path, new)
+    refit = open_store(str(tmp_path / "b" / "arxiv_abstract_hashed-tfidf_n1-1"))
+    assert shape == refit.X.shape and n_terms == 0
+    np.testing.assert_allclose(open_store(path).X.toarray(), refit.X.toarray(), rtol=1e-12, atol=1e-15)
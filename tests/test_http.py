@@ -0,0 +1,57 @@
+import threading
+import time
+import pytest
+import requests
+from scraper.cache import ResponseCache
+from scraper.concurrency import HostLimiter
+from scraper.http import HttpClient
+
+
+def test_streamed_body_keeps_host_slot(stub_server):
+    server = stub_server({"/page": lambda params: (200, "text/plain", b"x" * 1000)})
+    http = HttpClient(sleep=0, limiter=HostLimiter(max_per_host=1))
+    closed_at = []
+
+    def slow_reader():
+        r = http.get(f"{server.url}/page", params={"n": 1}, stream=True)
+        time.sleep(0.3)  # el cuerpo aún no se leyó: el turno sigue ocupado
+        r.content
+        closed_at.append(time.monotonic())
+        r.close()
+
+    reader = threading.Thread(target=slow_reader)
+    reader.start()
+    time.sleep(0.05)
+    http.get(f"{server.url}/page", params={"n": 2}).content
+    reader.join()
+    second_start = server.requests[1][2]
+    assert second_start >= closed_at[0]
+
+
+def test_cached_fetches_count_stats_under_threads(stub_server, tmp_path):
+    server = stub_server({"/page": lambda params: (200, "text/plain", b"cached body")})
+    cache = ResponseCache(str(tmp_path))
+    http = HttpClient(sleep=0, cache=cache, limiter=HostLimiter(max_per_host=4))
+    http.get(f"{server.url}/page").close()
+
+    def worker():
+        for _ in range(50):
+            r = http.get(f"{server.url}/page", stream=True)
+            assert r.content == b"cached body"
+            r.close()
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert cache.stats["misses"] == 1 and cache.stats["hits"] == 400
+    assert len(server.requests) == 1
+
+
+def test_failed_status_releases_slot(stub_server):
+    server = stub_server({"/missing": lambda params: (404, "text/plain", b"no")})
+    http = HttpClient(sleep=0, limiter=HostLimiter(max_per_host=1))
+    for _ in range(3):
+        with pytest.raises(requests.HTTPError):
+            http.get(f"{server.url}/missing", stream=True)
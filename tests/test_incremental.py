@@ -0,0 +1,129 @@
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from conftest import make_rows
+from representation import incremental, vectorize
+from representation.incremental import append_to_store, update_corpus
+from representation.store import open_store
+from representation.vectorize import vectorize_field
+
+
+@pytest.fixture
+def project(corpus, monkeypatch):
+    """Corpus sintético con dos artefactos store (tfidf y binario); los textos ya vienen normalizados."""
+    identity = lambda texts, workers=1: [str(t) for t in texts]
+    monkeypatch.setattr(vectorize, "normalize_texts", identity)
+    monkeypatch.setattr(incremental, "normalize_texts", identity)
+    df = make_rows(0, 40)
+    corpus.build(df)
+    vectorize_field(df, "arxiv", "Abstract", ["tfidf", "binary"], (1, 1), os.path.join(corpus.base, "data", "vectors"))
+    new_file = os.path.join(corpus.base, "new.tsv")
+    make_rows(35, 15).to_csv(new_file, sep="\t", index=False)  # 5 DOIs repetidos, 10 nuevos
+    return os.path.join(corpus.base, "data"), new_file
+
+
+def n_rows(base, name):
+    return open_store(os.path.join(base, "vectors", name)).X.shape[0]
+
+
+def test_update_appends_to_stores_and_csvs(project):
+    base, new_file = project
+    assert update_corpus(base, "arxiv", new_file) == 10
+    assert len(pd.read_csv(os.path.join(base, "corpus", "arxiv_raw_corpus.csv"), sep="\t")) == 50
+    assert n_rows(base, "arxiv_abstract_tfidf_n1-1") == n_rows(base, "arxiv_abstract_binary_n1-1") == 50
+
+
+def test_failed_store_update_leaves_csvs_untouched(project, monkeypatch):
+    base, new_file = project
+    raw_path = os.path.join(base, "corpus", "arxiv_raw_corpus.csv")
+    with open(raw_path, encoding="utf-8") as f:
+        before = f.read()
+    calls = []
+    original = incremental.stage_append
+
+    def failing(path, texts):
+        calls.append(path)
+        if len(calls) == 2:
+            raise MemoryError("sin memoria")
+        return original(path, texts)
+
+    monkeypatch.setattr(incremental, "stage_append", failing)
+    with pytest.raises(MemoryError):
+        update_corpus(base, "arxiv", new_file)
+    with open(raw_path, encoding="utf-8") as f:
+        assert f.read() == before
+    assert n_rows(base, "arxiv_abstract_tfidf_n1-1") == n_rows(base, "arxiv_abstract_binary_n1-1") == 40
+
+    monkeypatch.setattr(incremental, "stage_append", original)
+    assert update_corpus(base, "arxiv", new_file) == 10
+    assert n_rows(base, "arxiv_abstract_tfidf_n1-1") == 50
+
+
+def test_rerun_after_stores_written_does_not_append_twice(project, monkeypatch):
+    base, new_file = project
+    to_csv = pd.DataFrame.to_csv
+
+    def append_fails(df, *args, **kwargs):
+        if kwargs.get("mode") == "a":
+            raise OSError("disco lleno")
+        return to_csv(df, *args, **kwargs)
+
+    with monkeypatch.context() as m:
+        m.setattr(pd.DataFrame, "to_csv", append_fails)
+        with pytest.raises(OSError):
+            update_corpus(base, "arxiv", new_file)
+    assert n_rows(base, "arxiv_abstract_binary_n1-1") == 50
+
+    assert update_corpus(base, "arxiv", new_file) == 10
+    assert len(pd.read_csv(os.path.join(base, "corpus", "arxiv_raw_corpus.csv"), sep="\t")) == 50
+    assert n_rows(base, "arxiv_abstract_tfidf_n1-1") == n_rows(base, "arxiv_abstract_binary_n1-1") == 50
+
+
+def test_pkl_artifacts_are_reported(project, capsys):
+    base, new_file = project
+    df = make_rows(0, 40)
+    vectorize_field(df, "arxiv", "Title", ["frequency"], (1, 1), os.path.join(base, "vectors"), "pkl")
+    update_corpus(base, "arxiv", new_file)
+    assert "arxiv_title_frequency_n1-1.pkl no se actualiza" in capsys.readouterr().out
+
+
+def random_texts(rng, n, vocab):
+    """Textos con términos compartidos de frecuencia variable: el idf de las columnas antiguas cambia al agregar filas."""
+    p = 1.0 / np.arange(1, len(vocab) + 1)
+    return [" ".join(rng.choice(vocab, size=rng.integers(2, 12), p=p / p.sum())) for _ in range(n)]
+
+
+def by_term(store):
+    """Matriz densa con las columnas ordenadas por término (el orden de columnas difiere tras agregar)."""
+    terms = store.vectorizer.vocab.terms_by_column()
+    order = np.argsort(terms)
+    return terms[order], store.X.toarray()[:, order]
+
+
+@pytest.mark.parametrize("rep", ["tfidf", "frequency", "binary"])
+def test_append_matches_full_refit(tmp_path, rep):
+    rng = np.random.default_rng(7)
+    old_vocab = [f"w{i}" for i in range(30)]
+    old = random_texts(rng, 60, old_vocab)
+    new = random_texts(rng, 25, old_vocab[10:] + [f"nuevo{i}" for i in range(15)])
+    frame = lambda texts: pd.DataFrame({"Abstract": texts})
+
+    vectorize_field(frame(old), "arxiv", "Abstract", [rep], (1, 2), str(tmp_path / "incremental"))
+    path = str(tmp_path / "incremental" / f"arxiv_abstract_{rep}_n1-2")
+    shape, n_terms = append_to_store(path, new)
+    vectorize_field(frame(old + new), "arxiv", "Abstract", [rep], (1, 2), str(tmp_path / "refit"))
+    refit = open_store(str(tmp_path / "refit" / f"arxiv_abstract_{rep}_n1-2"))
+    appended = open_store(path)
+
+    assert shape == refit.X.shape and n_terms > 0
+    terms, X = by_term(appended)
+    refit_terms, X_refit = by_term(refit)
+    assert list(terms) == list(refit_terms)
+    np.testing.assert_allclose(X, X_refit, rtol=1e-12, atol=1e-12)
+    if rep == "tfidf":
+        order = np.argsort(appended.vectorizer.vocab.terms_by_column())
+        refit_order = np.argsort(refit.vectorizer.vocab.terms_by_column())
+        np.testing.assert_allclose(np.asarray(appended.vectorizer.idf)[order],
+                                   np.asarray(refit.vectorizer.idf)[refit_order], rtol=1e-12)
+        np.testing.assert_array_equal(appended.doc_freq()[order], refit.doc_freq()[refit_order])
@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+import scipy.sparse as sp
+from similarities.inverted_index import InvertedIndex
+
+
+def synthetic_corpus(seed, n_docs=400, n_terms=300, n_dups=60):
+    """Conteos tipo Zipf; las últimas `n_dups` filas copian otras para forzar empates exactos."""
+    rng = np.random.default_rng(seed)
+    p = 1.0 / np.arange(1, n_terms + 1)
+    p /= p.sum()
+    rows = []
+    for _ in range(n_docs - n_dups):
+        terms = rng.choice(n_terms, size=rng.integers(3, 25), p=p)
+        rows.append(np.bincount(terms, minlength=n_terms))
+    rows += [rows[j] for j in rng.integers(0, len(rows), n_dups)]
+    return sp.csr_matrix(np.array(rows, dtype=np.float64))
+
+
+def brute_force(X, q):
+    Xd, qd = X.toarray(), q.toarray().ravel()
+    norms = np.linalg.norm(Xd, axis=1)
+    norms[norms == 0] = 1.0
+    qn = np.linalg.norm(qd)
+    return Xd @ qd / norms / (qn or 1.0)
+
+
+def check_topk(docs, scores, exact, k):
+    """Mismo top-k salvo el orden entre empates: puntajes iguales y todo doc por encima del k-ésimo incluido."""
+    expected = np.sort(exact)[::-1][:k]
+    assert len(docs) == len(set(docs.tolist())) == k
+    np.testing.assert_allclose(scores, expected, atol=1e-12)
+    np.testing.assert_allclose(exact[docs], scores, atol=1e-12)
+    assert set(np.flatnonzero(exact > expected[-1] + 1e-12)) <= set(docs.tolist())
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+@pytest.mark.parametrize("k", [1, 5, 20])
+def test_maxscore_matches_brute_force(seed, k):
+    X = synthetic_corpus(seed)
+    index = InvertedIndex.from_matrix(X)
+    rng = np.random.default_rng(100 + seed)
+    stats = {}
+    for i in rng.integers(0, X.shape[0], 25):
+        q = X[i] if i % 2 else X[i] + X[(i + 7) % X.shape[0]]
+        exact = brute_force(X, q)
+        check_topk(*index.search_maxscore(q, k, stats), exact, k)
+        check_topk(*index.search(q, k), exact, k)
+    assert stats["postings_skipped"] > 0  # la poda llega a activarse
+
+
+def test_maxscore_ties_at_cutoff():
+    # 30 documentos idénticos empatan en el primer puesto; con k=10 cualquier subconjunto es válido.
+    X = sp.vstack([sp.csr_matrix(np.tile([[2.0, 1.0, 0, 0, 0]], (30, 1))),
+                   sp.csr_matrix(np.tile([[1.0, 0, 1.0, 0, 0]], (20, 1))),
+                   sp.csr_matrix(np.tile([[0, 0, 0, 1.0, 1.0]], (10, 1)))], format="csr")
+    index = InvertedIndex.from_matrix(X)
+    q = sp.csr_matrix([[2.0, 1.0, 0, 0, 0]])
+    exact = brute_force(X, q)
+    for k in (10, 30, 40, 60):
+        docs, scores = index.search_maxscore(q, k)
+        check_topk(docs, scores, exact, k)
+
+
+def test_maxscore_pads_with_zero_scores():
+    X = sp.csr_matrix(np.eye(6))
+    index = InvertedIndex.from_matrix(X)
+    docs, scores = index.search_maxscore(sp.csr_matrix([[0, 0, 3.0, 0, 0, 0]]), 4)
+    assert docs.tolist() == [2, 0, 1, 3]
+    assert scores.tolist() == [1.0, 0.0, 0.0, 0.0]
+    docs, scores = index.search_maxscore(sp.csr_matrix((1, 6)), 2)
+    assert docs.tolist() == [0, 1] and scores.tolist() == [0.0, 0.0]
@@ -0,0 +1,25 @@
+import pytest
+from scraper.io_utils import write_tsv
+
+HEADER = ["DOI", "Title"]
+
+
+def test_failed_generator_keeps_previous_file(tmp_path):
+    path = tmp_path / "arxiv_raw_corpus.csv"
+    assert write_tsv(path, [["10.1/a", "Old"]], HEADER) == 1
+    before = path.read_text(encoding="utf-8")
+
+    def rows():
+        yield ["10.1/b", "New"]
+        raise ConnectionError("se cortó la conexión")
+
+    with pytest.raises(ConnectionError):
+        write_tsv(path, rows(), HEADER)
+    assert path.read_text(encoding="utf-8") == before
+    assert [p.name for p in tmp_path.iterdir()] == ["arxiv_raw_corpus.csv"]
+
+
+def test_rows_replace_file_when_complete(tmp_path):
+    path = tmp_path / "out" / "pubmed.tsv"
+    write_tsv(path, iter([["10.1/a", "One\ntwo"], ["10.1/b"]]), HEADER)
+    assert path.read_text(encoding="utf-8").splitlines() == ["DOI\tTitle", "10.1/a\tOne two", "10.1/b\t"]
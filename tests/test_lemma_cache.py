@@ -0,0 +1,25 @@
+from normalization import normalization
+from normalization.normalization import LemmaCache
+
+
+class FakeLemmatizer:
+    def lemmatize(self, token, pos):
+        return token.rstrip("s")
+
+
+def test_in_process_cache_stays_bounded(monkeypatch):
+    monkeypatch.setattr(normalization, "_nltk_tools", (None, None, FakeLemmatizer()))
+    cache = LemmaCache(maxsize=10)
+    for i in range(1000):
+        assert cache.lemmatize(f"word{i}s", "n") == f"word{i}"
+    assert len(cache) == 10
+    assert cache.drain_new() == []
+
+
+def test_worker_cache_reports_new_lemmas(monkeypatch):
+    monkeypatch.setattr(normalization, "_nltk_tools", (None, None, FakeLemmatizer()))
+    cache = LemmaCache(maxsize=10, track_new=True)
+    cache.lemmatize("cells", "n")
+    cache.lemmatize("cells", "n")
+    assert cache.drain_new() == [("cells", "n", "cell")]
+    assert cache.drain_new() == []
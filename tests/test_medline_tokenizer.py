@@ -0,0 +1,49 @@
+import os
+import pytest
+from scraper.pubmed import _PreScanner, _page_rows, _page_rows_soup, _rows_from_chunks, iter_medline_records
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "pubmed", "trending.html")
+
+
+@pytest.fixture(scope="module")
+def page():
+    with open(FIXTURE, encoding="utf-8") as f:
+        return f.read()
+
+
+def chunked(text, size):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+def test_stream_matches_soup(page):
+    expected = _page_rows_soup(page)
+    assert [row[0] for row in expected] == ["10.1038/s41586-023-00001-1", "10.1016/j.watres.2023.00005",
+                                            "10.1001/jamaneurol.2023.00006"]
+    assert "(<5 µm & >90% reads)" in expected[1][3]
+    assert _page_rows(page) == expected
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 64, 511, 4096])
+def test_stream_matches_soup_in_chunks(page, size):
+    assert _rows_from_chunks(chunked(page, size)) == _page_rows_soup(page)
+
+
+def test_every_split_point(page):
+    # Cortes dentro de etiquetas <pre>, entidades, "PMID- " y líneas de continuación.
+    expected = _page_rows_soup(page)
+    for cut in range(1, len(page)):
+        assert _rows_from_chunks([page[:cut], page[cut:]]) == expected, cut
+
+
+def test_records_and_blocks(page):
+    scanner = _PreScanner()
+    records = [r for r in iter_medline_records(scanner.lines(chunked(page, 5))) if r["title"]]
+    assert scanner.blocks == 2  # el <pre class="example"> no cuenta
+    assert len(records) == 6
+    assert records[0]["title"].endswith("heterogeneity.") and records[5]["journal"] == "JAMA neurology"
+
+
+def test_page_without_results():
+    page = "<html><body><p>No results</p></body></html>"
+    assert _page_rows(page) is None and _page_rows_soup(page) is None
+    assert _rows_from_chunks(chunked(page, 3)) is None
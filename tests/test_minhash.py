@@ -0,0 +1,53 @@
+import numpy as np
+import scipy.sparse as sp
+from similarities.minhash import LshIndex, signatures, term_keys
+
+
+def near_duplicate_sets(seed, n_base=150, n_terms=5000, size=60):
+    """Conjuntos base y, para cada uno, una copia con algunos términos cambiados (Jaccard entre ~0.5 y ~0.95)."""
+    rng = np.random.default_rng(seed)
+    sets = []
+    for i in range(n_base):
+        base = rng.choice(n_terms, size=size, replace=False)
+        changed = base.copy()
+        n_changed = rng.integers(1, 20)
+        changed[:n_changed] = rng.choice(n_terms, size=n_changed, replace=False)
+        sets += [base, changed]
+    rows = np.repeat(np.arange(len(sets)), [len(s) for s in sets])
+    X = sp.csr_matrix((np.ones(rows.size), (rows, np.concatenate(sets))), shape=(len(sets), n_terms))
+    X.data[:] = 1
+    return X
+
+
+def jaccard(X, i, j):
+    a, b = set(X[i].indices), set(X[j].indices)
+    return len(a & b) / len(a | b)
+
+
+def test_signature_agreement_estimates_jaccard():
+    X = near_duplicate_sets(0, n_base=40)
+    sig = signatures(X, term_keys([f"t{j}" for j in range(X.shape[1])]), num_perm=256)
+    errors = [abs(np.mean(sig[i] == sig[i + 1]) - jaccard(X, i, i + 1)) for i in range(0, X.shape[0], 2)]
+    assert np.mean(errors) < 0.03 and max(errors) < 0.12
+
+
+def test_lsh_candidate_recall():
+    X = near_duplicate_sets(1)
+    keys = term_keys([f"t{j}" for j in range(X.shape[1])])
+    lsh = LshIndex(signatures(X, keys, num_perm=128), bands=32)
+    pairs = {tuple(p) for p in lsh.pairs().tolist()}
+    similar = [(i, i + 1) for i in range(0, X.shape[0], 2) if jaccard(X, i, i + 1) >= 0.7]
+    assert len(similar) > 50
+    # b=32, r=4: un par con Jaccard 0.7 es candidato con probabilidad 1 - (1 - 0.7^4)^32 ≈ 0.9995.
+    recall = np.mean([p in pairs for p in similar])
+    assert recall >= 0.98
+    # Los conjuntos base son independientes entre sí: casi nunca forman pares candidatos.
+    assert len(pairs - {(i, i + 1) for i in range(0, X.shape[0], 2)}) < 10
+    sig = signatures(X, keys, num_perm=128)
+    assert np.mean([j in lsh.candidates(sig[i]) for i, j in similar]) >= 0.98
+
+
+def test_empty_rows_are_not_candidates():
+    X = sp.csr_matrix(np.array([[1, 1, 0], [0, 0, 0], [0, 0, 0], [1, 1, 0]]))
+    lsh = LshIndex(signatures(X, term_keys(["a", "b", "c"]), num_perm=16), bands=4)
+    assert lsh.pairs().tolist() == [[0, 3]]
@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+import scipy.sparse as sp
+from conftest import topic_matrix
+from similarities.neighbors import all_pairs_topk, l2_rows, neighbors_of, verify_rows
+
+
+def dense_topk(X, k, threshold=0.0, include_self=False):
+    """Top-k exhaustivo por fila sobre la matriz densa de similitudes: (puntajes ordenados, matriz S)."""
+    Xn = l2_rows(X).toarray()
+    S = Xn @ Xn.T
+    if not include_self:
+        np.fill_diagonal(S, 0)
+    S[S <= threshold] = 0
+    top = -np.sort(-S, axis=1)[:, :k]
+    return top, S
+
+
+@pytest.mark.parametrize("max_products, blocks", [(1, "rows"), (5_000, "several"), (10**9, "one")])
+@pytest.mark.parametrize("k, threshold, include_self", [(5, 0.0, False), (10, 0.3, False), (3, 0.0, True)])
+def test_blocked_matches_dense(max_products, blocks, k, threshold, include_self):
+    X = topic_matrix(3, n_docs=250, n_terms=200)
+    X = sp.vstack([X, X[:50]], format="csr")  # filas repetidas: empates exactos
+    N, n_blocks = all_pairs_topk(X, k, threshold, max_products, include_self)
+    assert {"rows": n_blocks == 300, "several": 1 < n_blocks < 300, "one": n_blocks == 1}[blocks]
+    top, S = dense_topk(X, k, threshold, include_self)
+    for r in range(X.shape[0]):
+        ids, sims = neighbors_of(N, r)
+        expected = top[r][top[r] > 0]
+        np.testing.assert_allclose(sims, expected, atol=1e-6)
+        # Entre empates cualquier vecino es válido, pero su similitud debe ser la real.
+        np.testing.assert_allclose(sims, S[r, ids], atol=1e-6)
+        assert len(set(ids.tolist())) == ids.size
+        if not include_self:
+            assert r not in ids
+    assert verify_rows(X, N, range(0, 300, 7), k, threshold, include_self) == 0
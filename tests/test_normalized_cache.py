@@ -0,0 +1,53 @@
+import os
+import pandas as pd
+from representation import vectorize
+from representation.vectorize import load_normalized_corpus
+from normalization.normalization import read_normalized_manifest
+
+
+def write_raw(corpus_dir):
+    os.makedirs(corpus_dir, exist_ok=True)
+    pd.DataFrame({"DOI": ["10.1/a", "10.1/b"], "Title": ["First Title", "Second Title"],
+                  "Abstract": ["Some Text", None]}).to_csv(os.path.join(corpus_dir, "arxiv_raw_corpus.csv"),
+                                                          sep="\t", index=False)
+    return os.path.join(corpus_dir, "arxiv_normalized_corpus.csv")
+
+
+def fake_normalizer(monkeypatch):
+    calls = []
+
+    def normalize_texts(texts, workers=1):
+        texts = list(texts)
+        calls.append(texts)
+        return [t.lower() for t in texts]
+
+    monkeypatch.setattr(vectorize, "normalize_texts", normalize_texts)
+    return calls
+
+
+def test_unmanaged_normalized_file_is_not_overwritten(tmp_path, monkeypatch):
+    calls = fake_normalizer(monkeypatch)
+    norm_path = write_raw(str(tmp_path))
+    with open(norm_path, "w", encoding="utf-8") as f:
+        f.write("versionado a mano\n")
+
+    df = load_normalized_corpus(str(tmp_path), "arxiv", ["Title", "Abstract"])
+    assert list(df["Title"]) == ["first title", "second title"]
+    assert list(df["Abstract"]) == ["some text", ""]
+    assert ["Some Text", ""] in calls  # las celdas vacías no llegan como "nan"
+    with open(norm_path, encoding="utf-8") as f:
+        assert f.read() == "versionado a mano\n"
+    assert read_normalized_manifest(norm_path) is None
+
+    load_normalized_corpus(str(tmp_path), "arxiv", ["Title", "Abstract"], force=True)
+    assert read_normalized_manifest(norm_path)["columns"] == ["Title", "Abstract"]
+
+
+def test_managed_cache_is_reused(tmp_path, monkeypatch):
+    calls = fake_normalizer(monkeypatch)
+    write_raw(str(tmp_path))
+    first = load_normalized_corpus(str(tmp_path), "arxiv", ["Title", "Abstract"])
+    n_calls = len(calls)
+    second = load_normalized_corpus(str(tmp_path), "arxiv", ["Title", "Abstract"])
+    assert len(calls) == n_calls
+    assert list(second["Abstract"]) == list(first["Abstract"]) == ["some text", ""]
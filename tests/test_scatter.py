@@ -0,0 +1,39 @@
+import os
+from conftest import make_rows
+from representation.shards import save_shards, shard_rows, shards_path
+from representation.store import artifact_signature, open_store
+from similarities.engine import SimilarityEngine
+
+
+def save_corpus_shards(corpus, n_shards=2):
+    X = open_store(corpus.store_path).X
+    name = os.path.basename(corpus.store_path)
+    save_shards(shards_path(os.path.join(corpus.base, "data", "vectors"), name), X, shard_rows(X.shape[0], n_shards),
+                "range", {"artifact": name, "signature": artifact_signature(corpus.store_path)})
+
+
+def top(engine, text):
+    row = engine.query(text, "Abstract", "tfidf", "unigram", 1, normalized=True)[0]
+    return row["DOI"], row["Title"]
+
+
+def test_process_workers_reopen_rewritten_shards(corpus):
+    corpus.build(make_rows(0, 100))
+    save_corpus_shards(corpus)
+    engine = SimilarityEngine(corpus.base, corpora=["arxiv"], shards=2, workers=2, executor="process")
+    try:
+        assert top(engine, "doc5") == ("10.1000/5", "title 5")
+        assert top(engine, "doc80") == ("10.1000/80", "title 80")
+
+        # Mismo tamaño, filas invertidas y fragmentos reescritos en la misma ruta.
+        corpus.build(make_rows(0, 100, prefix="10.2000").iloc[::-1].reset_index(drop=True))
+        save_corpus_shards(corpus)
+        for _ in range(4):  # cada trabajador del pool tiene que ver la versión nueva
+            assert top(engine, "doc5") == ("10.2000/5", "title 5")
+            assert top(engine, "doc80") == ("10.2000/80", "title 80")
+
+        # Volver a fragmentar el mismo artefacto también cambia la versión de los fragmentos.
+        save_corpus_shards(corpus)
+        assert top(engine, "doc42") == ("10.2000/42", "title 42")
+    finally:
+        engine.close()
@@ -0,0 +1,38 @@
+import threading
+from conftest import make_rows
+from similarities import engine as engine_module
+from similarities.engine import SimilarityEngine
+from similarities.result_cache import ResultCache
+from similarities.service import SimilarityService
+
+
+def test_service_normalizes_in_batch_thread(corpus, monkeypatch):
+    corpus.build(make_rows(0, 50))
+    threads = set()
+
+    def fake_normalize(text):
+        threads.add(threading.current_thread().name)
+        return text.lower()
+
+    monkeypatch.setattr(engine_module, "normalize_single_text", fake_normalize)
+    service = SimilarityService(SimilarityEngine(corpus.base, corpora=["arxiv"], cache=ResultCache()), max_wait=0.01)
+    try:
+        results = [None] * 16
+
+        def ask(i):
+            results[i] = service.query({"text": f"DOC{i}", "topk": 1})["results"]
+
+        clients = [threading.Thread(target=ask, args=(i,)) for i in range(16)]
+        for t in clients:
+            t.start()
+        for t in clients:
+            t.join()
+        assert [rows[0]["DOI"] for rows in results] == [f"10.1000/{i}" for i in range(16)]
+        assert threads == {"micro-batcher"}
+
+        # La segunda vez la normalización sale de la caché del motor.
+        threads.clear()
+        assert service.query({"text": "DOC3", "topk": 1})["results"][0]["DOI"] == "10.1000/3"
+        assert threads == set()
+    finally:
+        service.close()
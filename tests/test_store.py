@@ -0,0 +1,90 @@
+import json
+import os
+import numpy as np
+import pytest
+import scipy.sparse as sp
+from representation import store as store_module
+from representation.store import MANIFEST, VocabTable, open_store, save_store
+
+PARAMS = {"token_pattern": r"(?u)\w+", "ngram_range": [1, 1], "lowercase": True, "binary": False, "norm": None}
+
+
+def matrix(seed):
+    return sp.random(20, 5, density=0.4, format="csr", random_state=seed)
+
+
+def save(path, seed):
+    return save_store(path, matrix(seed), VocabTable.from_terms(list("abcde")), PARAMS, {"corpus": "arxiv"})
+
+
+def versions(path):
+    return sorted(name for name in os.listdir(path) if name.startswith("v-"))
+
+
+def test_rewrite_keeps_open_readers_valid(tmp_path):
+    path = str(tmp_path / "arxiv_abstract_frequency_n1-1")
+    save(path, 0)
+    reader = open_store(path)
+    before = reader.X.toarray()
+    manifest = save(path, 1)
+    # El lector sigue usando sus arreglos mapeados; un lector nuevo ve la versión nueva.
+    np.testing.assert_array_equal(reader.X.toarray(), before)
+    np.testing.assert_allclose(open_store(path).X.toarray(), matrix(1).toarray())
+    assert open_store(path).manifest["artifact_id"] == manifest["artifact_id"]
+
+
+def test_only_current_manifest_is_replaced(tmp_path, monkeypatch):
+    # En Windows no se puede renombrar ni borrar un .npy mapeado: la escritura solo reemplaza el manifiesto.
+    path = str(tmp_path / "artifact")
+    save(path, 0)
+    current = os.path.join(path, open_store(path).manifest["arrays"])
+    replaced, removed = [], []
+    replace, rmtree = os.replace, store_module.shutil.rmtree
+    monkeypatch.setattr(store_module.os, "replace", lambda src, dst: replaced.append(dst) or replace(src, dst))
+    monkeypatch.setattr(store_module.shutil, "rmtree", lambda p, **kw: removed.append(p) or rmtree(p, **kw))
+    save(path, 1)
+    assert replaced == [os.path.join(path, MANIFEST)]
+    assert removed == [] and os.path.isdir(current)
+
+
+def test_old_versions_are_pruned(tmp_path):
+    path = str(tmp_path / "artifact")
+    ids = [save(path, seed)["arrays"] for seed in range(4)]
+    assert versions(path) == sorted(ids[-2:])  # la vigente y la anterior
+
+
+def test_reads_and_upgrades_version_1_layout(tmp_path):
+    path = str(tmp_path / "artifact")
+    save(path, 0)
+    # Formato anterior: los .npy junto al manifiesto, sin "arrays".
+    with open(os.path.join(path, MANIFEST), encoding="utf-8") as f:
+        manifest = json.load(f)
+    arrays = os.path.join(path, manifest.pop("arrays"))
+    for name in os.listdir(arrays):
+        os.replace(os.path.join(arrays, name), os.path.join(path, name))
+    os.rmdir(arrays)
+    manifest["version"] = 1
+    with open(os.path.join(path, MANIFEST), "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+
+    old = open_store(path)
+    np.testing.assert_allclose(old.X.toarray(), matrix(0).toarray())
+    assert old.row_norms().shape == (20,)
+    save(path, 1)
+    assert any(name.endswith(".npy") for name in os.listdir(path))  # se conserva como versión anterior
+    save(path, 2)
+    assert not any(name.endswith(".npy") for name in os.listdir(path))
+    np.testing.assert_allclose(open_store(path).X.toarray(), matrix(2).toarray())
+
+
+def test_newer_version_is_rejected(tmp_path):
+    path = str(tmp_path / "artifact")
+    save(path, 0)
+    manifest_path = os.path.join(path, MANIFEST)
+    with open(manifest_path, encoding="utf-8") as f:
+        manifest = json.load(f)
+    manifest["version"] = store_module.STORE_VERSION + 1
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    with pytest.raises(ValueError):
+        open_store(path)